@@ -0,0 +1,62 @@
+"""
+CACHES["default"] from the environment.
+
+DJANGO_CACHE_BACKEND picks the backend:
+
+* ``file`` (default): a directory shared by the processes of one host
+  (DJANGO_CACHE_LOCATION, default ``<base>/cache``), so invalidation by
+  one gunicorn worker reaches the others. Its ``add()`` is a check then
+  a write, so the locks taken with it (reference recomputes, task runs)
+  may be held twice, and every write scans the directory to cull it.
+  Fine for development; production uses ``redis``.
+* ``locmem``: a per-process cache. Invalidation only reaches the process
+  that made the write, so use it for tests and single-process
+  deployments only.
+* ``redis``: any Redis-compatible server at DJANGO_CACHE_LOCATION
+  (``redis://host:6379/1``; comma-separate several for a primary followed
+  by replicas). Needs the ``redis`` package.
+
+DJANGO_CACHE_TIMEOUT is the default entry lifetime in seconds,
+DJANGO_CACHE_KEY_PREFIX separates deployments sharing one server and
+DJANGO_CACHE_MAX_ENTRIES bounds the locmem and file backends.
+"""
+
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+}
+
+
+def cache_config(env, base_dir):
+    backend = env.get("DJANGO_CACHE_BACKEND", "file").lower()
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"Unsupported DJANGO_CACHE_BACKEND {backend!r}.")
+    config = {
+        "BACKEND": BACKENDS[backend],
+        "TIMEOUT": int(env.get("DJANGO_CACHE_TIMEOUT", "300")),
+        "KEY_PREFIX": env.get("DJANGO_CACHE_KEY_PREFIX", "fieldflow"),
+    }
+    if backend == "redis":
+        location = env.get("DJANGO_CACHE_LOCATION")
+        if not location:
+            raise ImproperlyConfigured("DJANGO_CACHE_LOCATION is required for redis.")
+        config["LOCATION"] = location.split(",")
+        return config
+    if backend == "file":
+        config["LOCATION"] = env.get("DJANGO_CACHE_LOCATION", str(base_dir / "cache"))
+    else:
+        config["LOCATION"] = env.get("DJANGO_CACHE_LOCATION", "fieldflow")
+    config["OPTIONS"] = {
+        "MAX_ENTRIES": int(env.get("DJANGO_CACHE_MAX_ENTRIES", "10000")),
+    }
+    return config
+
+
+def is_process_local(cache):
+    """Whether what ``cache`` stores is invisible to other processes."""
+    return isinstance(cache, (LocMemCache, DummyCache))
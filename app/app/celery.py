@@ -0,0 +1,28 @@
+"""
+The Celery application.
+
+Configuration comes from the CELERY_* Django settings. By default the
+broker is in memory and tasks run eagerly, inline in the caller, with
+their results kept in memory. That makes ``delay``, groups and chords
+work in tests and on a laptop with no broker. Set CELERY_BROKER_URL
+(``redis://broker:6379/0``) to send tasks to workers; results then go to
+the same Redis unless CELERY_RESULT_BACKEND names another shared backend
+(app/results.py):
+
+    celery -A app worker -Q realtime       # imports, overdue flips
+    celery -A app worker -Q maintenance    # nightly batch passes
+    celery -A app beat
+
+Workers of the two queues scale independently, so a long nightly pass
+never delays the latency-sensitive tasks (see CELERY_TASK_ROUTES).
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+app = Celery("app")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
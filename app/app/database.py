@@ -0,0 +1,85 @@
+"""
+DATABASES["default"] from the environment.
+
+DJANGO_DB_ENGINE picks the backend:
+
+* ``sqlite`` (default): the file at DJANGO_DB_PATH, opened through
+  ``app.backends.sqlite3`` with WAL journaling, busy_timeout and immediate
+  write transactions so concurrent readers do not block behind a writer.
+* ``postgres``: DJANGO_DB_NAME/USER/PASSWORD/HOST/PORT with persistent,
+  health-checked connections (DJANGO_DB_CONN_MAX_AGE). DJANGO_DB_POOL_SIZE
+  switches to psycopg's connection pool (Django 5.1+), and
+  DJANGO_DB_PGBOUNCER=true disables server-side cursors for transaction
+  pooling behind PgBouncer.
+"""
+
+import django
+from django.core.exceptions import ImproperlyConfigured
+
+
+def _flag(env, name, default="false"):
+    return env.get(name, default).lower() == "true"
+
+
+def sqlite_config(env, base_dir):
+    return {
+        "ENGINE": "app.backends.sqlite3",
+        "NAME": env.get("DJANGO_DB_PATH", str(base_dir / "db.sqlite3")),
+        "OPTIONS": {
+            # Seconds a connection waits on a locked database (busy_timeout).
+            "timeout": float(env.get("DJANGO_SQLITE_BUSY_TIMEOUT", "20")),
+            "transaction_mode": "IMMEDIATE",
+            "pragmas": {
+                "journal_mode": "WAL",
+                # Durable at checkpoints; safe against corruption under WAL.
+                "synchronous": "NORMAL",
+                # Negative values are KiB: a 64 MiB page cache per connection.
+                "cache_size": -int(env.get("DJANGO_SQLITE_CACHE_KIB", "65536")),
+                "temp_store": "MEMORY",
+            },
+        },
+    }
+
+
+def postgres_config(env):
+    config = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env.get("DJANGO_DB_NAME", "fieldflow"),
+        "USER": env.get("DJANGO_DB_USER", "fieldflow"),
+        "PASSWORD": env.get("DJANGO_DB_PASSWORD", ""),
+        "HOST": env.get("DJANGO_DB_HOST", "localhost"),
+        "PORT": env.get("DJANGO_DB_PORT", "5432"),
+        "CONN_MAX_AGE": int(env.get("DJANGO_DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "connect_timeout": int(env.get("DJANGO_DB_CONNECT_TIMEOUT", "5")),
+        },
+    }
+    pool_size = int(env.get("DJANGO_DB_POOL_SIZE", "0"))
+    if pool_size:
+        if django.VERSION < (5, 1):
+            raise ImproperlyConfigured(
+                "DJANGO_DB_POOL_SIZE needs Django 5.1+; use DJANGO_DB_CONN_MAX_AGE "
+                "or PgBouncer instead."
+            )
+        # Pooled connections are returned to the pool, not kept per thread.
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"]["pool"] = {
+            "min_size": int(env.get("DJANGO_DB_POOL_MIN_SIZE", "1")),
+            "max_size": pool_size,
+            "timeout": float(env.get("DJANGO_DB_POOL_TIMEOUT", "10")),
+        }
+    if _flag(env, "DJANGO_DB_PGBOUNCER"):
+        config["DISABLE_SERVER_SIDE_CURSORS"] = True
+    if env.get("DJANGO_DB_TEST_NAME"):
+        config["TEST"] = {"NAME": env["DJANGO_DB_TEST_NAME"]}
+    return config
+
+
+def database_config(env, base_dir):
+    engine = env.get("DJANGO_DB_ENGINE", "sqlite").lower()
+    if engine == "sqlite":
+        return sqlite_config(env, base_dir)
+    if engine in ("postgres", "postgresql"):
+        return postgres_config(env)
+    raise ImproperlyConfigured(f"Unsupported DJANGO_DB_ENGINE {engine!r}.")
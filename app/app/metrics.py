@@ -0,0 +1,363 @@
+"""
+In-process metrics with a Prometheus text endpoint.
+
+Counters and histograms live in a module-level registry and are updated
+in place; ``metrics_view`` renders them in the Prometheus text format
+(version 0.0.4) at /metrics.
+
+Gunicorn runs several worker processes and Celery runs its own, so one
+process only sees its share. With METRICS_MULTIPROC_DIR set, every
+process writes its values to ``<dir>/<host>-<pid>-<start>.json``, where
+start is when the process began counting. Containers sharing the
+directory then never collide, even though their pids repeat, and a
+reused pid gets a file of its own. Writes happen at most every
+METRICS_FLUSH_INTERVAL seconds, on the next update after the interval,
+and at exit. A scrape flushes its own process and adds up the files of
+all processes. Files of exited processes are kept, so counters never go
+backwards. A forked child starts from zero rather than re-counting what
+its parent inherited.
+
+The directory is emptied when the web service starts (entrypoint.sh),
+which resets the counters as a restart of a single process would.
+Celery workers do not empty it, since the web service may still be
+serving. Their files are rewritten with their full totals on the next
+update after a wipe, and a restarted worker adds a new file.
+
+/metrics needs ``Authorization: Bearer <METRICS_TOKEN>`` or a staff
+session, unless METRICS_PUBLIC is set.
+
+``MetricsMiddleware`` times every request per route and counts its
+queries. Other modules record cache lookups with ``cache_lookup`` and
+background job results with their own metrics.
+"""
+
+import atexit
+import glob
+import hmac
+import json
+import math
+import os
+import re
+import socket
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db import connections
+from django.http import HttpResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+# url_name -> route label; names not listed fall back by prefix.
+ROUTE_NAMES = {
+    "job-analytics": "analytics",
+    "job-throughput": "analytics",
+    "technician-dashboard": "dashboard",
+}
+ROUTE_PREFIXES = (
+    ("jobtask-", "job-tasks"),
+    ("job-", "jobs"),
+    ("equipment-", "equipment"),
+)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.started(os.getpid())
+
+    def started(self, pid):
+        self.pid = pid
+        self.flushed = 0.0
+        host = re.sub(r"[^A-Za-z0-9_.-]+", "-", socket.gethostname())
+        self.filename = f"{host}-{pid}-{time.time_ns()}.json"
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def check_fork(self):
+        # Values copied from the parent are the parent's to report.
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    for metric in self.metrics.values():
+                        metric.values.clear()
+                    self.started(os.getpid())
+
+    def directory(self):
+        return getattr(settings, "METRICS_MULTIPROC_DIR", None)
+
+    def updated(self):
+        directory = self.directory()
+        if not directory:
+            return
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0)
+        if time.monotonic() - self.flushed >= interval:
+            self.flush(directory)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: [[list(labels), value] for labels, value in metric.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def flush(self, directory=None):
+        directory = directory or self.directory()
+        if not directory:
+            return
+        self.check_fork()
+        self.flushed = time.monotonic()
+        path = os.path.join(directory, self.filename)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w") as stream:
+            json.dump(self.snapshot(), stream)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """{metric name: {labels: value}} over all processes."""
+        directory = self.directory()
+        if not directory:
+            self.check_fork()
+            return {name: dict(metric.items()) for name, metric in self.metrics.items()}
+        self.flush(directory)
+        totals = {name: {} for name in self.metrics}
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            try:
+                with open(path) as stream:
+                    snapshot = json.load(stream)
+            except (OSError, ValueError):
+                continue  # an exited process mid-write; skip it
+            for name, series in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for labels, value in series:
+                    key = tuple(labels)
+                    totals[name][key] = metric.merge(totals[name].get(key), value)
+        return totals
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        self.values = {}
+        registry.register(self)
+
+    def items(self):
+        return list(self.values.items())
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def label_text(self, labels, extra=()):
+        pairs = list(zip(self.labelnames, labels)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (
+            (name, value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+            for name, value in pairs
+        )
+        return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+    def update(self, labels, change):
+        self.registry.check_fork()
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = change(self.values.get(key))
+        self.registry.updated()
+
+    def expose(self, series):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in sorted(series.items()):
+            yield from self.lines(labels, value)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        self.update(labels, lambda value: (value or 0) + amount)
+
+    def merge(self, total, value):
+        return (total or 0) + value
+
+    def lines(self, labels, value):
+        yield f"{self.name}{self.label_text(labels)} {format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name,
+        documentation,
+        labelnames=(),
+        buckets=LATENCY_BUCKETS,
+        registry=REGISTRY,
+    ):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, amount, **labels):
+        # [count per bucket..., count above the last bucket, sum]
+        def change(value):
+            value = list(value or [0] * (len(self.buckets) + 2))
+            index = next(
+                (i for i, bound in enumerate(self.buckets) if amount <= bound),
+                len(self.buckets),
+            )
+            value[index] += 1
+            value[-1] += amount
+            return value
+
+        self.update(labels, change)
+
+    def merge(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def lines(self, labels, value):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), value):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else format_value(bound)
+            text = self.label_text(labels, [("le", le)])
+            yield f"{self.name}_bucket{text} {cumulative}"
+        text = self.label_text(labels)
+        yield f"{self.name}_sum{text} {format_value(value[-1])}"
+        yield f"{self.name}_count{text} {cumulative}"
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route.",
+    ["route", "method"],
+)
+DB_QUERIES = Counter(
+    "db_queries_total", "Database queries issued by requests.", ["route"]
+)
+DB_SECONDS = Counter(
+    "db_query_seconds_total", "Time requests spent in database queries.", ["route"]
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache lookups by cache and result.", ["cache", "result"]
+)
+OVERDUE_DURATION = Histogram(
+    "update_overdue_jobs_duration_seconds",
+    "Run time of update_overdue_jobs.",
+    buckets=JOB_BUCKETS,
+)
+OVERDUE_FLIPPED = Counter(
+    "update_overdue_jobs_flipped_total", "Jobs flagged overdue by update_overdue_jobs."
+)
+
+
+def cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def route_label(request):
+    match = getattr(request, "resolver_match", None)
+    name = match.url_name if match else None
+    if name in ROUTE_NAMES:
+        return ROUTE_NAMES[name]
+    for prefix, label in ROUTE_PREFIXES:
+        if name and name.startswith(prefix):
+            return label
+    return "other"
+
+
+def render(registry=REGISTRY):
+    collected = registry.collect()
+    lines = []
+    for name, metric in registry.metrics.items():
+        lines += metric.expose(collected.get(name, {}))
+
+    # Derived: hit ratio per cache from the aggregated lookups.
+    lookups = {}
+    for (cache, result), count in collected.get(CACHE_LOOKUPS.name, {}).items():
+        lookups.setdefault(cache, {})[result] = count
+    lines.append("# HELP cache_hit_ratio Share of cache lookups that were hits.")
+    lines.append("# TYPE cache_hit_ratio gauge")
+    for cache, counts in sorted(lookups.items()):
+        total = sum(counts.values())
+        ratio = counts.get("hit", 0) / total if total else 0.0
+        lines.append(f'cache_hit_ratio{{cache="{cache}"}} {ratio:.6g}')
+    return "\n".join(lines) + "\n"
+
+
+def may_scrape(request):
+    if getattr(settings, "METRICS_PUBLIC", False):
+        return True
+    token = getattr(settings, "METRICS_TOKEN", "")
+    supplied = request.headers.get("Authorization", "")
+    if token and hmac.compare_digest(supplied, f"Bearer {token}"):
+        return True
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+def metrics_view(request):
+    """GET /metrics: Prometheus text format for the token, staff or anyone if public."""
+    if not may_scrape(request):
+        raise PermissionDenied
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+class MetricsMiddleware:
+    """Request latency and query counts per route (unless METRICS_ENABLED=False)."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0, 0.0]
+
+        def count(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(count))
+            response = self.get_response(request)
+        route = route_label(request)
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started, route=route, method=request.method
+        )
+        if queries[0]:
+            DB_QUERIES.inc(queries[0], route=route)
+            DB_SECONDS.inc(queries[1], route=route)
+        return response
@@ -0,0 +1,314 @@
+"""
+Sampling profiler for production requests and Celery tasks.
+
+A ``Sampler`` thread looks at the stack of one thread every
+PROFILING_INTERVAL seconds (``sys._current_frames``) and counts the
+stacks it sees. The profiled code is not traced, so the overhead does
+not grow with the number of calls. Sampling stops after
+PROFILING_MAX_SECONDS, and at most PROFILING_MAX_CONCURRENT profiles run
+in a process at once; further requests simply go unprofiled.
+
+Profiles are written in the collapsed-stack format read by flamegraph.pl,
+speedscope and similar tools (one ``frame;frame;frame count`` line per
+stack), to PROFILING_DIR as ``<utc time>-<pid>-<label>.folded``. The
+directory is a ring buffer: once it holds PROFILING_MAX_FILES profiles,
+the oldest are deleted.
+
+Nothing is profiled unless PROFILING_ENABLED is set. Then:
+
+* ``ProfilingMiddleware`` profiles PROFILING_SAMPLE_RATE of the requests
+  to views in PROFILING_VIEW_MODULES (jobs.views), and any request from
+  an admin carrying an ``X-Profile`` header. Such requests get the name
+  of their profile back in the ``X-Profile`` response header;
+* tasks named in PROFILING_TASKS (``update_overdue_jobs`` or the full
+  ``jobs.tasks.update_overdue_jobs``) are profiled on every run, and
+  any task for the next runs armed with ``manage.py profile arm``
+  (which needs a default cache shared between processes).
+
+``manage.py profile`` also lists the stored profiles and runs a task in
+its own process under the profiler.
+"""
+
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from rest_framework import exceptions
+
+from .caches import is_process_local
+
+HEADER = "X-Profile"
+SUFFIX = ".folded"
+# Distinct stacks kept per profile; further ones count as "[truncated]".
+MAX_STACKS = 5000
+
+_running = 0
+_running_lock = threading.Lock()
+_task_profiles = {}
+
+
+def directory():
+    default = os.path.join(tempfile.gettempdir(), "profiles")
+    return getattr(settings, "PROFILING_DIR", default)
+
+
+def frame_name(frame):
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def collapse(frame):
+    """Stack of ``frame`` from the outermost call, as frame names."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return tuple(names)
+
+
+class Sampler:
+    """Counts the stacks of one thread, sampled from a background thread."""
+
+    def __init__(self, thread_id, interval, max_seconds):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks = {}
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name="profiling-sampler", daemon=True
+        )
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return self.stacks
+
+    def run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self.stopped.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or time.monotonic() > deadline:
+                return
+            self.record(collapse(frame))
+            del frame
+            self.stopped.wait(self.interval)
+
+    def record(self, stack):
+        if stack not in self.stacks and len(self.stacks) >= MAX_STACKS:
+            stack = ("[truncated]",)
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+
+def folded(stacks):
+    return "".join(
+        f"{';'.join(stack)} {count}\n"
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1])
+    )
+
+
+def profiles(path=None):
+    """Stored profile file names, oldest first."""
+    path = path or directory()
+    try:
+        names = os.listdir(path)
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if name.endswith(SUFFIX))
+
+
+def store(label, stacks):
+    """Write a profile to the ring buffer and drop the oldest; its file name."""
+    path = directory()
+    os.makedirs(path, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%f")
+    label = re.sub(r"[^A-Za-z0-9_.-]+", "-", label).strip("-")[:80]
+    name = f"{stamp}-{os.getpid()}-{label}{SUFFIX}"
+    temporary = os.path.join(path, f".{name}.tmp")
+    with open(temporary, "w") as stream:
+        stream.write(folded(stacks))
+    os.replace(temporary, os.path.join(path, name))
+
+    stored = profiles(path)
+    keep = getattr(settings, "PROFILING_MAX_FILES", 100)
+    for old in stored[: max(len(stored) - keep, 0)]:
+        try:
+            os.remove(os.path.join(path, old))
+        except FileNotFoundError:
+            pass  # another process pruned it first
+    return name
+
+
+class Profile:
+    def __init__(self, label):
+        self.label = label
+        self.name = None
+        # Asked for with the X-Profile header rather than sampled.
+        self.requested = False
+        self.sampler = Sampler(
+            threading.get_ident(),
+            getattr(settings, "PROFILING_INTERVAL", 0.005),
+            getattr(settings, "PROFILING_MAX_SECONDS", 60),
+        )
+
+    def start(self):
+        self.sampler.start()
+        return self
+
+    def finish(self):
+        """Stop sampling and store the profile; its file name."""
+        global _running
+        stacks = self.sampler.stop()
+        with _running_lock:
+            _running -= 1
+        # Work shorter than one interval leaves an empty profile.
+        self.name = store(self.label, stacks)
+        return self.name
+
+
+def start(label):
+    """A started Profile of the current thread, or None when at capacity."""
+    global _running
+    with _running_lock:
+        if _running >= getattr(settings, "PROFILING_MAX_CONCURRENT", 2):
+            return None
+        _running += 1
+    return Profile(label).start()
+
+
+@contextmanager
+def profiled(label):
+    """Profile the block; yields the Profile (None at capacity)."""
+    profile = start(label)
+    try:
+        yield profile
+    finally:
+        if profile is not None:
+            profile.finish()
+
+
+def enabled():
+    return getattr(settings, "PROFILING_ENABLED", False)
+
+
+def is_admin(request):
+    """Whether the request comes from an admin (token or session)."""
+    from user.authentication import CachedTokenAuthentication
+
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        try:
+            user, _ = CachedTokenAuthentication().authenticate(request) or (None, None)
+        except exceptions.APIException:
+            return False
+    return user is not None and (user.role == "Admin" or user.is_staff)
+
+
+def view_module(view_func):
+    view = getattr(view_func, "cls", None) or view_func
+    return view.__module__
+
+
+class ProfilingMiddleware:
+    """Profiles sampled jobs.views requests and admin X-Profile requests."""
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+        self.view_modules = getattr(settings, "PROFILING_VIEW_MODULES", ("jobs.views",))
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        profile = getattr(request, "_profile", None)
+        if profile is not None:
+            name = profile.finish()
+            if profile.requested:
+                response[HEADER] = name
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        requested = HEADER in request.headers and is_admin(request)
+        sampled = (
+            not requested
+            and view_module(view_func) in self.view_modules
+            and random.random() < self.sample_rate
+        )
+        if requested or sampled:
+            match = request.resolver_match
+            label = f"{request.method}-{match.url_name or match.route}"
+            profile = start(label)
+            if profile is not None:
+                profile.requested = requested
+                request._profile = profile
+        return None
+
+
+def arm_key(task_name):
+    return f"profiling:armed:{task_name.rsplit('.', 1)[-1]}"
+
+
+def arm(task_name, count, timeout=3600):
+    """
+    Profile the next ``count`` runs of a task, in whichever worker. The
+    count lives in the default cache, so workers only see it if that
+    cache is shared between processes.
+    """
+    if is_process_local(caches["default"]):
+        raise ImproperlyConfigured(
+            "Arming needs a default cache shared with the workers "
+            "(DJANGO_CACHE_BACKEND=file or redis)."
+        )
+    cache.set(arm_key(task_name), count, timeout)
+
+
+def take_armed(task_name):
+    key = arm_key(task_name)
+    if not cache.get(key):
+        return False
+    try:
+        return cache.decr(key) >= 0
+    except ValueError:
+        return False  # expired or used up meanwhile
+
+
+def wants_task(task_name):
+    configured = getattr(settings, "PROFILING_TASKS", ())
+    short = task_name.rsplit(".", 1)[-1]
+    return task_name in configured or short in configured or take_armed(task_name)
+
+
+def task_started(task_id=None, task=None, **kwargs):
+    if enabled() and task is not None and wants_task(task.name):
+        profile = start(f"task-{task.name.rsplit('.', 1)[-1]}")
+        if profile is not None:
+            _task_profiles[task_id] = profile
+
+
+def task_finished(task_id=None, **kwargs):
+    profile = _task_profiles.pop(task_id, None)
+    if profile is not None:
+        profile.finish()
+
+
+def connect_task_signals():
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(task_started, dispatch_uid="profiling-task-started")
+    task_postrun.connect(task_finished, dispatch_uid="profiling-task-finished")
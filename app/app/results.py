@@ -0,0 +1,35 @@
+"""
+CELERY_RESULT_BACKEND from the environment.
+
+Chords count their finished headers in the result backend, so workers
+must share it, or ``finish_batch`` never runs and a fanned-out pass
+holds its lock until it times out. Without CELERY_RESULT_BACKEND:
+
+* an in-memory broker (eager tasks) keeps results in memory;
+* a Redis broker keeps them on the same server;
+* any other broker is refused, as there is no backend to share.
+
+An in-memory result backend is refused unless tasks run eagerly.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+SHARED_BROKERS = ("redis://", "rediss://")
+
+
+def result_backend(env, broker_url, eager):
+    backend = env.get("CELERY_RESULT_BACKEND")
+    if not backend:
+        if broker_url.startswith("memory://"):
+            backend = "cache+memory://"
+        elif broker_url.startswith(SHARED_BROKERS):
+            backend = broker_url
+        else:
+            raise ImproperlyConfigured(
+                "CELERY_RESULT_BACKEND is required with this CELERY_BROKER_URL."
+            )
+    if not eager and backend.endswith("memory://"):
+        raise ImproperlyConfigured(
+            "Workers need a shared CELERY_RESULT_BACKEND, not an in-memory one."
+        )
+    return backend
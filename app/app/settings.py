@@ -10,6 +10,10 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 import os
 from pathlib import Path
 
+from .caches import cache_config
+from .database import database_config
+from .results import result_backend
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -39,6 +43,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Request latency and query counts for /metrics; see app/metrics.py.
+    "app.metrics.MetricsMiddleware",
+    # Removes itself unless REQUEST_TIMING_ENABLED; see app/timing.py.
+    "app.timing.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -46,6 +54,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Removes itself unless PROFILING_ENABLED; see app/profiling.py.
+    "app.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "app.urls"
@@ -72,13 +82,17 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
-DB_PATH = os.environ.get("DJANGO_DB_PATH", str(BASE_DIR / "db.sqlite3"))
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": DB_PATH,
-    }
-}
+# DJANGO_DB_ENGINE=sqlite (default, DJANGO_DB_PATH) or postgres; see app/database.py.
+
+DATABASES = {"default": database_config(os.environ, BASE_DIR)}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# DJANGO_CACHE_BACKEND=file (default), locmem or redis; see app/caches.py.
+
+CACHES = {"default": cache_config(os.environ, BASE_DIR)}
 
 
 # Password validation
@@ -135,20 +149,132 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "user.authentication.CachedTokenAuthentication",
     ],
+    # Keyset pagination; viewsets pick their own index-backed ordering and
+    # clients may request up to KeysetPagination.max_page_size via ?page_size=.
+    "DEFAULT_PAGINATION_CLASS": "jobs.pagination.KeysetPagination",
+    "PAGE_SIZE": int(os.environ.get("API_PAGE_SIZE", "50")),
 }
 
 
+# Delta sync: tokens older than the tombstone retention get a full resync.
+SYNC_TOMBSTONE_RETENTION_DAYS = int(
+    os.environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", "30")
+)
+# Rows per /api/sync/ page; clients follow has_more with the returned token.
+SYNC_PAGE_SIZE = int(os.environ.get("SYNC_PAGE_SIZE", "1000"))
+
+# Per-request SQL/serialize/render timings (Server-Timing header and the
+# app.timing logger) for a sample of requests; see app/timing.py.
+REQUEST_TIMING_ENABLED = (
+    os.environ.get("REQUEST_TIMING_ENABLED", "False").lower() == "true"
+)
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get("REQUEST_TIMING_SAMPLE_RATE", "1.0"))
+REQUEST_TIMING_SLOW_MS = float(os.environ.get("REQUEST_TIMING_SLOW_MS", "500"))
+
+# /metrics. Set METRICS_MULTIPROC_DIR (emptied at startup) when several
+# processes serve or work, so the endpoint adds up all of them.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True").lower() == "true"
+METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR") or None
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "1.0"))
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; staff sessions may
+# look too. METRICS_PUBLIC=true opens the endpoint to anyone.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+METRICS_PUBLIC = os.environ.get("METRICS_PUBLIC", "False").lower() == "true"
+
+# Sampling profiler: a share of jobs.views requests, admin requests with an
+# X-Profile header and the listed Celery tasks write collapsed stacks to a
+# bounded directory; see app/profiling.py and `manage.py profile`.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "False").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0.0"))
+PROFILING_TASKS = [
+    name.strip()
+    for name in os.environ.get("PROFILING_TASKS", "").split(",")
+    if name.strip()
+]
+PROFILING_DIR = os.environ.get("PROFILING_DIR", "/tmp/profiles")
+PROFILING_MAX_FILES = int(os.environ.get("PROFILING_MAX_FILES", "100"))
+PROFILING_INTERVAL = float(os.environ.get("PROFILING_INTERVAL", "0.005"))
+PROFILING_MAX_SECONDS = float(os.environ.get("PROFILING_MAX_SECONDS", "60"))
+PROFILING_MAX_CONCURRENT = int(os.environ.get("PROFILING_MAX_CONCURRENT", "2"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "app.timing": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
 SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
 
 from celery.schedules import crontab  # noqa
 
+# Celery (app/celery.py). Without a broker, tasks run eagerly in process
+# with in-memory results. The scheduled tasks take a lock in the default
+# cache so runs never overlap, which needs a cache shared by all workers
+# (DJANGO_CACHE_BACKEND=redis) once they are separate processes. Results
+# default to the Redis broker, since chords need them shared; see
+# app/results.py.
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "memory://")
+CELERY_TASK_ALWAYS_EAGER = (
+    os.environ.get(
+        "CELERY_TASK_ALWAYS_EAGER",
+        str(CELERY_BROKER_URL.startswith("memory://")),
+    ).lower()
+    == "true"
+)
+CELERY_RESULT_BACKEND = result_backend(
+    os.environ, CELERY_BROKER_URL, CELERY_TASK_ALWAYS_EAGER
+)
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_STORE_EAGER_RESULT = CELERY_TASK_ALWAYS_EAGER
+CELERY_TASK_SERIALIZER = "json"
+CELERY_RESULT_EXPIRES = 24 * 3600
+# Batch ranges are long and idempotent: fetch one at a time so they spread
+# over the workers, and redeliver them if a worker dies mid-range.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_DEFAULT_QUEUE = "realtime"
+CELERY_TASK_ROUTES = {
+    f"jobs.tasks.{name}": {"queue": "maintenance"}
+    for name in (
+        "reconcile_overdue_jobs",
+        "reconcile_overdue_range",
+        "reconcile_analytics_rollups",
+        "rebuild_job_rollups_range",
+        "rebuild_equipment_usage_range",
+        "finish_batch",
+        "prune_sync_tombstones",
+    )
+}
+# Job ids per range task of the nightly passes.
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", "5000"))
+
 CELERY_BEAT_SCHEDULE = {
-    "update-overdue-jobs-every-10min": {
+    # Only pops jobs whose deadline passed; writes keep the rest current.
+    # Runs still queued when the next one is due are dropped.
+    "update-overdue-jobs-every-minute": {
         "task": "jobs.tasks.update_overdue_jobs",
-        "schedule": 600.0,  # every 10 minutes
+        "schedule": 60.0,
+        "options": {"expires": 55},
+    },
+    "reconcile-overdue-jobs-nightly": {
+        "task": "jobs.tasks.reconcile_overdue_jobs",
+        "schedule": crontab(hour=3, minute=0),
+        "options": {"expires": 3600},
+    },
+    "prune-sync-tombstones-nightly": {
+        "task": "jobs.tasks.prune_sync_tombstones",
+        "schedule": crontab(hour=3, minute=30),
+        "options": {"expires": 3600},
+    },
+    "reconcile-analytics-rollups-nightly": {
+        "task": "jobs.tasks.reconcile_analytics_rollups",
+        "schedule": crontab(hour=3, minute=45),
+        "options": {"expires": 3600},
     },
 }
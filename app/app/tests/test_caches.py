@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from app.caches import cache_config
+
+
+def test_shared_file_cache_is_the_default():
+    config = cache_config({}, Path("/app"))
+    assert config["BACKEND"].endswith("FileBasedCache")
+    assert config["LOCATION"] == "/app/cache"
+    assert config["OPTIONS"]["MAX_ENTRIES"] == 10000
+
+
+def test_locmem_and_redis_settings_from_env():
+    config = cache_config({"DJANGO_CACHE_BACKEND": "locmem"}, Path("/app"))
+    assert config["BACKEND"].endswith("LocMemCache")
+
+    env = {
+        "DJANGO_CACHE_BACKEND": "redis",
+        "DJANGO_CACHE_LOCATION": "redis://primary:6379/1,redis://replica:6379/1",
+        "DJANGO_CACHE_TIMEOUT": "60",
+    }
+    config = cache_config(env, Path("/app"))
+    assert config["BACKEND"] == "django.core.cache.backends.redis.RedisCache"
+    assert config["LOCATION"] == ["redis://primary:6379/1", "redis://replica:6379/1"]
+    assert config["TIMEOUT"] == 60
+
+    with pytest.raises(ImproperlyConfigured):
+        cache_config({"DJANGO_CACHE_BACKEND": "redis"}, Path("/app"))
+    with pytest.raises(ImproperlyConfigured):
+        cache_config({"DJANGO_CACHE_BACKEND": "memcached"}, Path("/app"))
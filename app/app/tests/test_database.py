@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+
+from app.database import database_config
+
+
+def test_sqlite_is_the_default():
+    config = database_config({"DJANGO_DB_PATH": "/data/db.sqlite3"}, Path("/app"))
+    assert config["ENGINE"] == "app.backends.sqlite3"
+    assert config["NAME"] == "/data/db.sqlite3"
+    assert config["OPTIONS"]["pragmas"]["journal_mode"] == "WAL"
+
+
+def test_postgres_settings_from_env():
+    env = {
+        "DJANGO_DB_ENGINE": "postgres",
+        "DJANGO_DB_HOST": "db",
+        "DJANGO_DB_PASSWORD": "secret",
+        "DJANGO_DB_CONN_MAX_AGE": "300",
+        "DJANGO_DB_PGBOUNCER": "true",
+    }
+    config = database_config(env, Path("/app"))
+    assert config["ENGINE"] == "django.db.backends.postgresql"
+    assert (config["HOST"], config["PASSWORD"]) == ("db", "secret")
+    assert config["CONN_MAX_AGE"] == 300 and config["CONN_HEALTH_CHECKS"]
+    assert config["DISABLE_SERVER_SIDE_CURSORS"] is True
+
+    with pytest.raises(ImproperlyConfigured):
+        database_config({"DJANGO_DB_ENGINE": "oracle"}, Path("/app"))
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite backend only")
+def test_sqlite_connections_are_tuned():
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        assert cursor.fetchone()[0] == 1  # NORMAL
+        cursor.execute("PRAGMA cache_size")
+        assert cursor.fetchone()[0] < 0
+    with transaction.atomic():
+        assert connection.in_atomic_block
+    assert connection.transaction_mode == "IMMEDIATE"
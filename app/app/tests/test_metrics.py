@@ -0,0 +1,105 @@
+import json
+import re
+import socket
+
+import pytest
+from rest_framework.test import APIClient
+
+from app.metrics import Counter, Histogram, Registry, render
+from jobs.models import Job
+from jobs.tasks import update_overdue_jobs
+
+
+def sample(text, series):
+    """Value of one exposed series, or None."""
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_routes_queries_and_caches(settings, user_factory):
+    settings.METRICS_TOKEN = "s3cret"
+    admin = user_factory(role="Admin")
+    tech = user_factory(role="Technician")
+    Job.objects.create(title="J", client_name="C", created_by=admin)
+    client = APIClient()
+    before = client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+    before = before.content.decode()
+    jobs_bucket = 'http_request_duration_seconds_count{route="jobs",method="GET"}'
+
+    client.force_authenticate(user=admin)
+    assert client.get("/api/jobs/").status_code == 200
+    client.force_authenticate(user=tech)
+    client.get("/api/technician-dashboard/")
+    client.get("/api/technician-dashboard/")
+    update_overdue_jobs()
+
+    resp = APIClient().get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+    assert resp.status_code == 200
+    assert resp["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = resp.content.decode()
+    assert sample(text, jobs_bucket) == (sample(before, jobs_bucket) or 0) + 1
+    assert sample(text, 'db_queries_total{route="jobs"}') > 0
+    assert sample(
+        text, 'http_request_duration_seconds_count{route="dashboard",method="GET"}'
+    )
+    assert 0 < sample(text, 'cache_hit_ratio{cache="dashboard"}') < 1
+    assert sample(text, "update_overdue_jobs_duration_seconds_count") >= 1
+    assert "# TYPE update_overdue_jobs_flipped_total counter" in text
+
+
+@pytest.mark.django_db
+def test_metrics_are_closed_unless_authorized_or_public(settings, user_factory):
+    settings.METRICS_TOKEN = ""
+    assert APIClient().get("/metrics").status_code == 403
+    assert APIClient().get("/metrics", HTTP_AUTHORIZATION="Bearer ").status_code == 403
+
+    settings.METRICS_TOKEN = "s3cret"
+    assert APIClient().get("/metrics").status_code == 403
+    resp = APIClient().get("/metrics", HTTP_AUTHORIZATION="Bearer wrong")
+    assert resp.status_code == 403
+    resp = APIClient().get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+    assert resp.status_code == 200
+
+    client = APIClient()
+    staff = user_factory(role="Admin")
+    client.force_login(staff)
+    assert client.get("/metrics").status_code == 403
+    type(staff).objects.filter(pk=staff.pk).update(is_staff=True)
+    assert client.get("/metrics").status_code == 200
+
+    settings.METRICS_PUBLIC = True
+    assert APIClient().get("/metrics").status_code == 200
+
+
+def test_multiprocess_mode_adds_up_process_files(settings, tmp_path):
+    settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+    registry = Registry()
+    hits = Counter("hits_total", "Hits.", ["route"], registry=registry)
+    latency = Histogram(
+        "latency_seconds", "Latency.", buckets=(1, 5), registry=registry
+    )
+    hits.inc(2, route="jobs")
+    latency.observe(0.5)
+    # Another worker's file, and a half-written one that is skipped.
+    other = {"hits_total": [[["jobs"], 3]], "latency_seconds": [[[], [0, 1, 1, 7.0]]]}
+    (tmp_path / "99999.json").write_text(json.dumps(other))
+    (tmp_path / "99998.json").write_text("{")
+
+    text = render(registry)
+    assert sample(text, 'hits_total{route="jobs"}') == 5
+    assert sample(text, 'latency_seconds_bucket{le="1"}') == 1
+    assert sample(text, 'latency_seconds_bucket{le="5"}') == 2
+    assert sample(text, 'latency_seconds_bucket{le="+Inf"}') == 3
+    assert sample(text, "latency_seconds_sum") == 7.5
+    own = tmp_path / registry.filename
+    assert own.exists()
+    assert registry.filename.startswith(f"{socket.gethostname()}-{registry.pid}-")
+
+    # A forked child does not report what it inherited from its parent,
+    # and writes a file of its own.
+    registry.pid = -1
+    hits.inc(route="jobs")
+    assert hits.values == {("jobs",): 1}
+    registry.flush()
+    assert (tmp_path / registry.filename).exists() and registry.filename != own.name
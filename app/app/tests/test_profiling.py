@@ -0,0 +1,145 @@
+import os
+import time
+
+import pytest
+from django.core.management import CommandError, call_command
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app import profiling
+from app.caches import cache_config
+from jobs.tasks import update_overdue_jobs
+
+
+def busy_wait(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+@pytest.fixture
+def profiles_dir(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_DIR = str(tmp_path)
+    settings.PROFILING_INTERVAL = 0.001
+    return tmp_path
+
+
+def read(directory, name):
+    return (directory / name).read_text()
+
+
+def test_profiles_are_collapsed_stacks_in_a_ring_buffer(profiles_dir, settings):
+    settings.PROFILING_MAX_FILES = 2
+    names = []
+    for _ in range(3):
+        with profiling.profiled("busy") as profile:
+            busy_wait(0.05)
+        names.append(profile.name)
+
+    assert profiling.profiles() == names[1:]
+    lines = read(profiles_dir, names[-1]).splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert stack.endswith(f"{__name__}:busy_wait")
+    assert f"{__name__}:test_profiles_are_collapsed_stacks_in_a_ring_buffer" in stack
+
+
+def test_concurrent_profiles_are_capped(profiles_dir, settings):
+    settings.PROFILING_MAX_CONCURRENT = 1
+    with profiling.profiled("outer") as outer:
+        with profiling.profiled("inner") as inner:
+            busy_wait(0.01)
+    assert outer is not None and inner is None
+
+
+@pytest.mark.django_db
+def test_admin_header_profiles_any_request(profiles_dir, user_factory):
+    admin = user_factory(role="Admin")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=admin)}")
+
+    assert profiling.HEADER not in client.get("/api/jobs/")
+    resp = client.get("/api/jobs/", HTTP_X_PROFILE="1")
+    assert resp.status_code == 200
+    name = resp[profiling.HEADER]
+    assert "GET-job-list" in name
+    assert (profiles_dir / name).exists()
+
+
+@pytest.mark.django_db
+def test_header_from_non_admins_is_ignored(profiles_dir, user_factory):
+    tech = user_factory(role="Technician")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=tech)}")
+    resp = client.get("/api/jobs/", HTTP_X_PROFILE="1")
+    assert profiling.HEADER not in resp
+    assert APIClient().get("/api/jobs/", HTTP_X_PROFILE="1").status_code == 401
+    assert profiling.profiles() == []
+
+
+@pytest.mark.django_db
+def test_sampled_requests_are_limited_to_jobs_views(
+    profiles_dir, settings, user_factory
+):
+    settings.PROFILING_SAMPLE_RATE = 1.0
+    client = APIClient()
+    client.force_authenticate(user=user_factory(role="Admin"))
+    client.get("/api/jobs/")
+    client.get("/api/user/me/")
+    (name,) = profiling.profiles()
+    assert "job-list" in name
+
+
+@pytest.mark.django_db
+def test_disabled_profiler_does_nothing(profiles_dir, settings, user_factory):
+    settings.PROFILING_ENABLED = False
+    settings.PROFILING_SAMPLE_RATE = 1.0
+    settings.PROFILING_TASKS = ["update_overdue_jobs"]
+    admin = user_factory(role="Admin")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=admin)}")
+    assert profiling.HEADER not in client.get("/api/jobs/", HTTP_X_PROFILE="1")
+    update_overdue_jobs.apply()
+    assert profiling.profiles() == []
+
+
+@pytest.mark.django_db
+def test_named_and_armed_tasks_are_profiled(profiles_dir, settings, tmp_path):
+    update_overdue_jobs.apply()
+    assert profiling.profiles() == []
+
+    settings.PROFILING_TASKS = ["update_overdue_jobs"]
+    update_overdue_jobs.apply()
+    assert len(profiling.profiles()) == 1
+
+    settings.PROFILING_TASKS = []
+    # The workers would never see a count armed in this process only.
+    with pytest.raises(CommandError, match="shared"):
+        call_command("profile", "arm", "update_overdue_jobs")
+    settings.CACHES = {
+        "default": cache_config(
+            {
+                "DJANGO_CACHE_BACKEND": "file",
+                "DJANGO_CACHE_LOCATION": str(tmp_path / "cache"),
+            },
+            settings.BASE_DIR,
+        )
+    }
+    call_command("profile", "arm", "update_overdue_jobs", "--count", "1")
+    update_overdue_jobs.apply()
+    update_overdue_jobs.apply()
+    names = profiling.profiles()
+    assert len(names) == 2
+    assert all("task-update_overdue_jobs" in name for name in names)
+
+
+@pytest.mark.django_db
+def test_profile_command_runs_and_lists(profiles_dir, capsys):
+    call_command("profile", "run", "update_overdue_jobs")
+    path = capsys.readouterr().out.splitlines()[-1]
+    assert os.path.dirname(path) == str(profiles_dir)
+    assert "task-update_overdue_jobs" in path
+
+    call_command("profile", "list")
+    assert path in capsys.readouterr().out
@@ -0,0 +1,23 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from app.results import result_backend
+
+
+def test_results_follow_the_broker():
+    assert result_backend({}, "memory://", eager=True) == "cache+memory://"
+    broker = "redis://broker:6379/0"
+    assert result_backend({}, broker, eager=False) == broker
+
+    env = {"CELERY_RESULT_BACKEND": "redis://results:6379/2"}
+    assert result_backend(env, broker, eager=False) == "redis://results:6379/2"
+
+
+def test_workers_need_a_shared_result_backend():
+    with pytest.raises(ImproperlyConfigured):
+        result_backend({}, "amqp://broker//", eager=False)
+    env = {"CELERY_RESULT_BACKEND": "cache+memory://"}
+    with pytest.raises(ImproperlyConfigured):
+        result_backend(env, "redis://broker:6379/0", eager=False)
+    with pytest.raises(ImproperlyConfigured):
+        result_backend({}, "memory://", eager=False)
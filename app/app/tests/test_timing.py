@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+from rest_framework.test import APIClient
+
+from app.timing import Recorder, current, timed
+from jobs.models import Job
+
+
+@pytest.fixture
+def timed_client(settings, user_factory):
+    settings.REQUEST_TIMING_ENABLED = True
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1.0
+    settings.REQUEST_TIMING_SLOW_MS = 10_000
+    admin = user_factory(role="Admin")
+    Job.objects.create(title="J", client_name="C", created_by=admin)
+    # The middleware chain is built on the client's first request.
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+
+@pytest.mark.django_db
+def test_server_timing_header_and_log_line(timed_client, caplog):
+    with caplog.at_level(logging.INFO, logger="app.timing"):
+        resp = timed_client.get("/api/jobs/")
+    assert resp.status_code == 200
+    header = resp["Server-Timing"]
+    names = [part.split(";")[0] for part in header.split(", ")]
+    assert names == ["sql", "serialize", "render", "total"]
+    assert 'queries"' in header
+    (record,) = caplog.records
+    assert record.levelname == "INFO"
+    assert "method=GET path=/api/jobs/ status=200" in record.getMessage()
+    assert "queries=" in record.getMessage()
+
+
+@pytest.mark.django_db
+def test_slow_requests_log_their_sql(timed_client, settings, caplog):
+    settings.REQUEST_TIMING_SLOW_MS = 0
+    with caplog.at_level(logging.INFO, logger="app.timing"):
+        timed_client.get("/api/jobs/")
+    (record,) = caplog.records
+    assert record.levelname == "WARNING"
+    assert "slow request" in record.getMessage()
+    assert 'FROM "jobs_job"' in record.getMessage()
+
+
+@pytest.mark.django_db
+def test_unsampled_and_disabled_requests_are_untouched(settings):
+    settings.REQUEST_TIMING_ENABLED = True
+    settings.REQUEST_TIMING_SAMPLE_RATE = 0.0
+    assert "Server-Timing" not in APIClient().get("/api/jobs/")
+
+    settings.REQUEST_TIMING_ENABLED = False
+    assert "Server-Timing" not in APIClient().get("/api/jobs/")
+
+
+def test_timed_sections_count_once_when_nested():
+    assert current.get() is None
+    with timed("serialize"):  # outside a request: nothing to record
+        pass
+    recorder = Recorder()
+    token = current.set(recorder)
+    try:
+        with timed("serialize"):
+            with timed("serialize"):
+                pass
+    finally:
+        current.reset(token)
+    assert list(recorder.durations) == ["serialize"]
+    assert recorder.depth == {"serialize": 0}
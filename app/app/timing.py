@@ -0,0 +1,184 @@
+"""
+Opt-in per-request timing: SQL, serialization and rendering.
+
+``RequestTimingMiddleware`` is listed in MIDDLEWARE but removes itself at
+startup unless REQUEST_TIMING_ENABLED is set. When enabled, it samples
+REQUEST_TIMING_SAMPLE_RATE of the requests. A request that is not
+sampled costs one random() call. For a sampled request it records:
+
+* ``sql``: the number of queries and the time spent in them, through a
+  database execute wrapper;
+* ``serialize``: time in DRF ``serializer.data`` and in the jobs fast
+  read path (``RowReader.render``). It includes the queries those issue
+  for nested data;
+* ``render``: time turning the response into bytes (DRF renderers,
+  templates);
+* ``total``: the whole request below this middleware.
+
+The numbers go out as a ``Server-Timing`` header (shown by browser dev
+tools) and as one ``key=value`` log line on the ``app.timing`` logger.
+Requests slower than REQUEST_TIMING_SLOW_MS also log their slowest
+statements, up to REQUEST_TIMING_SLOW_QUERIES of them, at WARNING level.
+
+Code can time its own sections with ``timed(name)``. It does nothing
+outside a sampled request, and nested sections of the same name are
+counted once.
+"""
+
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Statements kept per request for the slow-request report.
+MAX_CAPTURED_QUERIES = 1000
+
+current = ContextVar("request_timing", default=None)
+
+
+class Recorder:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.depth = {}
+        self.queries = []
+        self.query_count = 0
+        self.sql_ms = 0.0
+
+    def add(self, name, ms):
+        self.durations[name] = self.durations.get(name, 0.0) + ms
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            self.query_count += 1
+            self.sql_ms += ms
+            if len(self.queries) < MAX_CAPTURED_QUERIES:
+                self.queries.append((ms, sql))
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def metrics(self, total_ms):
+        """(name, ms, description) in Server-Timing order."""
+        yield "sql", self.sql_ms, f"{self.query_count} queries"
+        for name in ("serialize", "render"):
+            if name in self.durations:
+                yield name, self.durations[name], None
+        yield "total", total_ms, None
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to ``name`` of the current request."""
+    recorder = current.get()
+    if recorder is None or recorder.depth.get(name):
+        yield
+        return
+    recorder.depth[name] = 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.depth[name] = 0
+        recorder.add(name, (time.perf_counter() - started) * 1000)
+
+
+def server_timing(recorder, total_ms):
+    parts = []
+    for name, ms, description in recorder.metrics(total_ms):
+        part = f"{name};dur={ms:.1f}"
+        if description:
+            part += f';desc="{description}"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+def instrument_serializers():
+    """Time DRF ``serializer.data`` (once per process)."""
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data
+    if getattr(data.fget, "timed", False):
+        return
+
+    def timed_data(self):
+        with timed("serialize"):
+            return data.fget(self)
+
+    timed_data.timed = True
+    BaseSerializer.data = property(timed_data)
+
+
+class RequestTimingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_TIMING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "REQUEST_TIMING_SAMPLE_RATE", 1.0)
+        self.slow_ms = getattr(settings, "REQUEST_TIMING_SLOW_MS", 500)
+        self.slow_queries = getattr(settings, "REQUEST_TIMING_SLOW_QUERIES", 10)
+        instrument_serializers()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = Recorder()
+        token = current.set(recorder)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(recorder.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        total_ms = recorder.total_ms()
+        response["Server-Timing"] = server_timing(recorder, total_ms)
+        self.log(request, response, recorder, total_ms)
+        return response
+
+    def process_template_response(self, request, response):
+        # Runs just before the response is rendered; the callback just after.
+        recorder = current.get()
+        if recorder is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                recorder.add("render", (time.perf_counter() - started) * 1000)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def log(self, request, response, recorder, total_ms):
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "queries": recorder.query_count,
+            "sql_ms": round(recorder.sql_ms, 1),
+            "serialize_ms": round(recorder.durations.get("serialize", 0.0), 1),
+            "render_ms": round(recorder.durations.get("render", 0.0), 1),
+        }
+        line = " ".join(f"{key}={value}" for key, value in fields.items())
+        if total_ms < self.slow_ms:
+            logger.info("request %s", line)
+            return
+        slowest = sorted(recorder.queries, key=lambda item: item[0], reverse=True)
+        statements = "".join(
+            f"\n  {ms:.1f}ms {sql}" for ms, sql in slowest[: self.slow_queries]
+        )
+        logger.warning("slow request %s%s", line, statements)
@@ -1,10 +1,33 @@
 import pytest
 from rest_framework.test import APIClient
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from app.caches import cache_config
+from user.authentication import local_cache
 
 User = get_user_model()
 
 
+def pytest_configure(config):
+    # A per-process cache: tests run in one process, and nothing is
+    # written next to the code.
+    settings.CACHES = {
+        "default": cache_config({"DJANGO_CACHE_BACKEND": "locmem"}, settings.BASE_DIR)
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached payloads must not leak between tests (primary keys are reused)."""
+    cache.clear()
+    local_cache.clear()
+    yield
+    cache.clear()
+    local_cache.clear()
+
+
 @pytest.fixture
 def api_client():
     """Fixture for DRF APIClient."""
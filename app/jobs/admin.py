@@ -1,9 +1,29 @@
 from django.contrib import admin
-from .models import Job, JobTask, Equipment
+
+from . import search
+from .models import Job, JobTask, Equipment, Tombstone
+
+
+class IndexedSearchMixin:
+    """
+    Answer the changelist search box from the full-text index instead of
+    LIKE '%term%' over ``search_fields`` (which only make the box appear).
+    """
+
+    search_kind = None
+
+    def search_condition(self, term):
+        return search.matching(self.search_kind, term)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(self.search_condition(search_term)), False
 
 
 @admin.register(Equipment)
-class EquipmentAdmin(admin.ModelAdmin):
+class EquipmentAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = Tombstone.Kind.EQUIPMENT
     list_display = ("name", "type", "serial_number", "is_active")
     search_fields = ("name", "serial_number")
     list_filter = ("is_active", "type")
@@ -15,7 +35,8 @@ class JobTaskInline(admin.TabularInline):
 
 
 @admin.register(Job)
-class JobAdmin(admin.ModelAdmin):
+class JobAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = Tombstone.Kind.JOB
     list_display = (
         "title",
         "client_name",
@@ -26,12 +47,21 @@ class JobAdmin(admin.ModelAdmin):
         "overdue",
     )
     list_filter = ("status", "priority", "overdue")
+    # Derived from the schedule and the tasks; saves do not write it.
+    readonly_fields = ("overdue",)
     search_fields = ("title", "client_name")
     inlines = [JobTaskInline]
 
 
 @admin.register(JobTask)
-class JobTaskAdmin(admin.ModelAdmin):
+class JobTaskAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = Tombstone.Kind.TASK
     list_display = ("job", "order", "title", "status", "completed_at")
     list_filter = ("status",)
     search_fields = ("title", "job__title")
+
+    def search_condition(self, term):
+        # Tasks are also found by the title of their job.
+        return super().search_condition(term) | search.matching(
+            Tombstone.Kind.JOB, term, field="job_id"
+        )
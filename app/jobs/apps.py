@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class JobsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "jobs"
+
+    def ready(self):
+        from app import profiling
+
+        from . import signals  # noqa: F401
+
+        profiling.connect_task_signals()
@@ -0,0 +1,246 @@
+"""
+Timed benchmark scenarios over the hot API paths and background jobs.
+
+Each scenario is a callable run against the current database, usually
+one loaded by jobs.seed. ``run`` measures a scenario in two passes:
+
+1. ``iterations`` timed calls after ``warmup`` untimed ones. Latency
+   percentiles (p50/p95/p99) come from these calls.
+2. One extra call under CaptureQueriesContext and tracemalloc. It records
+   the query count and peak Python memory, and is kept out of the timings
+   because tracing slows it down.
+
+Requests go through the full Django stack with DRF's test client. Users
+are force-authenticated, so token lookups are not part of the numbers.
+Request parameters that vary (job id, technician) are drawn from a
+seeded RNG, so every run issues the same requests.
+
+Results can be saved as a JSON baseline. ``compare`` flags the metrics
+of a new run that got worse than the baseline by more than the
+tolerance: any increase in queries, and latency or memory growth beyond
+``tolerance`` (a fraction) that is also larger than a small absolute
+floor, so timer noise on fast scenarios is ignored.
+"""
+
+import json
+import platform
+import random
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+
+import django
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Equipment, Job, JobTask
+from .tasks import update_overdue_jobs
+from .throughput import percentile
+
+DEFAULT_ITERATIONS = 50
+DEFAULT_WARMUP = 5
+DEFAULT_TOLERANCE = 0.2
+
+# metric: growth below which a change is noise, whatever the ratio. None
+# flags any growth.
+COMPARED = {
+    "p50_ms": 1.0,
+    "p95_ms": 1.0,
+    "queries": None,
+    "peak_kib": 64,
+}
+
+
+@dataclass
+class Measurement:
+    iterations: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    queries: int
+    peak_kib: float
+
+
+class Context:
+    """Users and ids the scenarios draw their requests from."""
+
+    def __init__(self, seed=0):
+        User = get_user_model()
+        self.rng = random.Random(seed)
+        self.admin = User.objects.filter(role="Admin").order_by("pk").first()
+        self.technicians = list(
+            User.objects.filter(role="Technician").order_by("pk")[:1000]
+        )
+        self.job_ids = list(
+            Job.objects.order_by("-pk").values_list("pk", flat=True)[:1000]
+        )
+        if self.admin is None or not self.technicians or not self.job_ids:
+            raise ValueError(
+                "The benchmarks need an admin, technicians and jobs; "
+                "load data with seed_benchmark_data first."
+            )
+
+    def client(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def technician(self):
+        return self.rng.choice(self.technicians)
+
+
+def get(client, url):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise AssertionError(f"GET {url} returned {response.status_code}")
+    # Streamed and lazily rendered responses do their work here.
+    return response.content
+
+
+def job_list(context):
+    client = context.client(context.admin)
+    return lambda: get(client, "/api/jobs/")
+
+
+def job_tasks(context):
+    client = context.client(context.admin)
+    return lambda: get(
+        client, f"/api/job-tasks/?job={context.rng.choice(context.job_ids)}"
+    )
+
+
+def technician_dashboard(context):
+    def call():
+        get(context.client(context.technician()), "/api/technician-dashboard/")
+
+    return call
+
+
+def job_analytics(context):
+    client = context.client(context.admin)
+    return lambda: get(client, "/api/jobs/analytics/")
+
+
+def overdue_jobs(context):
+    return update_overdue_jobs
+
+
+SCENARIOS = {
+    "job-list": job_list,
+    "job-tasks": job_tasks,
+    "technician-dashboard": technician_dashboard,
+    "job-analytics": job_analytics,
+    "update-overdue-jobs": overdue_jobs,
+}
+
+
+def measure(call, iterations=DEFAULT_ITERATIONS, warmup=DEFAULT_WARMUP):
+    for _ in range(warmup):
+        call()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    with CaptureQueriesContext(connection) as queries:
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    if not tracing:
+        tracemalloc.stop()
+
+    return Measurement(
+        iterations=iterations,
+        mean_ms=round(sum(timings) / len(timings), 3),
+        p50_ms=round(percentile(timings, 50), 3),
+        p95_ms=round(percentile(timings, 95), 3),
+        p99_ms=round(percentile(timings, 99), 3),
+        max_ms=round(timings[-1], 3),
+        queries=len(queries.captured_queries),
+        peak_kib=round((peak - baseline) / 1024, 1),
+    )
+
+
+def dataset():
+    return {
+        "users": get_user_model().objects.count(),
+        "equipment": Equipment.objects.count(),
+        "jobs": Job.objects.count(),
+        "tasks": JobTask.objects.count(),
+    }
+
+
+def run(names=None, iterations=DEFAULT_ITERATIONS, warmup=DEFAULT_WARMUP, seed=0):
+    """Measure the named scenarios (all by default); returns a report dict."""
+    if iterations < 1:
+        raise ValueError("iterations must be at least 1.")
+    names = names or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(unknown)}.")
+    context = Context(seed)
+    results = {}
+    for name in names:
+        call = SCENARIOS[name](context)
+        results[name] = asdict(measure(call, iterations, warmup))
+    return {
+        "created_at": timezone.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+        },
+        "dataset": dataset(),
+        "scenarios": results,
+    }
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Regressions of ``report`` against ``baseline``: a list of
+    {scenario, metric, baseline, current} for every metric that got worse.
+    Scenarios missing from either side are skipped.
+    """
+    regressions = []
+    for name, current in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for metric, floor in COMPARED.items():
+            old, new = before[metric], current[metric]
+            if floor is None:
+                worse = new > old
+            else:
+                worse = new > old * (1 + tolerance) and new - old > floor
+            if worse:
+                regressions.append(
+                    {
+                        "scenario": name,
+                        "metric": metric,
+                        "baseline": old,
+                        "current": new,
+                    }
+                )
+    return regressions
+
+
+def save(report, path):
+    with open(path, "w") as stream:
+        json.dump(report, stream, indent=2, sort_keys=True)
+        stream.write("\n")
+
+
+def load(path):
+    with open(path) as stream:
+        return json.load(stream)
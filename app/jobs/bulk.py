@@ -0,0 +1,230 @@
+"""
+Batch writes for job tasks.
+
+Items are validated field by field first, then against the database with
+one query per referenced table: jobs, equipment, existing (job, order)
+pairs or the tasks being updated. A batch is written all-or-nothing in one
+transaction with bulk_create/bulk_update and a single insert into the
+equipment through table. Errors come back as a list aligned with the
+request items, the way DRF reports ``many=True`` errors.
+
+bulk_create and bulk_update bypass model signals, so the job task counters
+and analytics rollups are moved and the derived job state is refreshed once
+per batch.
+"""
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import search
+from .counters import TaskCounts
+from .models import Equipment, Job, JobTask, Tombstone
+from .permissions import IsAssignedTechnicianForTaskUpdate
+from .rollups import TaskEquipment, add_equipment_uses, schedule_job_refresh
+from .serializers import JobTaskBulkCreateSerializer, JobTaskBulkUpdateSerializer
+from .signals import job_tasks_changed
+
+MAX_BATCH_SIZE = 500
+
+
+def validate_items(serializer_class, data):
+    serializer = serializer_class(
+        data=data, many=True, allow_empty=False, max_length=MAX_BATCH_SIZE
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def add_error(errors, index, field, message):
+    errors[index].setdefault(field, []).append(message)
+
+
+def raise_for(errors):
+    if any(errors):
+        raise ValidationError(errors)
+
+
+def check_equipment(rows, errors):
+    wanted = {pk for row in rows for pk in row.get("required_equipment_ids", ())}
+    known = set(Equipment.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+    for index, row in enumerate(rows):
+        for pk in row.get("required_equipment_ids", ()):
+            if pk not in known:
+                add_error(
+                    errors,
+                    index,
+                    "required_equipment_ids",
+                    f'Invalid pk "{pk}" - object does not exist.',
+                )
+
+
+def link_equipment(links):
+    """Insert {task id: [equipment ids]} into the through table at once."""
+    pairs = [
+        (task_id, equipment_id)
+        for task_id, equipment_ids in links.items()
+        for equipment_id in dict.fromkeys(equipment_ids)
+    ]
+    TaskEquipment.objects.bulk_create(
+        [
+            TaskEquipment(jobtask_id=task_id, equipment_id=equipment_id)
+            for task_id, equipment_id in pairs
+        ]
+    )
+    add_equipment_uses(pairs)
+
+
+def unlink_equipment(task_ids):
+    """Drop every equipment link of these tasks."""
+    links = TaskEquipment.objects.filter(jobtask_id__in=task_ids)
+    add_equipment_uses(list(links.values_list("jobtask_id", "equipment_id")), -1)
+    links.delete()
+
+
+def check_new_tasks(tasks, errors):
+    """Job existence and the (job, order) rule for unsaved tasks."""
+    job_ids = {task.job_id for task in tasks}
+    known_jobs = set(Job.objects.filter(pk__in=job_ids).values_list("pk", flat=True))
+    taken = set(
+        JobTask.objects.filter(
+            job_id__in=job_ids, order__in={task.order for task in tasks}
+        ).values_list("job_id", "order")
+    )
+    for index, task in enumerate(tasks):
+        if task.job_id not in known_jobs:
+            add_error(
+                errors,
+                index,
+                "job",
+                f'Invalid pk "{task.job_id}" - object does not exist.',
+            )
+        key = (task.job_id, task.order)
+        if key in taken:
+            add_error(
+                errors,
+                index,
+                "non_field_errors",
+                "The fields job, order must make a unique set.",
+            )
+        taken.add(key)
+
+
+def insert_tasks(tasks, equipment_ids):
+    """
+    bulk_create checked tasks with their equipment (a list of id lists
+    aligned with ``tasks``) and bring the derived job state along. Call
+    inside a transaction.
+    """
+    JobTask.objects.bulk_create(tasks)
+    search.index_objects(Tombstone.Kind.TASK, tasks)
+    counts = TaskCounts()
+    for task in tasks:
+        counts.add(task.job_id, task.status)
+    counts.apply()
+    link_equipment({task.pk: ids for task, ids in zip(tasks, equipment_ids) if ids})
+    job_tasks_changed({task.job_id for task in tasks})
+    schedule_job_refresh(
+        {task.job_id for task in tasks if task.completed_at is not None}
+    )
+
+
+def create_tasks(data):
+    """Validate and insert a batch of tasks; returns their ids in order."""
+    rows = validate_items(JobTaskBulkCreateSerializer, data)
+    errors = [{} for _ in rows]
+    tasks = [
+        JobTask(**{k: v for k, v in row.items() if k != "required_equipment_ids"})
+        for row in rows
+    ]
+    check_new_tasks(tasks, errors)
+    check_equipment(rows, errors)
+    raise_for(errors)
+
+    try:
+        with transaction.atomic():
+            insert_tasks(tasks, [row.get("required_equipment_ids") for row in rows])
+    except IntegrityError:
+        # A concurrent write took one of the (job, order) slots.
+        raise ValidationError(
+            {"non_field_errors": ["The fields job, order must make a unique set."]}
+        )
+    return [task.pk for task in tasks]
+
+
+def update_tasks(data, request, view):
+    """
+    Apply a batch of status/equipment changes; returns the task ids in
+    order. Each task is subject to IsAssignedTechnicianForTaskUpdate.
+    The tasks are read under a row lock in the batch's transaction, so
+    the counters move from their stored status even when a single-task
+    write races the batch.
+    """
+    rows = validate_items(JobTaskBulkUpdateSerializer, data)
+    with transaction.atomic():
+        tasks = (
+            JobTask.objects.select_related("job")
+            .select_for_update(of=("self",))
+            .in_bulk([row["id"] for row in rows])
+        )
+        check_updates(rows, tasks, request, view)
+        return write_updates(rows, tasks)
+
+
+def check_updates(rows, tasks, request, view):
+    errors = [{} for _ in rows]
+    permission = IsAssignedTechnicianForTaskUpdate()
+    seen = set()
+    for index, row in enumerate(rows):
+        task = tasks.get(row["id"])
+        if task is None:
+            add_error(
+                errors,
+                index,
+                "id",
+                f'Invalid pk "{row["id"]}" - object does not exist.',
+            )
+        elif not permission.has_object_permission(request, view, task):
+            add_error(
+                errors,
+                index,
+                "non_field_errors",
+                "You do not have permission to update this task.",
+            )
+        if row["id"] in seen:
+            add_error(errors, index, "id", "Task appears more than once in the batch.")
+        seen.add(row["id"])
+    check_equipment(rows, errors)
+    raise_for(errors)
+
+
+def write_updates(rows, tasks):
+    """Write checked updates to the locked ``tasks``. Call inside a transaction."""
+    now = timezone.now()
+    changed, links, counts = [], {}, TaskCounts()
+    refresh = set()
+    for row in rows:
+        task = tasks[row["id"]]
+        counts.move(task.job_id, task.status, row.get("status", task.status))
+        if row.get("completed_at", task.completed_at) != task.completed_at or (
+            "required_equipment_ids" in row
+            and (task.completed_at or row.get("completed_at"))
+        ):
+            refresh.add(task.job_id)
+        for field in ("status", "completed_at"):
+            if field in row:
+                setattr(task, field, row[field])
+        # bulk_update does not apply auto_now.
+        task.updated_at = now
+        changed.append(task)
+        if "required_equipment_ids" in row:
+            links[task.pk] = row["required_equipment_ids"]
+
+    JobTask.objects.bulk_update(changed, ["status", "completed_at", "updated_at"])
+    counts.apply()
+    if links:
+        unlink_equipment(list(links))
+        link_equipment(links)
+    job_tasks_changed({task.job_id for task in changed})
+    schedule_job_refresh(refresh)
+    return [task.pk for task in changed]
@@ -0,0 +1,96 @@
+"""
+Conditional GET for the jobs API.
+
+Validators are derived from ``updated_at`` alone, so a request that ends in
+304 never serializes anything: detail responses cost one single-column
+lookup and list responses one COUNT/MAX aggregate over the filtered
+queryset. Writes to tasks and equipment links bump the parent job's
+``updated_at`` (see ``signals.jobs_changed``), so the marker covers the
+nested payload too.
+
+Lists carry only an ETag. Their newest ``updated_at`` does not move when
+an older row is deleted, and HTTP dates drop the sub-second part, so a
+Last-Modified would let If-Modified-Since answer 304 over a changed list.
+The ETag also covers the row count, which deletes do move.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()
+    return '"%s"' % digest
+
+
+class ConditionalGetMixin:
+    """
+    Add ETags to list and retrieve responses (and Last-Modified to
+    retrieve) and answer If-None-Match / If-Modified-Since with 304. The
+    model needs an ``updated_at`` column.
+    """
+
+    modified_field = "updated_at"
+
+    def list_validators(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        stats = (
+            queryset.prefetch_related(None)
+            .order_by()
+            .aggregate(last=Max(self.modified_field), count=Count("pk"))
+        )
+        # Each page and page size is a different body.
+        etag = make_etag(
+            request.get_full_path(), stats["count"], _isoformat(stats["last"])
+        )
+        return etag, None
+
+    def detail_validators(self, request):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        try:
+            modified = (
+                queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+                .values_list(self.modified_field, flat=True)
+                .first()
+            )
+        except (TypeError, ValueError):
+            return None, None
+        if modified is None:
+            return None, None
+        return make_etag(self.kwargs[lookup_url_kwarg], modified.isoformat()), modified
+
+    def conditional(self, request, validators, handler, *args, **kwargs):
+        etag, modified = validators(request)
+        last_modified = modified.timestamp() if modified else None
+        if etag is not None:
+            early = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if early is not None:
+                early["Cache-Control"] = "private, no-cache"
+                return early
+        response = handler(request, *args, **kwargs)
+        if etag is not None and response.status_code == 200:
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            response["Cache-Control"] = "private, no-cache"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            request, self.list_validators, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(
+            request, self.detail_validators, super().retrieve, *args, **kwargs
+        )
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else ""
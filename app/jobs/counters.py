@@ -0,0 +1,116 @@
+"""
+Denormalized task counters on Job.
+
+Every task write moves the counters of its job with relative F() updates,
+so concurrent writers never overwrite each other and "has incomplete
+tasks" is a column comparison instead of a query against JobTask. Bulk
+paths collect their moves with ``TaskCounts`` and apply them in one UPDATE
+per job. ``find_drift``/``repair_counters`` recount from JobTask in
+primary-key windows to catch writes that bypassed both.
+"""
+
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Job, JobTask
+
+STATUS_COUNTERS = {
+    JobTask.Status.PENDING: "tasks_pending",
+    JobTask.Status.IN_PROGRESS: "tasks_in_progress",
+    JobTask.Status.COMPLETED: "tasks_completed",
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def has_incomplete_tasks():
+    """Q expression: the job has at least one non-completed task."""
+    return Q(tasks_completed__lt=F("tasks_total"))
+
+
+class TaskCounts:
+    """Counter moves per job, applied with one relative UPDATE per job."""
+
+    def __init__(self):
+        self.moves = defaultdict(Counter)
+
+    def add(self, job_id, status, sign=1):
+        moves = self.moves[job_id]
+        moves["tasks_total"] += sign
+        moves[STATUS_COUNTERS[status]] += sign
+
+    def move(self, job_id, old_status, new_status):
+        if old_status != new_status:
+            self.add(job_id, old_status, -1)
+            self.add(job_id, new_status)
+
+    def apply(self, job=None):
+        """
+        Write the moves. ``job``, if given, is an in-memory instance whose
+        counters are adjusted to match.
+        """
+        for job_id, moves in self.moves.items():
+            moves = {name: n for name, n in moves.items() if n}
+            if not moves:
+                continue
+            Job.objects.filter(pk=job_id).update(
+                **{name: F(name) + n for name, n in moves.items()}
+            )
+            if job is not None and job.pk == job_id:
+                for name, n in moves.items():
+                    setattr(job, name, getattr(job, name) + n)
+        self.moves.clear()
+
+
+def counted(status=None):
+    """Subquery counting the outer job's tasks (of one status)."""
+    tasks = JobTask.objects.filter(job_id=OuterRef("pk"))
+    if status is not None:
+        tasks = tasks.filter(status=status)
+    total = tasks.order_by().values("job_id").annotate(n=Count("pk")).values("n")
+    return Coalesce(Subquery(total), Value(0))
+
+
+def recounted():
+    """{counter field: expression} recomputing every counter from JobTask."""
+    values = {"tasks_total": counted()}
+    for status, name in STATUS_COUNTERS.items():
+        values[name] = counted(status)
+    return values
+
+
+def recount(job_ids):
+    """Recompute the counters of these jobs from their tasks."""
+    Job.objects.filter(pk__in=job_ids).update(**recounted())
+
+
+def find_drift(queryset):
+    """Jobs in ``queryset`` whose counters disagree with their tasks."""
+    actual = {f"actual_{name}": expr for name, expr in recounted().items()}
+    return queryset.annotate(**actual).exclude(
+        **{name: F(f"actual_{name}") for name in recounted()}
+    )
+
+
+def repair_counters(chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """Recount drifted jobs window by window; returns the ids that drifted."""
+    drifted = []
+    bounds = Job.objects.aggregate(lo=Min("id"), hi=Max("id"))
+    if bounds["lo"] is None:
+        return drifted
+    lo = bounds["lo"]
+    while lo <= bounds["hi"]:
+        drifted += repair_counter_window(lo, lo + chunk_size, dry_run)
+        lo += chunk_size
+    return drifted
+
+
+def repair_counter_window(lo, hi, dry_run=False):
+    """Recount drifted jobs with lo <= id < hi; returns their ids."""
+    window = Job.objects.filter(id__gte=lo, id__lt=hi)
+    ids = list(find_drift(window).values_list("pk", flat=True))
+    if ids and not dry_run:
+        Job.objects.filter(pk__in=ids).update(**recounted())
+    return ids
@@ -0,0 +1,108 @@
+"""
+Technician dashboard payloads, cached per technician.
+
+The rendered payload and its ETag live under one cache key per technician,
+next to a version token, and a repeat poll reads both in a single cache
+lookup. The entry is served only while it carries the current token.
+Writes that touch a technician's jobs, tasks or equipment links move the
+token, now and again once their transaction commits, so a payload rebuilt
+from the not yet committed state is not kept. A rebuild stores the token
+it started from, so an invalidation racing it retires the new entry as
+well instead of being overwritten.
+"""
+
+import hashlib
+import json
+import uuid
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from app import metrics
+
+from .models import JobTask
+from .readers import reader_for
+from .serializers import JobTaskSerializer
+
+CACHE_TIMEOUT = getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 300)
+
+
+def cache_key(technician_id):
+    return f"jobs:dashboard:{technician_id}"
+
+
+def version_key(technician_id):
+    return f"jobs:dashboard:{technician_id}:version"
+
+
+def build_dashboard(technician_id, today):
+    """Upcoming & in-progress tasks of a technician grouped by scheduled day."""
+    reader = reader_for(JobTaskSerializer)
+    rows = list(
+        JobTask.objects.filter(
+            job__assigned_to_id=technician_id,
+            status__in=[JobTask.Status.PENDING, JobTask.Status.IN_PROGRESS],
+        )
+        .order_by(*JobTask._meta.ordering)
+        .values(*reader.columns, "job__title", "job__scheduled_date")
+    )
+
+    grouped = defaultdict(list)
+    for row, task in zip(rows, reader.render(rows)):
+        scheduled = row["job__scheduled_date"]
+        day = scheduled.date() if scheduled else today
+        grouped[day].append(
+            {
+                "job_title": row["job__title"],
+                "task": task,
+                "equipment": task["required_equipment"],
+            }
+        )
+    return [{"date": day, "items": items} for day, items in sorted(grouped.items())]
+
+
+def get_dashboard(technician_id):
+    """Return (payload, etag) from cache, rebuilding it when needed."""
+    keys = [cache_key(technician_id), version_key(technician_id)]
+    today = timezone.now().date()
+    found = cache.get_many(keys)
+    entry, version = found.get(keys[0]), found.get(keys[1])
+    hit = bool(
+        entry
+        and version is not None
+        and entry["version"] == version
+        and entry["day"] == today
+    )
+    metrics.cache_lookup("dashboard", hit)
+    if hit:
+        return entry["payload"], entry["etag"]
+
+    if version is None:
+        cache.add(keys[1], uuid.uuid4().hex, None)
+        version = cache.get(keys[1])
+    payload = build_dashboard(technician_id, today)
+    body = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True)
+    etag = '"%s"' % hashlib.sha1(body.encode()).hexdigest()
+    cache.set(
+        keys[0],
+        {"version": version, "day": today, "payload": payload, "etag": etag},
+        CACHE_TIMEOUT,
+    )
+    return payload, etag
+
+
+def bump(technician_ids):
+    cache.set_many({version_key(pk): uuid.uuid4().hex for pk in technician_ids}, None)
+
+
+def invalidate_dashboards(technician_ids):
+    """Retire the cached dashboards of these technicians now and after commit."""
+    technician_ids = {pk for pk in technician_ids if pk is not None}
+    if technician_ids:
+        bump(technician_ids)
+        transaction.on_commit(partial(bump, technician_ids))
@@ -0,0 +1,90 @@
+"""
+Query-parameter filters for the jobs API.
+
+A filter is a Serializer over ``request.query_params``: it validates and
+converts the parameters it knows, ignores the rest (paging, ordering,
+format), and maps each given value onto one ORM lookup. Every lookup is
+backed by an index on the filtered table (see the Job and JobTask Meta).
+``QueryParamFilterBackend`` applies the viewset's ``filter_class`` and
+answers bad values with 400.
+
+Multi-valued parameters take a comma-separated list or repeat the
+parameter (``?status=Draft,Scheduled`` or ``?status=Draft&status=Scheduled``).
+Ranges are half-open: ``*_after`` is inclusive, ``*_before`` exclusive.
+"""
+
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Job, JobTask
+
+
+class MultipleValueField(serializers.MultipleChoiceField):
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [data]
+        values = [value for item in data for value in item.split(",") if value]
+        return super().to_internal_value(values)
+
+
+class ListFilter(serializers.Serializer):
+    # {parameter: ORM lookup}
+    lookups = {}
+
+    def filter(self, queryset):
+        conditions = {}
+        for name, value in self.validated_data.items():
+            if value is None or value == set():
+                continue
+            conditions[self.lookups[name]] = value
+        return queryset.filter(**conditions)
+
+
+class JobFilter(ListFilter):
+    lookups = {
+        "status": "status__in",
+        "priority": "priority__in",
+        "overdue": "overdue",
+        "assigned_to": "assigned_to_id",
+        "unassigned": "assigned_to__isnull",
+        "client_name": "client_name",
+        "scheduled_after": "scheduled_date__gte",
+        "scheduled_before": "scheduled_date__lt",
+    }
+
+    status = MultipleValueField(choices=Job.Status.choices, required=False)
+    priority = MultipleValueField(choices=Job.Priority.choices, required=False)
+    overdue = serializers.BooleanField(required=False, allow_null=True)
+    assigned_to = serializers.IntegerField(required=False)
+    unassigned = serializers.BooleanField(required=False, allow_null=True)
+    client_name = serializers.CharField(required=False)
+    scheduled_after = serializers.DateTimeField(required=False)
+    scheduled_before = serializers.DateTimeField(required=False)
+
+
+class JobTaskFilter(ListFilter):
+    lookups = {
+        "job": "job_id",
+        "status": "status__in",
+        "technician": "job__assigned_to_id",
+        "completed_after": "completed_at__gte",
+        "completed_before": "completed_at__lt",
+    }
+
+    job = serializers.IntegerField(required=False)
+    status = MultipleValueField(choices=JobTask.Status.choices, required=False)
+    technician = serializers.IntegerField(required=False)
+    completed_after = serializers.DateTimeField(required=False)
+    completed_before = serializers.DateTimeField(required=False)
+
+
+class QueryParamFilterBackend(BaseFilterBackend):
+    """Filter with ``view.filter_class`` (a ListFilter) if the view has one."""
+
+    def filter_queryset(self, request, queryset, view):
+        filter_class = getattr(view, "filter_class", None)
+        if filter_class is None:
+            return queryset
+        params = filter_class(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.filter(queryset)
@@ -0,0 +1,334 @@
+"""
+Bulk import of equipment, jobs and tasks from CSV or NDJSON.
+
+The file is read row by row and handled in batches:
+
+1. every row goes through the kind's import serializer (one reused
+   instance, field checks only, no queries);
+2. references are resolved for the whole batch at once: user emails and
+   equipment serial numbers through ``LookupMap``s that keep what they
+   have seen for the rest of the run, jobs and clashing keys with one
+   query per batch;
+3. the rows that passed are written with bulk_create in one transaction
+   per batch, and the derived job state is brought along the way
+   jobs.bulk does it.
+
+Rows that fail are skipped and reported with their line (CSV) or record
+(NDJSON) number; the rest of the batch is still imported. Progress is
+reported after every batch.
+
+CSV cells that are empty count as missing, so defaults apply. Nested
+tasks on job rows are only possible in NDJSON.
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import reference, search
+from .bulk import add_error, check_new_tasks, insert_tasks
+from .models import Equipment, EquipmentUsage, ImportRun, Job, JobTask, Tombstone
+from .serializers import (
+    EquipmentImportSerializer,
+    JobImportSerializer,
+    JobTaskImportSerializer,
+    import_format,
+)
+
+DEFAULT_BATCH_SIZE = 2000
+# Errors kept for the report; the counters cover the rest.
+MAX_REPORTED_ERRORS = 1000
+
+User = get_user_model()
+
+
+@dataclass
+class ImportResult:
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def fail(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+
+def read_rows(stream, fmt):
+    """Yield (row number, dict or error) from a binary file object."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Line 1 is the header.
+            yield reader.line_num, {k: v for k, v in row.items() if v not in ("", None)}
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, ValidationError("Invalid JSON.")
+            continue
+        if not isinstance(row, dict):
+            yield number, ValidationError("Expected a JSON object.")
+            continue
+        yield number, row
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class LookupMap:
+    """Key -> primary key of one unique field, loaded on demand per batch."""
+
+    def __init__(self, queryset, field_name):
+        self.queryset = queryset
+        self.field_name = field_name
+        self.known = {}
+
+    def load(self, keys):
+        missing = {key for key in keys if key not in self.known}
+        if missing:
+            found = self.queryset.filter(
+                **{f"{self.field_name}__in": missing}
+            ).values_list(self.field_name, "pk")
+            self.known.update(dict.fromkeys(missing))
+            self.known.update(found)
+
+    def get(self, key):
+        return self.known.get(key)
+
+
+class Importer:
+    """Validates and writes batches of one kind of row."""
+
+    serializer_class = None
+
+    def __init__(self, default_user_id=None):
+        self.default_user_id = default_user_id
+        self.users = LookupMap(User.objects.all(), "email")
+        self.equipment = LookupMap(Equipment.objects.all(), "serial_number")
+        self.serializer = self.serializer_class()
+
+    def validate(self, row):
+        return self.serializer.run_validation(row)
+
+    def check(self, items, errors):
+        """Resolve references of validated ``items``; errors align with them."""
+
+    def write(self, items):
+        """Insert ``items`` (all valid); runs inside a transaction."""
+        raise NotImplementedError
+
+    def resolve_equipment(self, items, errors, rows):
+        """Replace serial numbers in ``rows`` (per item) by equipment ids."""
+        self.equipment.load(
+            serial
+            for item_rows in rows
+            for row in item_rows
+            for serial in row.get("required_equipment", ())
+        )
+        for index, item_rows in enumerate(rows):
+            for row in item_rows:
+                ids = []
+                for serial in row.pop("required_equipment", ()):
+                    pk = self.equipment.get(serial)
+                    if pk is None:
+                        add_error(
+                            errors,
+                            index,
+                            "required_equipment",
+                            f'No equipment with serial number "{serial}".',
+                        )
+                    ids.append(pk)
+                row["required_equipment_ids"] = ids
+
+
+class EquipmentImporter(Importer):
+    serializer_class = EquipmentImportSerializer
+
+    def check(self, items, errors):
+        serials = [item["serial_number"] for item in items]
+        taken = set(
+            Equipment.objects.filter(serial_number__in=serials).values_list(
+                "serial_number", flat=True
+            )
+        )
+        for index, serial in enumerate(serials):
+            if serial in taken:
+                add_error(
+                    errors,
+                    index,
+                    "serial_number",
+                    "equipment with this serial number already exists.",
+                )
+            taken.add(serial)
+
+    def write(self, items):
+        equipment = Equipment.objects.bulk_create([Equipment(**item) for item in items])
+        EquipmentUsage.objects.bulk_create(
+            [EquipmentUsage(equipment=item) for item in equipment]
+        )
+        search.index_objects(Tombstone.Kind.EQUIPMENT, equipment)
+        reference.invalidate("equipment")
+
+
+class JobImporter(Importer):
+    serializer_class = JobImportSerializer
+
+    def check(self, items, errors):
+        self.users.load(
+            item[name]
+            for item in items
+            for name in ("created_by", "assigned_to")
+            if item.get(name)
+        )
+        for index, item in enumerate(items):
+            email = item.get("created_by")
+            if email:
+                item["created_by_id"] = self.users.get(email)
+                if item["created_by_id"] is None:
+                    add_error(errors, index, "created_by", f'No user "{email}".')
+            elif self.default_user_id:
+                item["created_by_id"] = self.default_user_id
+            else:
+                add_error(errors, index, "created_by", "This field is required.")
+            email = item.get("assigned_to")
+            item["assigned_to_id"] = self.users.get(email) if email else None
+            if email and item["assigned_to_id"] is None:
+                add_error(errors, index, "assigned_to", f'No user "{email}".')
+        self.resolve_equipment(items, errors, [item.get("tasks", ()) for item in items])
+
+    def write(self, items):
+        fields = ("created_by", "assigned_to", "tasks")
+        jobs = Job.objects.bulk_create(
+            [
+                Job(**{k: v for k, v in item.items() if k not in fields})
+                for item in items
+            ]
+        )
+        search.index_objects(Tombstone.Kind.JOB, jobs)
+        tasks, equipment_ids = [], []
+        for job, item in zip(jobs, items):
+            for row in item.get("tasks", ()):
+                equipment_ids.append(row.pop("required_equipment_ids"))
+                tasks.append(JobTask(job_id=job.pk, **row))
+        if tasks:
+            insert_tasks(tasks, equipment_ids)
+
+
+class TaskImporter(Importer):
+    serializer_class = JobTaskImportSerializer
+
+    def check(self, items, errors):
+        self.resolve_equipment(items, errors, [[item] for item in items])
+        check_new_tasks(
+            [
+                JobTask(job_id=item["job_id"], order=item.get("order", 1))
+                for item in items
+            ],
+            errors,
+        )
+
+    def write(self, items):
+        equipment_ids = [item.pop("required_equipment_ids") for item in items]
+        insert_tasks([JobTask(**item) for item in items], equipment_ids)
+
+
+IMPORTERS = {
+    ImportRun.Kind.EQUIPMENT: EquipmentImporter,
+    ImportRun.Kind.JOBS: JobImporter,
+    ImportRun.Kind.TASKS: TaskImporter,
+}
+
+
+def import_rows(
+    rows,
+    kind,
+    default_user_id=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    progress=None,
+):
+    """
+    Import (row number, row) pairs as ``kind``. ``progress`` is called with
+    the running ImportResult after every batch.
+    """
+    importer = IMPORTERS[kind](default_user_id)
+    result = ImportResult()
+    for batch in batched(rows, batch_size):
+        numbers, items = [], []
+        for number, row in batch:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                items.append(importer.validate(row))
+                numbers.append(number)
+            except ValidationError as exc:
+                result.fail(number, exc.detail)
+
+        errors = [{} for _ in items]
+        importer.check(items, errors)
+        for number, item_errors in zip(numbers, errors):
+            if item_errors:
+                result.fail(number, item_errors)
+        valid = [item for item, item_errors in zip(items, errors) if not item_errors]
+        if valid:
+            try:
+                with transaction.atomic():
+                    importer.write(valid)
+                result.imported += len(valid)
+            except IntegrityError as exc:
+                # A concurrent write took a unique key; the batch is rolled back.
+                for number, item_errors in zip(numbers, errors):
+                    if not item_errors:
+                        result.fail(number, {"non_field_errors": [str(exc)]})
+        result.processed += len(batch)
+        if progress is not None:
+            progress(result)
+    return result
+
+
+def run_import(run, batch_size=DEFAULT_BATCH_SIZE):
+    """Import the file of an ImportRun, recording progress on the row."""
+    runs = ImportRun.objects.filter(pk=run.pk)
+    runs.update(status=ImportRun.Status.RUNNING, started_at=timezone.now())
+
+    def progress(result):
+        runs.update(
+            rows_processed=result.processed,
+            rows_imported=result.imported,
+            rows_failed=result.failed,
+            errors=result.errors,
+        )
+
+    try:
+        with run.file.open("rb") as stream:
+            result = import_rows(
+                read_rows(stream, import_format(run.file.name)),
+                run.kind,
+                default_user_id=run.created_by_id,
+                batch_size=batch_size,
+                progress=progress,
+            )
+    except Exception as exc:
+        runs.update(
+            status=ImportRun.Status.FAILED,
+            message=str(exc),
+            finished_at=timezone.now(),
+        )
+        raise
+    runs.update(status=ImportRun.Status.COMPLETED, finished_at=timezone.now())
+    return result
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.benchmarks import (
+    DEFAULT_ITERATIONS,
+    DEFAULT_TOLERANCE,
+    DEFAULT_WARMUP,
+    SCENARIOS,
+    compare,
+    load,
+    run,
+    save,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the hot API endpoints and background jobs; save the results as a "
+        "baseline or compare them against one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            dest="scenarios",
+            action="append",
+            choices=list(SCENARIOS),
+            help="Scenario to run (repeatable); all by default.",
+        )
+        parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+        parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--save", help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--compare", help="Baseline JSON file; fail on regressions."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=DEFAULT_TOLERANCE,
+            help="Allowed latency/memory growth as a fraction (default 0.2).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            baseline = load(options["compare"]) if options["compare"] else None
+            report = run(
+                options["scenarios"],
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                seed=options["seed"],
+            )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for name, result in report["scenarios"].items():
+            self.stdout.write(
+                f"{name:<22} p50 {result['p50_ms']:>9.2f} ms  "
+                f"p95 {result['p95_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  "
+                f"{result['queries']:>3} queries  {result['peak_kib']:>9.1f} KiB"
+            )
+        if options["save"]:
+            save(report, options["save"])
+            self.stdout.write(f"Saved results to {options['save']}.")
+        if baseline is None:
+            return
+        regressions = compare(report, baseline, options["tolerance"])
+        for item in regressions:
+            self.stderr.write(
+                f"{item['scenario']}: {item['metric']} {item['baseline']} -> "
+                f"{item['current']}"
+            )
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against baseline.")
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline."))
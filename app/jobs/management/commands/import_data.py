@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.imports import DEFAULT_BATCH_SIZE, IMPORTERS, import_rows, read_rows
+from jobs.serializers import import_format
+
+
+class Command(BaseCommand):
+    help = "Import equipment, jobs or tasks from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(IMPORTERS))
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            dest="fmt",
+            choices=["csv", "ndjson"],
+            help="File format; defaults to the file extension.",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            "--created-by",
+            help="Email of the user recorded as creator of jobs without one.",
+        )
+
+    def handle(self, kind, path, fmt=None, batch_size=DEFAULT_BATCH_SIZE, **options):
+        fmt = fmt or import_format(path)
+        if fmt is None:
+            raise CommandError("Pass --format for files without a known extension.")
+        default_user_id = None
+        if options.get("created_by"):
+            user = get_user_model().objects.filter(email=options["created_by"]).first()
+            if user is None:
+                raise CommandError(f'No user "{options["created_by"]}".')
+            default_user_id = user.pk
+
+        def progress(result):
+            self.stdout.write(
+                f"{result.processed} rows: {result.imported} imported, "
+                f"{result.failed} failed"
+            )
+
+        try:
+            with open(path, "rb") as stream:
+                result = import_rows(
+                    read_rows(stream, fmt),
+                    kind,
+                    default_user_id=default_user_id,
+                    batch_size=batch_size,
+                    progress=progress,
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        if result.failed > len(result.errors):
+            self.stderr.write(f"... {result.failed - len(result.errors)} more")
+        style = self.style.WARNING if result.failed else self.style.SUCCESS
+        self.stdout.write(
+            style(f"Imported {result.imported} of {result.processed} {kind} rows.")
+        )
@@ -0,0 +1,66 @@
+import os
+
+from celery import current_app
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from app import profiling
+from jobs import tasks  # noqa: F401  (registers the jobs tasks)
+
+
+class Command(BaseCommand):
+    help = (
+        "Sampling profiler: list stored profiles, arm the next runs of a Celery "
+        "task for profiling in the workers, or run a task here under the profiler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["list", "arm", "run"])
+        parser.add_argument(
+            "task", nargs="?", help="Task name, e.g. update_overdue_jobs."
+        )
+        parser.add_argument(
+            "--count", type=int, default=1, help="Runs to profile (arm)."
+        )
+        parser.add_argument(
+            "--timeout",
+            type=int,
+            default=3600,
+            help="Seconds the armed runs stay armed (arm).",
+        )
+
+    def handle(self, *args, **options):
+        action = options["action"]
+        if action == "list":
+            directory = profiling.directory()
+            for name in profiling.profiles():
+                size = os.path.getsize(os.path.join(directory, name))
+                self.stdout.write(f"{size:>9} {os.path.join(directory, name)}")
+            return
+
+        task = self.find_task(options["task"])
+        if action == "arm":
+            try:
+                profiling.arm(task.name, options["count"], options["timeout"])
+            except ImproperlyConfigured as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(
+                f"Armed the next {options['count']} run(s) of {task.name}; "
+                "workers profile them when PROFILING_ENABLED is set."
+            )
+            return
+
+        with profiling.profiled(f"task-{task.name.rsplit('.', 1)[-1]}") as profile:
+            result = task.apply().get()
+        self.stdout.write(f"Result: {result}")
+        if profile is None:
+            raise CommandError("Too many profiles running in this process.")
+        self.stdout.write(os.path.join(profiling.directory(), profile.name))
+
+    def find_task(self, name):
+        if not name:
+            raise CommandError("Name the task to profile.")
+        for task_name, task in current_app.tasks.items():
+            if name in (task_name, task_name.rsplit(".", 1)[-1]):
+                return task
+        raise CommandError(f"Unknown task {name!r}.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from jobs.search import DEFAULT_CHUNK_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of jobs, tasks and equipment."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, chunk_size=DEFAULT_CHUNK_SIZE, **options):
+        total = rebuild(chunk_size=chunk_size)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} objects."))
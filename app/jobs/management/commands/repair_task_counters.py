@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.counters import DEFAULT_CHUNK_SIZE, repair_counters
+
+
+class Command(BaseCommand):
+    help = "Verify Job task counters against JobTask and repair any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift; exit with an error if any is found.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, check=False, chunk_size=DEFAULT_CHUNK_SIZE, **options):
+        drifted = repair_counters(chunk_size=chunk_size, dry_run=check)
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Task counters are consistent."))
+            return
+        ids = ", ".join(str(pk) for pk in drifted[:20])
+        more = f" (+{len(drifted) - 20} more)" if len(drifted) > 20 else ""
+        if check:
+            raise CommandError(
+                f"{len(drifted)} job(s) have drifted counters: {ids}{more}"
+            )
+        self.stdout.write(
+            self.style.WARNING(
+                f"Repaired counters of {len(drifted)} job(s): {ids}{more}"
+            )
+        )
@@ -0,0 +1,38 @@
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.seed import DEFAULT_BATCH_SIZE, SeedPlan, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load a reproducible synthetic data set (users, equipment, jobs, "
+        "tasks) for benchmarks. Meant for an empty, disposable database."
+    )
+
+    def add_arguments(self, parser):
+        for field in fields(SeedPlan):
+            parser.add_argument(
+                "--" + field.name.replace("_", "-"), type=int, default=field.default
+            )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, batch_size=DEFAULT_BATCH_SIZE, **options):
+        plan = SeedPlan(
+            **{field.name: options[field.name] for field in fields(SeedPlan)}
+        )
+        if plan.technicians < 1 or plan.jobs < 1:
+            raise CommandError("Generate at least one technician and one job.")
+
+        def progress(created):
+            self.stdout.write(f"{created['jobs']} jobs, {created['tasks']} tasks")
+
+        counts = generate(plan, batch_size=batch_size, progress=progress)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {counts['users']} users, {counts['equipment']} equipment, "
+                f"{counts['jobs']} jobs, {counts['tasks']} tasks and "
+                f"{counts['links']} equipment links."
+            )
+        )
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.23 on 2026-10-17 16:04
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def populate_deadlines(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    JobTask = apps.get_model("jobs", "JobTask")
+    OverdueDeadline = apps.get_model("jobs", "OverdueDeadline")
+    incomplete = JobTask.objects.filter(job_id=OuterRef("pk")).exclude(
+        status="Completed"
+    )
+    upcoming = (
+        Job.objects.filter(scheduled_date__gt=timezone.now())
+        .filter(Exists(incomplete))
+        .values_list("pk", "scheduled_date")
+    )
+    OverdueDeadline.objects.bulk_create(
+        [OverdueDeadline(job_id=pk, due_at=due_at) for pk, due_at in upcoming],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OverdueDeadline",
+            fields=[
+                (
+                    "job",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="overdue_deadline",
+                        serialize=False,
+                        to="jobs.job",
+                    ),
+                ),
+                ("due_at", models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.RunPython(populate_deadlines, migrations.RunPython.noop),
+    ]
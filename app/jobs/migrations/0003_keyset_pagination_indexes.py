@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-17 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0002_overdue_deadline"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(fields=["name", "id"], name="equipment_name_keyset_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["scheduled_date", "id"], name="job_schedule_keyset_idx"
+            ),
+        ),
+    ]
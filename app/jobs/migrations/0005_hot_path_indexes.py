@@ -0,0 +1,50 @@
+# Generated by Django 4.2.23 on 2026-10-17 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0004_sync_tracking"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="job",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["overdue", "status", "priority"], name="job_filter_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["scheduled_date", "overdue"], name="job_overdue_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobtask",
+            index=models.Index(fields=["job", "status"], name="jobtask_job_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="jobtask",
+            index=models.Index(
+                condition=models.Q(("status", "Completed"), _negated=True),
+                fields=["job"],
+                name="jobtask_incomplete_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobtask",
+            index=models.Index(
+                condition=models.Q(("completed_at__isnull", False)),
+                fields=["completed_at", "job"],
+                name="jobtask_completed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.23 on 2026-10-17 17:23
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    JobTask = apps.get_model("jobs", "JobTask")
+
+    def counted(status=None):
+        tasks = JobTask.objects.filter(job_id=OuterRef("pk"))
+        if status is not None:
+            tasks = tasks.filter(status=status)
+        total = tasks.order_by().values("job_id").annotate(n=Count("pk")).values("n")
+        return Coalesce(Subquery(total), Value(0))
+
+    Job.objects.update(
+        tasks_total=counted(),
+        tasks_pending=counted("Pending"),
+        tasks_in_progress=counted("InProgress"),
+        tasks_completed=counted("Completed"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0005_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="jobtask",
+            name="jobtask_incomplete_idx",
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="tasks_completed",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="tasks_in_progress",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="tasks_pending",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="tasks_total",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,170 @@
+# Generated by Django 4.2.23 on 2026-10-17 17:25
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def populate_rollups(apps, schema_editor):
+    JobTask = apps.get_model("jobs", "JobTask")
+    Equipment = apps.get_model("jobs", "Equipment")
+    JobCompletionRollup = apps.get_model("jobs", "JobCompletionRollup")
+    EquipmentDayUsage = apps.get_model("jobs", "EquipmentDayUsage")
+    EquipmentUsage = apps.get_model("jobs", "EquipmentUsage")
+    TaskEquipment = JobTask.required_equipment.through
+
+    completed = JobTask.objects.filter(completed_at__isnull=False)
+    JobCompletionRollup.objects.bulk_create(
+        [
+            JobCompletionRollup(job_id=job_id, day=day, completed=n)
+            for job_id, day, n in completed.annotate(day=TruncDate("completed_at"))
+            .order_by()
+            .values_list("job_id", "day")
+            .annotate(n=Count("pk"))
+        ],
+        batch_size=1000,
+    )
+    EquipmentDayUsage.objects.bulk_create(
+        [
+            EquipmentDayUsage(equipment_id=eq_id, job_id=job_id, day=day, uses=n)
+            for eq_id, job_id, day, n in TaskEquipment.objects.filter(
+                jobtask__completed_at__isnull=False
+            )
+            .annotate(day=TruncDate("jobtask__completed_at"))
+            .order_by()
+            .values_list("equipment_id", "jobtask__job_id", "day")
+            .annotate(n=Count("pk"))
+        ],
+        batch_size=1000,
+    )
+    uses = dict(
+        TaskEquipment.objects.order_by()
+        .values_list("equipment_id")
+        .annotate(n=Count("pk"))
+    )
+    EquipmentUsage.objects.bulk_create(
+        [
+            EquipmentUsage(equipment_id=pk, uses=uses.get(pk, 0))
+            for pk in Equipment.objects.values_list("pk", flat=True)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0006_job_task_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EquipmentUsage",
+            fields=[
+                (
+                    "equipment",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="usage",
+                        serialize=False,
+                        to="jobs.equipment",
+                    ),
+                ),
+                ("uses", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["-uses", "equipment"], name="equipment_usage_top_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="EquipmentDayUsage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("uses", models.PositiveIntegerField(default=0)),
+                (
+                    "equipment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="jobs.equipment",
+                    ),
+                ),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="jobs.job",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="JobCompletionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("completed", models.PositiveIntegerField(default=0)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="jobs.job",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["day", "job", "completed"], name="job_rollup_day_idx"
+                    ),
+                    models.Index(
+                        fields=["job", "completed"], name="job_rollup_job_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="jobcompletionrollup",
+            constraint=models.UniqueConstraint(
+                fields=("job", "day"), name="job_rollup_day_uniq"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipmentdayusage",
+            index=models.Index(
+                fields=["day", "equipment", "uses"], name="equipment_rollup_day_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="equipmentdayusage",
+            constraint=models.UniqueConstraint(
+                fields=("equipment", "job", "day"), name="equipment_rollup_day_uniq"
+            ),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.23 on 2026-10-17 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0008_import_runs"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["status", "scheduled_date"], name="job_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["priority", "scheduled_date"], name="job_priority_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["client_name", "scheduled_date"], name="job_client_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["created_at", "id"], name="job_created_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobtask",
+            index=models.Index(
+                fields=["status", "job", "order"], name="jobtask_status_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    from jobs import search
+
+    index = search.backend(schema_editor.connection)
+    for sql in index.create_sql:
+        schema_editor.execute(sql)
+    search.rebuild(apps=apps)
+
+
+def drop_index(apps, schema_editor):
+    from jobs import search
+
+    for sql in search.backend(schema_editor.connection).drop_sql:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0009_list_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,20 +1,56 @@
 # Create your models here.
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
 
 
+class LoadedValuesMixin:
+    """Remember the column values an instance was loaded from the database with."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def field_changed(self, attname):
+        """True if ``attname`` differs from its loaded value (or was not loaded)."""
+        loaded = getattr(self, "_loaded_values", {})
+        if attname not in loaded:
+            return True
+        return loaded[attname] != getattr(self, attname)
+
+    def loaded_value(self, attname, default=None):
+        return getattr(self, "_loaded_values", {}).get(attname, default)
+
+    def snapshot_loaded_values(self):
+        """Treat the current (saved) values as the new baseline."""
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            f.attname: getattr(self, f.attname)
+            for f in self._meta.concrete_fields
+            if f.attname not in deferred
+        }
+
+
 class Equipment(models.Model):
     name = models.CharField(max_length=120)
     type = models.CharField(max_length=120)
     serial_number = models.CharField(max_length=120, unique=True)
     is_active = models.BooleanField(default=True)
 
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name", "id"], name="equipment_name_keyset_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.serial_number})"
 
 
-class Job(models.Model):
+class Job(LoadedValuesMixin, models.Model):
     class Status(models.TextChoices):
         DRAFT = "Draft", "Draft"
         SCHEDULED = "Scheduled", "Scheduled"
@@ -54,22 +90,79 @@ class Job(models.Model):
 
     overdue = models.BooleanField(default=False)
 
+    # Maintained from task writes by jobs.counters; never written by save().
+    tasks_total = models.PositiveIntegerField(default=0, editable=False)
+    tasks_pending = models.PositiveIntegerField(default=0, editable=False)
+    tasks_in_progress = models.PositiveIntegerField(default=0, editable=False)
+    tasks_completed = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = (
+        "tasks_total",
+        "tasks_pending",
+        "tasks_in_progress",
+        "tasks_completed",
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["scheduled_date", "id"], name="job_schedule_keyset_idx"
+            ),
+            models.Index(fields=["assigned_to", "updated_at"], name="job_sync_idx"),
+            # Admin list filters.
+            models.Index(
+                fields=["overdue", "status", "priority"], name="job_filter_idx"
+            ),
+            # Overdue sweep: past-due jobs still flagged (or not) overdue.
+            models.Index(fields=["scheduled_date", "overdue"], name="job_overdue_idx"),
+            # List filters and orderings (jobs.filters, ?ordering=), each
+            # followed by the default listing order.
+            models.Index(fields=["status", "scheduled_date"], name="job_status_idx"),
+            models.Index(
+                fields=["priority", "scheduled_date"], name="job_priority_idx"
+            ),
+            models.Index(
+                fields=["client_name", "scheduled_date"], name="job_client_idx"
+            ),
+            models.Index(fields=["created_at", "id"], name="job_created_keyset_idx"),
+        ]
+
+    @property
+    def has_incomplete_tasks(self):
+        return self.tasks_completed < self.tasks_total
 
     def recalc_overdue(self):
         """Overdue if scheduled_date passed and any task not completed."""
         if not self.scheduled_date:
             self.overdue = False
             return
-        any_incomplete = self.tasks.exclude(status=JobTask.Status.COMPLETED).exists()
-        self.overdue = any_incomplete and timezone.now() > self.scheduled_date
+        self.overdue = (
+            self.has_incomplete_tasks and timezone.now() > self.scheduled_date
+        )
+
+    # Moved behind the instance's back with queryset updates (task counters,
+    # overdue flips); a full save leaves them alone.
+    DERIVED_FIELDS = (*COUNTER_FIELDS, "overdue")
+
+    def save(self, *args, **kwargs):
+        # A full save of a loaded job must not write back stale derived
+        # state; write overdue with update_fields after recalc_overdue().
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
 
-class JobTask(models.Model):
+class JobTask(LoadedValuesMixin, models.Model):
     class Status(models.TextChoices):
         PENDING = "Pending", "Pending"
         IN_PROGRESS = "InProgress", "In Progress"
@@ -89,10 +182,197 @@ class JobTask(models.Model):
     )
 
     completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["job_id", "order", "id"]
         unique_together = [("job", "order")]
+        indexes = [
+            # Dashboard: a technician's jobs' tasks by status.
+            models.Index(fields=["job", "status"], name="jobtask_job_status_idx"),
+            # ?status= in the default (job, order) listing order.
+            models.Index(fields=["status", "job", "order"], name="jobtask_status_idx"),
+            # Analytics over completed tasks only.
+            models.Index(
+                fields=["completed_at", "job"],
+                condition=models.Q(completed_at__isnull=False),
+                name="jobtask_completed_idx",
+            ),
+        ]
+
+    # Columns the job counters are moved by.
+    COUNTED_FIELDS = ("job_id", "status")
+
+    def save(self, *args, **kwargs):
+        # The post_save receivers move the job counters; keep them in the
+        # same transaction as the task row.
+        with transaction.atomic(using=kwargs.get("using")):
+            self.lock_counted_values(kwargs.get("using"), kwargs.get("update_fields"))
+            super().save(*args, **kwargs)
+
+    def lock_counted_values(self, using=None, update_fields=None):
+        """
+        Re-read the stored job and status under a row lock, so the counters
+        move from what is in the database rather than from what this
+        instance loaded. Concurrent or stale saves then wait for each other
+        and each moves a status only once.
+        """
+        if self.pk is None:
+            return
+        if update_fields is not None:
+            if not {"job", "job_id", "status"} & set(update_fields):
+                return
+        using = using or router.db_for_write(type(self), instance=self)
+        row = (
+            type(self)
+            ._base_manager.using(using)
+            .select_for_update()
+            .filter(pk=self.pk)
+            .values(*self.COUNTED_FIELDS)
+            .first()
+        )
+        if row is not None:
+            self._loaded_values = {**getattr(self, "_loaded_values", {}), **row}
 
     def __str__(self):
         return f"{self.job.title} - {self.title} (#{self.order})"
+
+
+class OverdueDeadline(models.Model):
+    """
+    Time-ordered queue of jobs that will become overdue once due_at passes:
+    scheduled in the future, with at least one incomplete task.
+    """
+
+    job = models.OneToOneField(
+        Job,
+        related_name="overdue_deadline",
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    due_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.job_id} due {self.due_at:%Y-%m-%d %H:%M}"
+
+
+class Tombstone(models.Model):
+    """
+    Marker for an object a sync client must drop: it was deleted, or (when
+    ``revoked``) its job was reassigned away from ``technician``.
+    """
+
+    class Kind(models.TextChoices):
+        JOB = "job", "Job"
+        TASK = "task", "Task"
+        EQUIPMENT = "equipment", "Equipment"
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    technician = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="+",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    revoked = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} gone {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class JobCompletionRollup(models.Model):
+    """Tasks of a job whose completed_at falls on ``day``."""
+
+    job = models.ForeignKey(Job, related_name="+", on_delete=models.CASCADE)
+    day = models.DateField()
+    completed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["job", "day"], name="job_rollup_day_uniq"),
+        ]
+        indexes = [
+            # Covers date-range aggregates without touching the table.
+            models.Index(fields=["day", "job", "completed"], name="job_rollup_day_idx"),
+            # ... and the unfiltered average, as a narrow index-only scan.
+            models.Index(fields=["job", "completed"], name="job_rollup_job_idx"),
+        ]
+
+
+class EquipmentDayUsage(models.Model):
+    """Links from tasks of ``job`` completed on ``day`` to a piece of equipment."""
+
+    equipment = models.ForeignKey(Equipment, related_name="+", on_delete=models.CASCADE)
+    job = models.ForeignKey(Job, related_name="+", on_delete=models.CASCADE)
+    day = models.DateField()
+    uses = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["equipment", "job", "day"], name="equipment_rollup_day_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["day", "equipment", "uses"], name="equipment_rollup_day_idx"
+            ),
+        ]
+
+
+class EquipmentUsage(models.Model):
+    """Number of tasks linked to a piece of equipment."""
+
+    equipment = models.OneToOneField(
+        Equipment, related_name="usage", on_delete=models.CASCADE, primary_key=True
+    )
+    uses = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-uses", "equipment"], name="equipment_usage_top_idx"),
+        ]
+
+
+class ImportRun(models.Model):
+    """An uploaded CSV/NDJSON file and the progress of importing it."""
+
+    class Kind(models.TextChoices):
+        EQUIPMENT = "equipment", "Equipment"
+        JOBS = "jobs", "Jobs"
+        TASKS = "tasks", "Tasks"
+
+    class Status(models.TextChoices):
+        PENDING = "Pending", "Pending"
+        RUNNING = "Running", "Running"
+        COMPLETED = "Completed", "Completed"
+        FAILED = "Failed", "Failed"
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    file = models.FileField(upload_to="imports/%Y/%m/")
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="+",
+        on_delete=models.SET_NULL,
+        null=True,
+    )
+
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    # [{"row": line or record number, "errors": {...}}], capped.
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} import #{self.pk} ({self.status})"
@@ -0,0 +1,160 @@
+"""
+Set-based maintenance of Job.overdue.
+
+A job is overdue when its scheduled_date has passed and at least one of its
+tasks is not completed, which the job's task counters (jobs.counters) answer
+without touching JobTask. Instead of loading jobs one at a time, the engine
+walks the Job table in primary-key windows and flips only the rows whose
+flag disagrees with that rule, using one UPDATE per direction per window.
+
+Writes keep the flag current incrementally: ``refresh_overdue`` recomputes
+just the affected jobs and records jobs that are not overdue *yet* in the
+OverdueDeadline queue, so ``process_due_deadlines`` only has to pop entries
+whose due_at has passed. ``recalculate_overdue`` remains as the full
+reconciliation pass and rebuilds the queue as it goes.
+"""
+
+import logging
+import time
+from dataclasses import asdict, dataclass
+
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from .counters import has_incomplete_tasks
+from .models import Job, OverdueDeadline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+@dataclass
+class OverdueResult:
+    scanned: int = 0
+    flipped_on: int = 0
+    flipped_off: int = 0
+    duration_ms: float = 0.0
+
+    @property
+    def flipped(self):
+        return self.flipped_on + self.flipped_off
+
+    def as_dict(self):
+        data = asdict(self)
+        data["flipped"] = self.flipped
+        return data
+
+
+def should_be_overdue(now):
+    """Q expression matching jobs that must be flagged overdue at ``now``."""
+    return Q(scheduled_date__isnull=False, scheduled_date__lt=now) & (
+        has_incomplete_tasks()
+    )
+
+
+def flip_overdue(queryset, now):
+    """
+    Bring ``overdue`` in line with the rule for every job in ``queryset``.
+    Only rows whose flag is wrong are written (and get a new updated_at).
+    Returns (flipped_on, flipped_off).
+    """
+    rule = should_be_overdue(now)
+    written = timezone.now()
+    flipped_on = queryset.filter(rule, overdue=False).update(
+        overdue=True, updated_at=written
+    )
+    flipped_off = queryset.filter(~rule, overdue=True).update(
+        overdue=False, updated_at=written
+    )
+    return flipped_on, flipped_off
+
+
+def sync_deadlines(queryset, now):
+    """Rebuild the OverdueDeadline entries for the jobs in ``queryset``."""
+    OverdueDeadline.objects.filter(job__in=queryset.values("pk")).delete()
+    upcoming = (
+        queryset.filter(scheduled_date__gt=now)
+        .filter(has_incomplete_tasks())
+        .values_list("pk", "scheduled_date")
+    )
+    OverdueDeadline.objects.bulk_create(
+        [OverdueDeadline(job_id=pk, due_at=due_at) for pk, due_at in upcoming]
+    )
+
+
+def refresh_overdue(job_ids, now=None):
+    """Recompute overdue state for the given jobs only."""
+    job_ids = {pk for pk in job_ids if pk is not None}
+    if not job_ids:
+        return OverdueResult()
+    now = now or timezone.now()
+    jobs = Job.objects.filter(pk__in=job_ids)
+    on, off = flip_overdue(jobs, now)
+    sync_deadlines(jobs, now)
+    return OverdueResult(scanned=len(job_ids), flipped_on=on, flipped_off=off)
+
+
+def process_due_deadlines(now=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Flip the jobs whose deadline has passed and drop them from the queue."""
+    now = now or timezone.now()
+    started = time.perf_counter()
+    result = OverdueResult()
+
+    due = OverdueDeadline.objects.filter(due_at__lte=now).order_by("due_at")
+    while True:
+        job_ids = list(due.values_list("job_id", flat=True)[:chunk_size])
+        if not job_ids:
+            break
+        on, off = flip_overdue(Job.objects.filter(pk__in=job_ids), now)
+        OverdueDeadline.objects.filter(job_id__in=job_ids).delete()
+        result.scanned += len(job_ids)
+        result.flipped_on += on
+        result.flipped_off += off
+
+    result.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    logger.info(
+        "overdue deadlines: due=%d flipped_on=%d in %.1fms",
+        result.scanned,
+        result.flipped_on,
+        result.duration_ms,
+    )
+    return result
+
+
+def recalculate_overdue_window(lo, hi, now):
+    """
+    Reconcile the jobs with lo <= id < hi and rebuild their deadlines.
+    Returns (flipped_on, flipped_off).
+    """
+    window = Job.objects.filter(id__gte=lo, id__lt=hi)
+    flipped = flip_overdue(window, now)
+    sync_deadlines(window, now)
+    return flipped
+
+
+def recalculate_overdue(now=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Recompute the overdue flag for every job, window by window."""
+    now = now or timezone.now()
+    started = time.perf_counter()
+    result = OverdueResult()
+
+    bounds = Job.objects.aggregate(lo=Min("id"), hi=Max("id"), total=Count("id"))
+    result.scanned = bounds["total"]
+    if bounds["lo"] is not None:
+        lo = bounds["lo"]
+        while lo <= bounds["hi"]:
+            on, off = recalculate_overdue_window(lo, lo + chunk_size, now)
+            result.flipped_on += on
+            result.flipped_off += off
+            lo += chunk_size
+
+    result.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    logger.info(
+        "overdue recalculation: scanned=%d flipped_on=%d flipped_off=%d in %.1fms",
+        result.scanned,
+        result.flipped_on,
+        result.flipped_off,
+        result.duration_ms,
+    )
+    return result
@@ -0,0 +1,192 @@
+"""
+Keyset (seek) pagination for the jobs API.
+
+DRF's CursorPagination seeks on the first ordering field only and falls
+back to OFFSET for ties, which degrades on non-unique keys such as
+scheduled_date. KeysetPagination encodes the full ordering tuple of the
+boundary row in the cursor and filters with a lexicographic comparison,
+so every page is an index range scan regardless of depth. NULLs sort as
+the highest value in every ordering so the comparison stays total.
+
+``?ordering=<field>`` or ``-<field>`` picks one of a pagination's
+``ordering_fields`` instead of its default ordering; the primary key is
+appended as the tie-breaker.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import ValidationError as ParamError
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    # The last ordering field must be unique (normally the primary key).
+    ordering = ("id",)
+    # Alternative orderings clients may ask for; each needs an index.
+    ordering_fields = ()
+    ordering_param = "ordering"
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.keys = self.get_keys(queryset, request, view)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor["reverse"])
+
+        if cursor is not None:
+            queryset = queryset.filter(self.seek_filter(cursor["values"], reverse))
+        queryset = queryset.order_by(*self.order_expressions(reverse))
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return rows
+
+    def get_ordering(self, request, queryset, view):
+        requested = request.query_params.get(self.ordering_param)
+        if not requested:
+            return self.ordering
+        if requested.lstrip("-") not in self.ordering_fields:
+            allowed = ", ".join(self.ordering_fields) or "none"
+            raise ParamError(
+                {self.ordering_param: f"Unsupported ordering. Allowed: {allowed}."}
+            )
+        return (requested, "-id" if requested.startswith("-") else "id")
+
+    def get_keys(self, queryset, request, view):
+        """[(attname, descending, nullable, model_field)] for the ordering."""
+        keys = []
+        for name in self.get_ordering(request, queryset, view):
+            descending = name.startswith("-")
+            name = name.lstrip("-")
+            field = queryset.model._meta.get_field(name)
+            keys.append((field.attname, descending, field.null, field))
+        return keys
+
+    def order_expressions(self, reverse):
+        expressions = []
+        for attname, descending, nullable, _ in self.keys:
+            # NULL ranks highest: last when ascending, first when descending.
+            if descending != reverse:
+                expr = F(attname).desc(nulls_first=True if nullable else None)
+            else:
+                expr = F(attname).asc(nulls_last=True if nullable else None)
+            expressions.append(expr)
+        return expressions
+
+    def seek_filter(self, values, reverse):
+        """Rows strictly after ``values`` in the (possibly reversed) ordering."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (attname, descending, nullable, _), value in zip(self.keys, values):
+            if descending != reverse:
+                beyond = self._less_than(attname, value, nullable)
+            else:
+                beyond = self._greater_than(attname, value, nullable)
+            if beyond is not None:
+                condition |= equal & beyond
+            if value is None:
+                equal &= Q(**{f"{attname}__isnull": True})
+            else:
+                equal &= Q(**{attname: value})
+        return condition
+
+    @staticmethod
+    def _greater_than(attname, value, nullable):
+        if value is None:
+            return None
+        beyond = Q(**{f"{attname}__gt": value})
+        if nullable:
+            beyond |= Q(**{f"{attname}__isnull": True})
+        return beyond
+
+    @staticmethod
+    def _less_than(attname, value, nullable):
+        if value is None:
+            return Q(**{f"{attname}__isnull": False}) if nullable else None
+        return Q(**{f"{attname}__lt": value})
+
+    def row_values(self, row):
+        if isinstance(row, dict):
+            return [row[attname] for attname, *_ in self.keys]
+        return [getattr(row, attname) for attname, *_ in self.keys]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            raw_values = payload["v"]
+            if len(raw_values) != len(self.keys):
+                raise ValueError
+            values = [
+                None if raw is None else field.to_python(raw)
+                for (_, _, _, field), raw in zip(self.keys, raw_values)
+            ]
+            return {"values": values, "reverse": bool(payload.get("r"))}
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        payload = {"v": [_json_value(value) for value in self.row_values(row)]}
+        if reverse:
+            payload["r"] = 1
+        data = json.dumps(payload, separators=(",", ":")).encode()
+        encoded = base64.urlsafe_b64encode(data).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+def _json_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+class JobPagination(KeysetPagination):
+    ordering = ("scheduled_date", "id")
+    ordering_fields = ("scheduled_date", "created_at", "updated_at")
+
+
+class JobTaskPagination(KeysetPagination):
+    ordering = ("job_id", "order", "id")
+    ordering_fields = ("updated_at", "completed_at")
+
+
+class ImportRunPagination(KeysetPagination):
+    ordering = ("-id",)
+
+
+class EquipmentPagination(KeysetPagination):
+    ordering = ("name", "id")
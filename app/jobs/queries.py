@@ -0,0 +1,69 @@
+"""
+Query planning for the jobs API.
+
+``plan_queryset`` walks a serializer's readable fields and adds exactly the
+select_related joins and Prefetch objects needed to render it, recursing
+into nested serializers. Rendering a page then costs one query for the page
+plus one per nested relation level, independent of the number of rows.
+"""
+
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def plan_queryset(queryset, serializer_class):
+    """Return ``queryset`` with the joins/prefetches ``serializer_class`` needs."""
+    select, prefetch = _plan(serializer_class(), queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def _plan(serializer, model, prefix=""):
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*":
+            continue
+        source = field.source.replace(".", "__")
+        if "__" in source:
+            # Dotted sources span a relation: join the forward path.
+            select.append(prefix + source.rsplit("__", 1)[0])
+            continue
+
+        if isinstance(field, serializers.ListSerializer) and isinstance(
+            field.child, serializers.Serializer
+        ):
+            related = model._meta.get_field(source).related_model
+            child_qs = _ordered(related)
+            child_qs = plan_queryset(child_qs, type(field.child))
+            prefetch.append(Prefetch(source, queryset=child_qs))
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch.append(prefix + source)
+        elif isinstance(field, serializers.Serializer):
+            related = model._meta.get_field(source).related_model
+            select.append(prefix + source)
+            child_select, child_prefetch = _plan(field, related, f"{source}__")
+            select += [prefix + name for name in child_select]
+            prefetch += [
+                prefix + p if isinstance(p, str) else _prefixed(p, prefix)
+                for p in child_prefetch
+            ]
+        elif isinstance(field, serializers.RelatedField) and not (
+            field.use_pk_only_optimization()
+        ):
+            select.append(prefix + source)
+    return select, prefetch
+
+
+def _ordered(model):
+    # Fall back to the primary key so nested lists render in a stable order.
+    ordering = model._meta.ordering or ["pk"]
+    return model._default_manager.order_by(*ordering)
+
+
+def _prefixed(prefetch, prefix):
+    if not prefix:
+        return prefetch
+    return Prefetch(prefix + prefetch.prefetch_through, queryset=prefetch.queryset)
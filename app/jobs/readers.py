@@ -0,0 +1,187 @@
+"""
+Fast read path for the jobs API.
+
+A RowReader is compiled once per serializer class. It records, in field
+order, which column feeds each output key and how to convert it, then
+renders plain ``.values()`` rows into the same dicts the serializer would
+produce, without instantiating models or serializer fields per row. Nested
+many-serializers are loaded with one query per level. Only model-backed
+fields, primary-key relations and nested model serializers are supported;
+anything else raises ImproperlyConfigured when the reader is compiled.
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ImproperlyConfigured,
+    ValidationError,
+)
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from app.timing import timed
+
+# Fields whose to_representation() is the identity for values the database
+# returns, so the call can be skipped.
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+)
+
+
+class RowReader:
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.attname
+        self.plan = []
+        columns = []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer) and isinstance(
+                field.child, serializers.Serializer
+            ):
+                relation = self.model._meta.get_field(field.source)
+                child = reader_for(type(field.child))
+                self.plan.append((field.field_name, None, None, (relation, child)))
+                continue
+            model_field = self._model_field(field)
+            if isinstance(field, serializers.RelatedField):
+                convert = None
+            elif isinstance(field, IDENTITY_FIELDS):
+                convert = None
+            else:
+                convert = field.to_representation
+            self.plan.append((field.field_name, model_field.attname, convert, None))
+            columns.append(model_field.attname)
+        if self.pk not in columns:
+            columns.append(self.pk)
+        self.columns = tuple(columns)
+
+    def _model_field(self, field):
+        if isinstance(field, serializers.ModelSerializer) or "." in field.source:
+            raise ImproperlyConfigured(
+                f"RowReader cannot render field {field.field_name!r} of "
+                f"{self.model.__name__}."
+            )
+        try:
+            return self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(
+                f"RowReader needs a model field for {field.field_name!r}."
+            )
+
+    def render(self, rows):
+        """Render ``.values(*self.columns)`` rows to response dicts."""
+        with timed("serialize"):
+            return self._render(list(rows))
+
+    def _render(self, rows):
+        nested = {}
+        if rows:
+            ids = [row[self.pk] for row in rows]
+            for name, _, _, relation in self.plan:
+                if relation is not None:
+                    nested[name] = load_related(*relation, ids)
+        out = []
+        for row in rows:
+            item = {}
+            for name, column, convert, relation in self.plan:
+                if relation is not None:
+                    item[name] = nested[name].get(row[self.pk], [])
+                    continue
+                value = row[column]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            out.append(item)
+        return out
+
+
+def load_related(relation, child, ids):
+    """{parent id: [rendered child, ...]} for a reverse FK or forward M2M."""
+    grouped = defaultdict(list)
+    if relation.one_to_many:
+        fk = relation.field.attname
+        rows = (
+            child.model._default_manager.filter(**{f"{fk}__in": ids})
+            .order_by(*(child.model._meta.ordering or ["pk"]))
+            .values(*child.columns, fk)
+        )
+        rows = list(rows)
+        for row, rendered in zip(rows, child.render(rows)):
+            grouped[row[fk]].append(rendered)
+    elif relation.many_to_many and not relation.auto_created:
+        through = relation.remote_field.through
+        source = relation.m2m_field_name()
+        target = relation.m2m_reverse_field_name()
+        prefixed = [f"{target}__{column}" for column in child.columns]
+        rows = (
+            through._default_manager.filter(**{f"{source}_id__in": ids})
+            .order_by(f"{target}_id")
+            .values_list(f"{source}_id", *prefixed)
+        )
+        parents, children = [], []
+        for parent_id, *values in rows:
+            parents.append(parent_id)
+            children.append(dict(zip(child.columns, values)))
+        for parent_id, rendered in zip(parents, child.render(children)):
+            grouped[parent_id].append(rendered)
+    else:
+        raise ImproperlyConfigured(f"Unsupported nested relation {relation.name!r}.")
+    return grouped
+
+
+@lru_cache(maxsize=None)
+def reader_for(serializer_class):
+    return RowReader(serializer_class)
+
+
+class FastReadMixin:
+    """
+    Serve list and retrieve from a compiled RowReader instead of the
+    serializer; create/update keep the serializer for validation.
+    """
+
+    def get_reader(self):
+        return reader_for(self.get_serializer_class())
+
+    def sort_columns(self, reader, queryset):
+        """Columns the paginator seeks on that the reader does not read."""
+        get_keys = getattr(self.paginator, "get_keys", None)
+        if get_keys is None:
+            return ()
+        keys = get_keys(queryset, self.request, self)
+        return tuple(attname for attname, *_ in keys if attname not in reader.columns)
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        rows = queryset.values(*reader.columns, *self.sort_columns(reader, queryset))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.render(page))
+        return Response(reader.render(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        try:
+            rows = list(
+                queryset.filter(
+                    **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+                ).values(*reader.columns)
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if not rows:
+            raise Http404
+        self.check_object_permissions(request, reader.model(**rows[0]))
+        return Response(reader.render(rows)[0])
@@ -0,0 +1,116 @@
+"""
+Versioned caching of reference data: equipment lists and user roles.
+
+Entries live in the default cache under a namespace ("equipment",
+"users"). Every namespace has a version token; an entry is fresh while it
+carries the current token and has not outlived REFERENCE_CACHE_TIMEOUT.
+``invalidate`` moves the token, which retires every entry of the
+namespace at once without knowing their keys. Model signals invalidate
+on saves and deletes (see jobs.signals); writes that bypass them call
+``invalidate`` themselves. The token is moved again once the transaction
+commits, so an entry recomputed from the not yet committed state is not
+kept.
+
+Stale entries are kept for a while after they stop being fresh. The
+first reader to find one takes a short lock and recomputes it; the other
+readers keep serving the stale value meanwhile instead of all hitting
+the database at once. A reader with nothing to serve waits briefly for
+the lock holder, then computes the value itself.
+"""
+
+import time
+import uuid
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from app import metrics
+
+TIMEOUT = getattr(settings, "REFERENCE_CACHE_TIMEOUT", 300)
+# Stale entries are kept this many times longer than they stay fresh.
+STALE_FACTOR = 4
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+WAIT_TIMEOUT = 2
+
+
+def version_key(namespace):
+    return f"jobs:reference:{namespace}:version"
+
+
+def entry_key(namespace, name):
+    return f"jobs:reference:{namespace}:{name}"
+
+
+def bump(namespace):
+    cache.set(version_key(namespace), uuid.uuid4().hex, None)
+
+
+def invalidate(namespace):
+    """Retire every entry of ``namespace`` now and after commit."""
+    bump(namespace)
+    transaction.on_commit(partial(bump, namespace))
+
+
+def cached(namespace, name, compute, timeout=TIMEOUT):
+    """Value of ``name`` in ``namespace``, computing it when not fresh."""
+    keys = [version_key(namespace), entry_key(namespace, name)]
+    found = cache.get_many(keys)
+    version, entry = found.get(keys[0]), found.get(keys[1])
+    if version is None:
+        cache.add(keys[0], uuid.uuid4().hex, None)
+        version = cache.get(keys[0])
+    label = f"reference-{namespace}"
+    if entry and entry["version"] == version and entry["expires"] > time.time():
+        metrics.cache_lookup(label, True)
+        return entry["value"]
+
+    lock = keys[1] + ":lock"
+    if not cache.add(lock, 1, LOCK_TIMEOUT):
+        if entry is not None:
+            metrics.cache_lookup(label, True)
+            return entry["value"]
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            entry = cache.get(keys[1])
+            if entry and entry["version"] == version:
+                metrics.cache_lookup(label, True)
+                return entry["value"]
+        metrics.cache_lookup(label, False)
+        return compute()
+    metrics.cache_lookup(label, False)
+    try:
+        value = compute()
+        cache.set(
+            keys[1],
+            {"version": version, "expires": time.time() + timeout, "value": value},
+            timeout * STALE_FACTOR,
+        )
+    finally:
+        cache.delete(lock)
+    return value
+
+
+def user_role(user_id):
+    """Role of a user, or None if there is no such user."""
+
+    def compute():
+        User = get_user_model()
+        return User.objects.filter(pk=user_id).values_list("role", flat=True).first()
+
+    return cached("users", f"role:{user_id}", compute)
+
+
+def user_stub(user_id):
+    """
+    A User with only id and role loaded, or None; other fields load on
+    first access.
+    """
+    role = user_role(user_id)
+    if role is None:
+        return None
+    return get_user_model().from_db(connection.alias, ["id", "role"], [user_id, role])
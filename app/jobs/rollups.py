@@ -0,0 +1,204 @@
+"""
+Materialized analytics rollups.
+
+* JobCompletionRollup: tasks with completed_at set, per job and day.
+* EquipmentDayUsage: equipment links of those completed tasks, per
+  equipment, job and day.
+* EquipmentUsage: all task links per equipment.
+
+The per-job tables are rebuilt for the affected jobs after a task or link
+change commits (a job has few tasks, so this is cheap and needs no delta
+bookkeeping); EquipmentUsage moves with relative F() updates, because one
+piece of equipment can be linked to millions of tasks. ``rebuild_rollups``
+recomputes everything window by window and runs as a nightly
+reconciliation.
+
+Analytics then read rollup rows instead of JobTask and the M2M table, which
+makes date-range and technician filters affordable.
+"""
+
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+
+from .models import (
+    Equipment,
+    EquipmentDayUsage,
+    EquipmentUsage,
+    Job,
+    JobCompletionRollup,
+    JobTask,
+)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+TaskEquipment = JobTask.required_equipment.through
+
+
+def refresh_job_rollups(job_ids):
+    """Recompute the per-job rollup rows of these jobs from their tasks."""
+    job_ids = {pk for pk in job_ids if pk is not None}
+    if not job_ids:
+        return
+    completed = JobTask.objects.filter(job_id__in=job_ids, completed_at__isnull=False)
+    day_counts = (
+        completed.annotate(day=TruncDate("completed_at"))
+        .order_by()
+        .values_list("job_id", "day")
+        .annotate(n=Count("pk"))
+    )
+    link_counts = (
+        TaskEquipment.objects.filter(jobtask__in=completed)
+        .annotate(day=TruncDate("jobtask__completed_at"))
+        .order_by()
+        .values_list("equipment_id", "jobtask__job_id", "day")
+        .annotate(n=Count("pk"))
+    )
+    with transaction.atomic():
+        JobCompletionRollup.objects.filter(job_id__in=job_ids).delete()
+        EquipmentDayUsage.objects.filter(job_id__in=job_ids).delete()
+        JobCompletionRollup.objects.bulk_create(
+            [
+                JobCompletionRollup(job_id=job_id, day=day, completed=n)
+                for job_id, day, n in day_counts
+            ]
+        )
+        EquipmentDayUsage.objects.bulk_create(
+            [
+                EquipmentDayUsage(equipment_id=eq_id, job_id=job_id, day=day, uses=n)
+                for eq_id, job_id, day, n in link_counts
+            ]
+        )
+
+
+def schedule_job_refresh(job_ids):
+    """Refresh these jobs' rollups once the current transaction commits."""
+    job_ids = {pk for pk in job_ids if pk is not None}
+    if job_ids:
+        transaction.on_commit(partial(refresh_job_rollups, job_ids))
+
+
+def schedule_task_refresh(task_ids):
+    """Like schedule_job_refresh, for the jobs of those tasks that completed."""
+    task_ids = set(task_ids)
+    if task_ids:
+        transaction.on_commit(partial(_refresh_completed_tasks, task_ids))
+
+
+def _refresh_completed_tasks(task_ids):
+    refresh_job_rollups(
+        JobTask.objects.filter(pk__in=task_ids, completed_at__isnull=False).values_list(
+            "job_id", flat=True
+        )
+    )
+
+
+def add_equipment_uses(links, sign=1):
+    """Move EquipmentUsage for (task id, equipment id) links added or removed."""
+    by_delta = defaultdict(list)
+    for equipment_id, n in Counter(eq_id for _, eq_id in links).items():
+        by_delta[sign * n].append(equipment_id)
+    for delta, equipment_ids in by_delta.items():
+        updated = EquipmentUsage.objects.filter(equipment_id__in=equipment_ids).update(
+            uses=F("uses") + delta
+        )
+        if updated < len(equipment_ids) and delta > 0:
+            # Equipment from before the rollups; the nightly rebuild fixes
+            # any race here.
+            for equipment_id in equipment_ids:
+                EquipmentUsage.objects.get_or_create(
+                    equipment_id=equipment_id, defaults={"uses": delta}
+                )
+
+
+def rebuild_rollups(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Recompute every rollup; returns the number of jobs and equipment visited."""
+    jobs = Job.objects.aggregate(lo=Min("id"), hi=Max("id"), total=Count("id"))
+    if jobs["lo"] is not None:
+        lo = jobs["lo"]
+        while lo <= jobs["hi"]:
+            refresh_job_rollups(range(lo, lo + chunk_size))
+            lo += chunk_size
+
+    equipment = Equipment.objects.aggregate(
+        lo=Min("id"), hi=Max("id"), total=Count("id")
+    )
+    if equipment["lo"] is not None:
+        lo = equipment["lo"]
+        while lo <= equipment["hi"]:
+            rebuild_equipment_usage(lo, lo + chunk_size)
+            lo += chunk_size
+    return {"jobs": jobs["total"], "equipment": equipment["total"]}
+
+
+def rebuild_equipment_usage(lo, hi):
+    """Recount EquipmentUsage for the equipment with lo <= id < hi."""
+    window = {"equipment_id__gte": lo, "equipment_id__lt": hi}
+    uses = dict(
+        TaskEquipment.objects.filter(**window)
+        .order_by()
+        .values_list("equipment_id")
+        .annotate(n=Count("pk"))
+    )
+    ids = Equipment.objects.filter(id__gte=lo, id__lt=hi).values_list("pk", flat=True)
+    with transaction.atomic():
+        EquipmentUsage.objects.filter(**window).delete()
+        EquipmentUsage.objects.bulk_create(
+            [EquipmentUsage(equipment_id=pk, uses=uses.get(pk, 0)) for pk in ids]
+        )
+
+
+def job_analytics(start=None, end=None, technician_id=None):
+    """
+    Average completed tasks per job and the ten most used pieces of
+    equipment. With filters, both only count tasks completed in [start, end]
+    on jobs assigned to ``technician_id``.
+    """
+    filtered = start or end or technician_id
+    completions = JobCompletionRollup.objects.all()
+    usage = EquipmentDayUsage.objects.all()
+    if start:
+        completions = completions.filter(day__gte=start)
+        usage = usage.filter(day__gte=start)
+    if end:
+        completions = completions.filter(day__lte=end)
+        usage = usage.filter(day__lte=end)
+    if technician_id:
+        completions = completions.filter(job__assigned_to_id=technician_id)
+        usage = usage.filter(job__assigned_to_id=technician_id)
+
+    totals = completions.aggregate(
+        tasks=Sum("completed"), jobs=Count("job", distinct=True)
+    )
+    average = totals["tasks"] / totals["jobs"] if totals["jobs"] else None
+
+    if filtered:
+        top = (
+            usage.values("equipment_id")
+            .annotate(uses=Sum("uses"))
+            .order_by("-uses", "equipment_id")[:10]
+        )
+        top = list(top)
+    else:
+        top = list(
+            EquipmentUsage.objects.order_by("-uses", "equipment_id").values(
+                "equipment_id", "uses"
+            )[:10]
+        )
+    names = Equipment.objects.in_bulk([row["equipment_id"] for row in top])
+    return {
+        "avg_completed_tasks_per_job": average,
+        "top_equipment_by_usage": [
+            {
+                "id": row["equipment_id"],
+                "name": names[row["equipment_id"]].name,
+                "serial_number": names[row["equipment_id"]].serial_number,
+                "uses": row["uses"],
+            }
+            for row in top
+            if row["equipment_id"] in names
+        ],
+    }
@@ -0,0 +1,302 @@
+"""
+Full-text search over jobs, tasks and equipment.
+
+One inverted index holds a document per object: a weighted ``title`` (job
+title and client, task title, equipment name and serial number) and a
+``body`` (descriptions, equipment type). The index lives in the database:
+
+* SQLite: an FTS5 virtual table ranked with bm25. Its rowid encodes the
+  kind and primary key, so replacing or dropping a document is a rowid
+  lookup.
+* PostgreSQL: a table keyed by (kind, object_id) with a generated,
+  weighted tsvector column under a GIN index, ranked with ts_rank.
+
+Documents are written in the same transaction as the objects: model
+signals cover ordinary saves and deletes, and the bulk paths call
+``index_objects`` themselves. ``rebuild`` recreates every document in
+primary-key windows.
+
+Queries are split into words; every word must match as a prefix, so
+"dri pre" finds "Drill press".
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Equipment, Job, JobTask, Tombstone
+from .readers import reader_for
+from .serializers import EquipmentSerializer, JobSyncSerializer, JobTaskSerializer
+
+TABLE = "jobs_search_index"
+TEXT_CONFIG = "english"
+DEFAULT_CHUNK_SIZE = 5000
+
+Kind = Tombstone.Kind
+KIND_CODES = {Kind.JOB: 1, Kind.TASK: 2, Kind.EQUIPMENT: 3}
+KIND_BY_CODE = {code: kind for kind, code in KIND_CODES.items()}
+
+# kind: (model, title fields, body fields)
+DOCUMENTS = {
+    Kind.JOB: (Job, ("title", "client_name"), ("description",)),
+    Kind.TASK: (JobTask, ("title",), ("description",)),
+    Kind.EQUIPMENT: (Equipment, ("name", "serial_number"), ("type",)),
+}
+
+# How each kind is rendered in search results (jobs without nested tasks).
+SERIALIZERS = {
+    Kind.JOB: JobSyncSerializer,
+    Kind.TASK: JobTaskSerializer,
+    Kind.EQUIPMENT: EquipmentSerializer,
+}
+
+WORD = re.compile(r"\w+")
+
+
+def indexed_fields(kind):
+    _, title, body = DOCUMENTS[kind]
+    return title + body
+
+
+def document(kind, values):
+    """(title, body) of one object; ``values`` maps field name -> value."""
+    _, title, body = DOCUMENTS[kind]
+    return (
+        " ".join(str(values[name]) for name in title if values[name]),
+        " ".join(str(values[name]) for name in body if values[name]),
+    )
+
+
+class SQLiteIndex:
+    create_sql = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        "title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        # Title matches weigh ten times as much as body matches.
+        f"INSERT INTO {TABLE}({TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {TABLE}"]
+
+    @staticmethod
+    def rowid(kind, pk):
+        return pk * 8 + KIND_CODES[kind]
+
+    def upsert(self, cursor, kind, docs):
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+            [(self.rowid(kind, pk), title, body) for pk, title, body in docs],
+        )
+
+    def delete(self, cursor, kind, pks):
+        rowids = [self.rowid(kind, pk) for pk in pks]
+        placeholders = ", ".join(["%s"] * len(rowids))
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid IN ({placeholders})", rowids)
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {TABLE}")
+
+    @staticmethod
+    def expression(words):
+        return " ".join(f'"{word}"*' for word in words)
+
+    def match_sql(self, words, kind):
+        """(sql, params) selecting the ids of matching ``kind`` objects."""
+        sql = (
+            f"SELECT rowid / 8 FROM {TABLE} WHERE {TABLE} MATCH %s"
+            f" AND rowid %% 8 = {KIND_CODES[kind]}"
+        )
+        return sql, [self.expression(words)]
+
+    def search(self, cursor, words, kinds, limit, offset):
+        match = self.expression(words)
+        codes = ", ".join(str(KIND_CODES[kind]) for kind in kinds)
+        sql = f"SELECT rowid, -rank FROM {TABLE} WHERE {TABLE} MATCH %s"
+        sql += f" AND rowid %% 8 IN ({codes}) ORDER BY rank"
+        params = [match]
+        if limit is not None:
+            sql += " LIMIT %s OFFSET %s"
+            params += [limit, offset]
+        cursor.execute(sql, params)
+        return [
+            (KIND_BY_CODE[rowid % 8], rowid // 8, score)
+            for rowid, score in cursor.fetchall()
+        ]
+
+
+class PostgresIndex:
+    create_sql = [
+        f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            kind smallint NOT NULL,
+            object_id bigint NOT NULL,
+            title text NOT NULL,
+            body text NOT NULL,
+            document tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('{TEXT_CONFIG}', title), 'A')
+                || setweight(to_tsvector('{TEXT_CONFIG}', body), 'B')
+            ) STORED,
+            PRIMARY KEY (kind, object_id)
+        )
+        """,
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_document_idx"
+        f" ON {TABLE} USING gin (document)",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {TABLE}"]
+
+    def upsert(self, cursor, kind, docs):
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (kind, object_id, title, body)"
+            " VALUES (%s, %s, %s, %s) ON CONFLICT (kind, object_id)"
+            " DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body",
+            [(KIND_CODES[kind], pk, title, body) for pk, title, body in docs],
+        )
+
+    def delete(self, cursor, kind, pks):
+        cursor.execute(
+            f"DELETE FROM {TABLE} WHERE kind = %s AND object_id = ANY(%s)",
+            [KIND_CODES[kind], list(pks)],
+        )
+
+    def clear(self, cursor):
+        cursor.execute(f"TRUNCATE {TABLE}")
+
+    @staticmethod
+    def expression(words):
+        return " & ".join(f"{word}:*" for word in words)
+
+    def match_sql(self, words, kind):
+        """(sql, params) selecting the ids of matching ``kind`` objects."""
+        sql = (
+            f"SELECT object_id FROM {TABLE}"
+            f" WHERE kind = %s AND document @@ to_tsquery('{TEXT_CONFIG}', %s)"
+        )
+        return sql, [KIND_CODES[kind], self.expression(words)]
+
+    def search(self, cursor, words, kinds, limit, offset):
+        query = self.expression(words)
+        sql = (
+            f"SELECT kind, object_id, ts_rank(document, query) AS score"
+            f" FROM {TABLE}, to_tsquery('{TEXT_CONFIG}', %s) query"
+            " WHERE document @@ query AND kind = ANY(%s)"
+            " ORDER BY score DESC, kind, object_id"
+        )
+        params = [query, [KIND_CODES[kind] for kind in kinds]]
+        if limit is not None:
+            sql += " LIMIT %s OFFSET %s"
+            params += [limit, offset]
+        cursor.execute(sql, params)
+        return [
+            (KIND_BY_CODE[code], object_id, score)
+            for code, object_id, score in cursor.fetchall()
+        ]
+
+
+BACKENDS = {"sqlite": SQLiteIndex, "postgresql": PostgresIndex}
+
+
+def backend(conn=None):
+    return BACKENDS[(conn or connection).vendor]()
+
+
+def index_objects(kind, objects):
+    """Write the documents of saved model instances of ``kind``."""
+    docs = []
+    for obj in objects:
+        values = {name: getattr(obj, name) for name in indexed_fields(kind)}
+        docs.append((obj.pk, *document(kind, values)))
+    if docs:
+        with connection.cursor() as cursor:
+            backend().upsert(cursor, kind, docs)
+
+
+def unindex(kind, pks):
+    pks = [pk for pk in pks if pk is not None]
+    if pks:
+        with connection.cursor() as cursor:
+            backend().delete(cursor, kind, pks)
+
+
+def words(query):
+    return WORD.findall(query.lower())
+
+
+def search(query, kinds=None, limit=20, offset=0):
+    """[(kind, object id, score)] best first; ``limit=None`` returns all."""
+    found = words(query)
+    if not found:
+        return []
+    with connection.cursor() as cursor:
+        return backend().search(cursor, found, kinds or list(DOCUMENTS), limit, offset)
+
+
+def search_page(query, kinds=None, page=1, page_size=20):
+    """
+    One page of ranked hits rendered like the list endpoints, and whether
+    more follow.
+    """
+    hits = search(query, kinds, limit=page_size + 1, offset=(page - 1) * page_size)
+    has_more = len(hits) > page_size
+    hits = hits[:page_size]
+
+    rendered = {}
+    for kind in {kind for kind, _, _ in hits}:
+        reader = reader_for(SERIALIZERS[kind])
+        ids = [pk for hit_kind, pk, _ in hits if hit_kind == kind]
+        rows = DOCUMENTS[kind][0].objects.filter(pk__in=ids).values(*reader.columns)
+        for item in reader.render(rows):
+            rendered[(kind, item["id"])] = item
+    results = [
+        {"kind": kind, "id": pk, "score": score, "object": rendered[(kind, pk)]}
+        for kind, pk, score in hits
+        if (kind, pk) in rendered
+    ]
+    return results, has_more
+
+
+def matching_ids(kind, query):
+    """Primary keys of every ``kind`` object matching ``query``."""
+    return [pk for _, pk, _ in search(query, [kind], limit=None)]
+
+
+def matching(kind, query, field="pk"):
+    """
+    Q: ``field`` is the id of a ``kind`` object matching ``query``. The ids
+    stay in the database as a subquery against the index, so large match
+    sets are not loaded or bound as parameters.
+    """
+    found = words(query)
+    if not found:
+        return Q(pk__in=[])
+    sql, params = backend().match_sql(found, kind)
+    return Q(**{f"{field}__in": RawSQL(sql, params)})
+
+
+def rebuild(chunk_size=DEFAULT_CHUNK_SIZE, apps=None):
+    """
+    Recreate every document; returns the number of objects indexed.
+    ``apps`` is a migration's app registry when called from one.
+    """
+    index = backend()
+    with connection.cursor() as cursor:
+        index.clear(cursor)
+        total = 0
+        for kind, (model, *_) in DOCUMENTS.items():
+            if apps is not None:
+                model = apps.get_model("jobs", model.__name__)
+            fields = indexed_fields(kind)
+            last = 0
+            while True:
+                rows = list(
+                    model._default_manager.filter(pk__gt=last)
+                    .order_by("pk")
+                    .values("pk", *fields)[:chunk_size]
+                )
+                if not rows:
+                    break
+                index.upsert(
+                    cursor, kind, [(row["pk"], *document(kind, row)) for row in rows]
+                )
+                total += len(rows)
+                last = rows[-1]["pk"]
+    return total
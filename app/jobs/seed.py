@@ -0,0 +1,262 @@
+"""
+Seeded generator of synthetic field-service data for benchmarks.
+
+``generate`` bulk-loads technicians, sales agents, equipment, jobs and
+their tasks with equipment links. The same seed and anchor always produce
+the same rows, so benchmark runs against freshly generated data compare.
+
+Rows are built and inserted in batches with bulk_create. Every user
+shares one password hash, computed once. Task counters and the overdue
+flag are set while jobs are built. Analytics rollups, the search index
+and the overdue deadline queue are rebuilt at the end with their
+reconciliation passes. Nothing goes through model signals.
+
+Shapes follow a field-service workload: jobs spread over the anchor
++/- ``days`` with mostly recent ones, tasks per job around the requested
+mean, and a few pieces of equipment taking most of the links.
+"""
+
+import random
+from dataclasses import asdict, dataclass
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .imports import batched
+from .models import Equipment, Job, JobTask
+from .overdue import recalculate_overdue
+from .rollups import TaskEquipment, rebuild_rollups
+
+DEFAULT_BATCH_SIZE = 5000
+PASSWORD = "benchmark"
+EMAIL_DOMAIN = "bench.fieldflow.test"
+
+JOB_KINDS = [
+    "Boiler service",
+    "HVAC inspection",
+    "Water heater install",
+    "Leak repair",
+    "Electrical panel upgrade",
+    "Generator maintenance",
+    "Roof survey",
+    "Fire alarm test",
+    "Pump replacement",
+    "Ventilation cleaning",
+]
+CLIENTS = [
+    "Acme Corp",
+    "Northwind",
+    "Globex",
+    "Initech",
+    "Umbrella Facilities",
+    "Stark Property",
+    "Wayne Estates",
+    "Hooli Campus",
+]
+TASK_STEPS = [
+    "Site survey",
+    "Isolate supply",
+    "Remove old unit",
+    "Install parts",
+    "Pressure test",
+    "Calibrate",
+    "Safety check",
+    "Clean up",
+    "Customer sign-off",
+]
+EQUIPMENT_TYPES = ["Tool", "Meter", "Ladder", "Vehicle", "Safety", "Pump"]
+# In Job.Status and Job.Priority order.
+STATUS_WEIGHTS = [5, 25, 15, 5, 45, 5]
+PRIORITY_WEIGHTS = [3, 5, 2, 1]
+
+
+@dataclass
+class SeedPlan:
+    technicians: int = 10_000
+    sales_agents: int = 100
+    equipment: int = 5_000
+    jobs: int = 1_000_000
+    tasks_per_job: int = 10
+    # Most tasks need 0-2 pieces of equipment; up to this many.
+    max_equipment_per_task: int = 3
+    days: int = 365
+    seed: int = 42
+
+
+def email(role, n):
+    return f"{role}{n}@{EMAIL_DOMAIN}"
+
+
+class Generator:
+    def __init__(self, plan, anchor=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.plan = plan
+        self.rng = random.Random(plan.seed)
+        self.anchor = anchor or timezone.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        self.batch_size = batch_size
+
+    def users(self):
+        User = get_user_model()
+        password = make_password(PASSWORD)
+        rows = [User(email=email("admin", 0), name="Bench Admin", role="Admin")]
+        rows += [
+            User(email=email("sales", n), name=f"Sales {n}", role="SalesAgent")
+            for n in range(self.plan.sales_agents)
+        ]
+        rows += [
+            User(email=email("tech", n), name=f"Technician {n}", role="Technician")
+            for n in range(self.plan.technicians)
+        ]
+        for user in rows:
+            user.password = password
+        created = []
+        for batch in batched(rows, self.batch_size):
+            created += User.objects.bulk_create(batch)
+        split = 1 + self.plan.sales_agents
+        admin, sales, technicians = created[0], created[1:split], created[split:]
+        return admin, [u.pk for u in sales], [u.pk for u in technicians]
+
+    def equipment(self):
+        rows = (
+            Equipment(
+                name=f"{self.rng.choice(EQUIPMENT_TYPES)} {n}",
+                type=self.rng.choice(EQUIPMENT_TYPES),
+                serial_number=f"BENCH-{self.plan.seed}-{n:07d}",
+                is_active=self.rng.random() > 0.05,
+            )
+            for n in range(self.plan.equipment)
+        )
+        ids = []
+        for batch in batched(rows, self.batch_size):
+            ids += [item.pk for item in Equipment.objects.bulk_create(batch)]
+        return ids
+
+    def scheduled_date(self):
+        # Recent jobs dominate; a fifth is unscheduled or in the future.
+        roll = self.rng.random()
+        if roll < 0.05:
+            return None
+        offset = -self.rng.expovariate(3 / self.plan.days)
+        if roll > 0.8:
+            offset = self.rng.uniform(0, 30)
+        offset = max(offset, -self.plan.days)
+        return self.anchor + timezone.timedelta(days=offset)
+
+    def task_statuses(self, job_status, count):
+        if job_status == Job.Status.COMPLETED:
+            return [JobTask.Status.COMPLETED] * count
+        if job_status in (Job.Status.DRAFT, Job.Status.SCHEDULED):
+            return [JobTask.Status.PENDING] * count
+        done = self.rng.randint(0, count)
+        statuses = [JobTask.Status.COMPLETED] * done
+        statuses += [JobTask.Status.IN_PROGRESS] * min(1, count - done)
+        return statuses + [JobTask.Status.PENDING] * (count - len(statuses))
+
+    def job(self, admin_id, creators, technicians):
+        status = self.rng.choices(list(Job.Status), weights=STATUS_WEIGHTS)[0]
+        scheduled = self.scheduled_date()
+        mean = self.plan.tasks_per_job
+        count = max(1, min(2 * mean - 1, round(self.rng.gauss(mean, mean / 3))))
+        statuses = self.task_statuses(status, count) if mean else []
+        job = Job(
+            title=f"{self.rng.choice(JOB_KINDS)} #{self.rng.randint(1, 99999)}",
+            description="Generated for benchmarks.",
+            client_name=self.rng.choice(CLIENTS),
+            created_by_id=self.rng.choice(creators) if creators else admin_id,
+            assigned_to_id=(
+                self.rng.choice(technicians)
+                if technicians and status != Job.Status.DRAFT
+                else None
+            ),
+            status=status,
+            priority=self.rng.choices(list(Job.Priority), weights=PRIORITY_WEIGHTS)[0],
+            scheduled_date=scheduled,
+            tasks_total=len(statuses),
+            tasks_pending=statuses.count(JobTask.Status.PENDING),
+            tasks_in_progress=statuses.count(JobTask.Status.IN_PROGRESS),
+            tasks_completed=statuses.count(JobTask.Status.COMPLETED),
+        )
+        job.overdue = bool(
+            scheduled
+            and scheduled < self.anchor
+            and job.tasks_completed < job.tasks_total
+        )
+        tasks = []
+        for order, task_status in enumerate(statuses, start=1):
+            completed_at = None
+            if task_status == JobTask.Status.COMPLETED:
+                base = scheduled or self.anchor
+                completed_at = base + timezone.timedelta(
+                    hours=self.rng.uniform(0.5, 72)
+                )
+            tasks.append(
+                JobTask(
+                    order=order,
+                    title=TASK_STEPS[(order - 1) % len(TASK_STEPS)],
+                    status=task_status,
+                    completed_at=completed_at,
+                )
+            )
+        return job, tasks
+
+    def links(self, equipment_ids):
+        # Skewed popularity: low indexes are picked far more often.
+        count = min(
+            len(equipment_ids),
+            int(self.rng.random() ** 2 * (self.plan.max_equipment_per_task + 1)),
+        )
+        picked = set()
+        while len(picked) < count:
+            index = int(self.rng.paretovariate(1.2)) - 1
+            picked.add(equipment_ids[index % len(equipment_ids)])
+        return sorted(picked)
+
+    def jobs(self, admin_id, creators, technicians, equipment_ids, progress=None):
+        created = {"jobs": 0, "tasks": 0, "links": 0}
+        for batch in batched(range(self.plan.jobs), self.batch_size):
+            built = [self.job(admin_id, creators, technicians) for _ in batch]
+            with transaction.atomic():
+                jobs = Job.objects.bulk_create([job for job, _ in built])
+                tasks = []
+                for job, job_tasks in built:
+                    for task in job_tasks:
+                        task.job_id = job.pk
+                        tasks.append(task)
+                tasks = JobTask.objects.bulk_create(tasks)
+                links = []
+                if equipment_ids:
+                    links = [
+                        TaskEquipment(jobtask_id=task.pk, equipment_id=pk)
+                        for task in tasks
+                        for pk in self.links(equipment_ids)
+                    ]
+                    TaskEquipment.objects.bulk_create(links)
+            created["jobs"] += len(jobs)
+            created["tasks"] += len(tasks)
+            created["links"] += len(links)
+            if progress is not None:
+                progress(created)
+        return created
+
+
+def generate(plan, anchor=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Load the data set of ``plan``; returns the row counts created."""
+    generator = Generator(plan, anchor, batch_size)
+    admin, sales, technicians = generator.users()
+    equipment_ids = generator.equipment()
+    created = generator.jobs(
+        admin.pk, sales, technicians, equipment_ids, progress=progress
+    )
+    rebuild_rollups(chunk_size=batch_size)
+    search.rebuild(chunk_size=batch_size)
+    recalculate_overdue(now=generator.anchor, chunk_size=batch_size)
+    return {
+        "users": 1 + len(sales) + len(technicians),
+        "equipment": len(equipment_ids),
+        **created,
+        "plan": asdict(plan),
+    }
@@ -1,7 +1,9 @@
 from django.utils import timezone
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Job, JobTask, Equipment
+from . import reference
+from .filters import MultipleValueField
+from .models import Equipment, ImportRun, Job, JobTask
 
 User = get_user_model()
 
@@ -13,6 +15,14 @@ class EquipmentSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
+def stamp_completion(attrs):
+    # If marking complete, set completed_at if not provided
+    status = attrs.get("status")
+    if status == JobTask.Status.COMPLETED and not attrs.get("completed_at"):
+        attrs["completed_at"] = timezone.now()
+    return attrs
+
+
 class JobTaskSerializer(serializers.ModelSerializer):
     # Read: full equipment details
     required_equipment = EquipmentSerializer(many=True, read_only=True)
@@ -37,11 +47,7 @@ class JobTaskSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
     def validate(self, attrs):
-        # If marking complete, set completed_at if not provided
-        status = attrs.get("status")
-        if status == JobTask.Status.COMPLETED and not attrs.get("completed_at"):
-            attrs["completed_at"] = timezone.now()
-        return attrs
+        return stamp_completion(attrs)
 
     def create(self, validated_data):
         equipment_ids = validated_data.pop("required_equipment_ids", [])
@@ -58,10 +64,26 @@ class JobTaskSerializer(serializers.ModelSerializer):
         return task
 
 
+class CachedUserField(serializers.PrimaryKeyRelatedField):
+    """A user id, checked against the cached user roles instead of a query."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        user = reference.user_stub(pk)
+        if user is None:
+            self.fail("does_not_exist", pk_value=data)
+        return user
+
+
 class JobSerializer(serializers.ModelSerializer):
     created_by = serializers.PrimaryKeyRelatedField(read_only=True)
     # show assigned user id; could expose name/email if desired
-    assigned_to = serializers.PrimaryKeyRelatedField(
+    assigned_to = CachedUserField(
         queryset=User.objects.all(), allow_null=True, required=False
     )
     # Nested tasks (read-only). Write through JobTask endpoints.
@@ -80,17 +102,20 @@ class JobSerializer(serializers.ModelSerializer):
             "priority",
             "scheduled_date",
             "overdue",
+            "tasks_total",
+            "tasks_pending",
+            "tasks_in_progress",
+            "tasks_completed",
             "tasks",
         ]
-        read_only_fields = ["id", "created_by", "overdue"]
+        read_only_fields = ["id", "created_by", "overdue", *Job.COUNTER_FIELDS]
 
     def validate(self, attrs):
         # Enforce: cannot move Job to Completed unless all tasks are completed
         new_status = attrs.get("status")
         job = self.instance
         if job and new_status == Job.Status.COMPLETED:
-            has_incomplete = job.tasks.exclude(status=JobTask.Status.COMPLETED).exists()
-            if has_incomplete:
+            if job.has_incomplete_tasks:
                 raise serializers.ValidationError(
                     "Cannot mark job as Completed until all tasks are completed."
                 )
@@ -105,3 +130,204 @@ class JobSerializer(serializers.ModelSerializer):
         job.recalc_overdue()
         job.save(update_fields=["overdue", "updated_at"])
         return job
+
+
+class JobSyncSerializer(JobSerializer):
+    """Job without nested tasks; sync payloads carry tasks separately."""
+
+    tasks = None
+
+    class Meta(JobSerializer.Meta):
+        fields = [name for name in JobSerializer.Meta.fields if name != "tasks"]
+
+
+class JobTaskBulkCreateSerializer(serializers.ModelSerializer):
+    """
+    One item of a bulk task create. Field checks only: job and equipment
+    existence and the (job, order) rule are checked for the whole batch in
+    jobs.bulk, so validating an item runs no queries.
+    """
+
+    job = serializers.IntegerField(source="job_id")
+    required_equipment_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
+
+    class Meta:
+        model = JobTask
+        fields = [
+            "job",
+            "order",
+            "title",
+            "description",
+            "status",
+            "required_equipment_ids",
+            "completed_at",
+        ]
+        validators = []
+
+    def validate(self, attrs):
+        return stamp_completion(attrs)
+
+
+class JobTaskBulkUpdateSerializer(serializers.ModelSerializer):
+    """One item of a bulk progress update; see JobTaskBulkCreateSerializer."""
+
+    id = serializers.IntegerField()
+    required_equipment_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
+
+    class Meta:
+        model = JobTask
+        fields = ["id", "status", "completed_at", "required_equipment_ids"]
+
+    def validate(self, attrs):
+        return stamp_completion(attrs)
+
+
+class JobAnalyticsQuerySerializer(serializers.Serializer):
+    """Query parameters of /api/jobs/analytics/."""
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    technician = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, attrs):
+        if attrs.get("start") and attrs.get("end") and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError({"end": "end must not be before start."})
+        return attrs
+
+
+class JobThroughputQuerySerializer(serializers.Serializer):
+    """Query parameters of /api/jobs/throughput/."""
+
+    bucket = serializers.ChoiceField(choices=["hour", "day", "week"], default="day")
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    technician = serializers.IntegerField(required=False, min_value=1)
+
+
+class SerialNumberListField(serializers.ListField):
+    """Equipment serial numbers; CSV cells carry them joined with ``|``."""
+
+    child = serializers.CharField(max_length=120)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [serial for serial in data.split("|") if serial]
+        return super().to_internal_value(data)
+
+
+class EquipmentImportSerializer(serializers.ModelSerializer):
+    """
+    One imported equipment row. Field checks only, like the bulk task
+    serializers: serial number clashes are checked per batch in jobs.imports.
+    """
+
+    class Meta:
+        model = Equipment
+        fields = ["name", "type", "serial_number", "is_active"]
+        extra_kwargs = {"serial_number": {"validators": []}}
+
+
+class TaskImportSerializer(serializers.ModelSerializer):
+    """A task nested in an imported job; equipment by serial number."""
+
+    required_equipment = SerialNumberListField(required=False)
+
+    class Meta:
+        model = JobTask
+        fields = [
+            "order",
+            "title",
+            "description",
+            "status",
+            "completed_at",
+            "required_equipment",
+        ]
+        validators = []
+
+    def validate(self, attrs):
+        return stamp_completion(attrs)
+
+
+class JobTaskImportSerializer(TaskImportSerializer):
+    """One imported task row of an existing job."""
+
+    job = serializers.IntegerField(source="job_id")
+
+    class Meta(TaskImportSerializer.Meta):
+        fields = ["job", *TaskImportSerializer.Meta.fields]
+
+
+class JobImportSerializer(serializers.ModelSerializer):
+    """One imported job row; people by email, tasks nested (NDJSON only)."""
+
+    created_by = serializers.EmailField(required=False)
+    assigned_to = serializers.EmailField(required=False, allow_null=True)
+    tasks = TaskImportSerializer(many=True, required=False)
+
+    class Meta:
+        model = Job
+        fields = [
+            "title",
+            "description",
+            "client_name",
+            "created_by",
+            "assigned_to",
+            "status",
+            "priority",
+            "scheduled_date",
+            "tasks",
+        ]
+
+    def validate_tasks(self, tasks):
+        orders = [task.get("order", 1) for task in tasks]
+        if len(set(orders)) != len(orders):
+            raise serializers.ValidationError("Task orders must be unique per job.")
+        return tasks
+
+
+IMPORT_FORMATS = {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}
+
+
+def import_format(filename):
+    """'csv' or 'ndjson' by file extension, None if neither."""
+    return IMPORT_FORMATS.get(filename.rsplit(".", 1)[-1].lower())
+
+
+class ImportRunSerializer(serializers.ModelSerializer):
+    file = serializers.FileField(write_only=True)
+
+    class Meta:
+        model = ImportRun
+        fields = [
+            "id",
+            "kind",
+            "file",
+            "status",
+            "rows_processed",
+            "rows_imported",
+            "rows_failed",
+            "errors",
+            "message",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = [name for name in fields if name not in ("kind", "file")]
+
+    def validate_file(self, file):
+        if import_format(file.name) is None:
+            raise serializers.ValidationError("Upload a .csv, .ndjson or .jsonl file.")
+        return file
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Query parameters of /api/search/."""
+
+    q = serializers.CharField(max_length=200)
+    kind = MultipleValueField(choices=["job", "task", "equipment"], required=False)
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=50, default=20)
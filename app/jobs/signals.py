@@ -0,0 +1,253 @@
+"""
+Keep derived job state in step with writes to jobs, tasks and equipment.
+
+Receivers cover ordinary saves and deletes. Code paths that bypass model
+signals (bulk_create, queryset.update) must call ``job_tasks_changed``,
+``tasks_changed`` or ``jobs_changed`` themselves with the affected ids.
+Deletes and reassignments leave Tombstones behind for delta sync, and
+search documents follow the objects they index. Cached reference data
+(equipment, user roles) is invalidated on every change.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .counters import TaskCounts, recount
+from .dashboard import invalidate_dashboards
+from .models import Equipment, EquipmentUsage, Job, JobTask, Tombstone
+from .overdue import refresh_overdue
+from . import reference, search
+from .rollups import (
+    TaskEquipment,
+    add_equipment_uses,
+    schedule_job_refresh,
+    schedule_task_refresh,
+)
+
+
+def jobs_changed(job_ids, technician_ids=()):
+    """Content of these jobs (or their tasks or equipment links) changed."""
+    job_ids = {pk for pk in job_ids if pk is not None}
+    technicians = set(technician_ids)
+    if job_ids:
+        # The nested payload changed: move the jobs' conditional-GET marker.
+        Job.objects.filter(pk__in=job_ids).update(updated_at=timezone.now())
+        technicians.update(
+            Job.objects.filter(pk__in=job_ids)
+            .exclude(assigned_to__isnull=True)
+            .values_list("assigned_to_id", flat=True)
+        )
+    invalidate_dashboards(technicians)
+
+
+def tasks_changed(task_ids):
+    """Rendered content of these tasks (e.g. their equipment) changed."""
+    tasks = JobTask.objects.filter(pk__in=list(task_ids))
+    tasks.update(updated_at=timezone.now())
+    jobs_changed(tasks.values_list("job_id", flat=True))
+
+
+def bury(kind, object_ids, technician_id=None, revoked=False):
+    """Record tombstones so sync clients drop these objects."""
+    Tombstone.objects.bulk_create(
+        [
+            Tombstone(
+                kind=kind,
+                object_id=pk,
+                technician_id=technician_id,
+                revoked=revoked,
+            )
+            for pk in object_ids
+        ]
+    )
+
+
+def assignee(job_id):
+    return (
+        Job.objects.filter(pk=job_id).values_list("assigned_to_id", flat=True).first()
+    )
+
+
+def job_tasks_changed(job_ids):
+    """The task set or a task status of these jobs changed."""
+    refresh_overdue(job_ids)
+    jobs_changed(job_ids)
+
+
+def count_task_save(task, created):
+    """
+    Move the job counters for a saved task (inside its transaction), from
+    the job and status JobTask.save read under the row lock.
+    """
+    counts = TaskCounts()
+    if created:
+        counts.add(task.job_id, task.status)
+    elif task.field_changed("job_id") or task.field_changed("status"):
+        old_job_id = task.loaded_value("job_id")
+        old_status = task.loaded_value("status")
+        if old_job_id is None or old_status is None:
+            # Saved without being loaded first: the old values are unknown.
+            recount({task.job_id, old_job_id} - {None})
+            return
+        counts.add(old_job_id, old_status, -1)
+        counts.add(task.job_id, task.status)
+    job_field = JobTask._meta.get_field("job")
+    counts.apply(task.job if job_field.is_cached(task) else None)
+
+
+def reindex(kind, instance, created):
+    """Rewrite the search document if a field it is built from changed."""
+    fields = search.indexed_fields(kind)
+    if created or any(instance.field_changed(name) for name in fields):
+        search.index_objects(kind, [instance])
+
+
+@receiver(post_save, sender=JobTask)
+def task_saved(sender, instance, created, **kwargs):
+    count_task_save(instance, created)
+    job_ids = {instance.job_id}
+    if not created and instance.field_changed("job_id"):
+        old_job_id = instance.loaded_value("job_id")
+        job_ids.add(old_job_id)
+        old_technician = assignee(old_job_id)
+        if old_technician not in (None, assignee(instance.job_id)):
+            bury(Tombstone.Kind.TASK, [instance.pk], old_technician, revoked=True)
+    if created or instance.field_changed("job_id") or instance.field_changed("status"):
+        job_tasks_changed(job_ids)
+    else:
+        jobs_changed(job_ids)
+    if created:
+        completion_moved = instance.completed_at is not None
+    else:
+        completion_moved = instance.field_changed(
+            "completed_at"
+        ) or instance.field_changed("job_id")
+    if completion_moved:
+        schedule_job_refresh(job_ids)
+    reindex(Tombstone.Kind.TASK, instance, created)
+    instance.snapshot_loaded_values()
+
+
+@receiver(pre_delete, sender=JobTask)
+def task_deleting(sender, instance, **kwargs):
+    # The through rows are gone by post_delete.
+    instance._unlinked = list(linked_pairs(instance, reverse=False))
+
+
+@receiver(post_delete, sender=JobTask)
+def task_deleted(sender, instance, **kwargs):
+    counts = TaskCounts()
+    counts.add(instance.job_id, instance.status, -1)
+    counts.apply()
+    # Tasks go before their job in a cascade, so the job row is still there.
+    bury(Tombstone.Kind.TASK, [instance.pk], assignee(instance.job_id))
+    search.unindex(Tombstone.Kind.TASK, [instance.pk])
+    job_tasks_changed({instance.job_id})
+    add_equipment_uses(getattr(instance, "_unlinked", ()), -1)
+    if instance.completed_at is not None:
+        schedule_job_refresh({instance.job_id})
+
+
+@receiver(post_save, sender=Job)
+def job_saved(sender, instance, created, update_fields=None, **kwargs):
+    # A brand-new job has no tasks yet, so it cannot be overdue.
+    schedule_written = update_fields is None or "scheduled_date" in update_fields
+    if not created and schedule_written and instance.field_changed("scheduled_date"):
+        refresh_overdue({instance.pk})
+    if not created:
+        previous = instance.loaded_value("assigned_to_id")
+        invalidate_dashboards({instance.assigned_to_id, previous})
+        if instance.field_changed("assigned_to_id"):
+            job_reassigned(instance, previous)
+    reindex(Tombstone.Kind.JOB, instance, created)
+    instance.snapshot_loaded_values()
+
+
+def job_reassigned(job, previous):
+    """Hand the job's tasks to the new assignee and revoke them from the old."""
+    tasks = JobTask.objects.filter(job=job)
+    if previous is not None:
+        bury(Tombstone.Kind.JOB, [job.pk], previous, revoked=True)
+        bury(
+            Tombstone.Kind.TASK,
+            tasks.values_list("pk", flat=True),
+            previous,
+            revoked=True,
+        )
+    # Unchanged tasks are new to the assignee's sync scope.
+    tasks.update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Job)
+def job_deleted(sender, instance, **kwargs):
+    bury(Tombstone.Kind.JOB, [instance.pk], instance.assigned_to_id)
+    search.unindex(Tombstone.Kind.JOB, [instance.pk])
+    invalidate_dashboards({instance.assigned_to_id})
+
+
+def linked_pairs(instance, reverse, pk_set=None):
+    """(task id, equipment id) links of a task (or, reversed, of equipment)."""
+    if reverse:
+        links = TaskEquipment.objects.filter(equipment_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(jobtask_id__in=pk_set)
+    else:
+        links = TaskEquipment.objects.filter(jobtask_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(equipment_id__in=pk_set)
+    return links.values_list("jobtask_id", "equipment_id")
+
+
+@receiver(m2m_changed, sender=TaskEquipment)
+def task_equipment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_remove", "pre_clear"):
+        # post_remove gets the requested ids and post_clear none at all;
+        # remember the links that actually go away.
+        instance._unlinked = list(linked_pairs(instance, reverse, pk_set))
+        return
+    if action == "post_add":
+        if reverse:
+            links = [(pk, instance.pk) for pk in pk_set]
+        else:
+            links = [(instance.pk, pk) for pk in pk_set]
+        add_equipment_uses(links)
+    elif action in ("post_remove", "post_clear"):
+        links = instance._unlinked
+        add_equipment_uses(links, -1)
+    else:
+        return
+    task_ids = {task_id for task_id, _ in links}
+    tasks_changed(task_ids)
+    schedule_task_refresh(task_ids)
+
+
+@receiver(post_save, sender=Equipment)
+@receiver(pre_delete, sender=Equipment)
+def equipment_changed(sender, instance, **kwargs):
+    # pre_delete: the M2M links are still there to find the affected tasks.
+    tasks_changed(
+        JobTask.objects.filter(required_equipment=instance).values_list("pk", flat=True)
+    )
+
+
+@receiver(post_save, sender=Equipment)
+def equipment_saved(sender, instance, created, **kwargs):
+    if created:
+        EquipmentUsage.objects.create(equipment=instance)
+    search.index_objects(Tombstone.Kind.EQUIPMENT, [instance])
+    reference.invalidate("equipment")
+
+
+@receiver(post_delete, sender=Equipment)
+def equipment_deleted(sender, instance, **kwargs):
+    bury(Tombstone.Kind.EQUIPMENT, [instance.pk])
+    search.unindex(Tombstone.Kind.EQUIPMENT, [instance.pk])
+    reference.invalidate("equipment")
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, **kwargs):
+    reference.invalidate("users")
@@ -0,0 +1,215 @@
+"""
+Delta sync for offline field clients.
+
+A sync token is a signed (user, timestamp) pair issued by the server. A
+request with a token returns the jobs, tasks and equipment whose
+``updated_at`` moved past that timestamp, plus the ids recorded in
+Tombstones since then, so the payload scales with the amount of change.
+Without a token, or with one older than the tombstone retention window,
+the caller gets a full snapshot flagged ``reset`` and must replace its
+local copy.
+
+Responses are pages of at most SYNC_PAGE_SIZE rows: the jobs, then the
+tasks, the equipment and finally the deleted ids, each in (updated_at,
+pk) order. While ``has_more`` is set, the token carries a cursor and the
+client asks again with it; only the first page of a snapshot says
+``reset``. The token of the last page is an ordinary one stamped with
+the time the first page was served, so rows written while the client
+was paging come back with the next sync.
+
+Visibility follows IsAssignedTechnicianForTaskUpdate: Admins and Sales
+Agents see every job, Technicians only the jobs assigned to them.
+Equipment is reference data and visible to everyone.
+"""
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Equipment, Job, JobTask, Tombstone
+from .readers import reader_for
+from .serializers import EquipmentSerializer, JobSyncSerializer, JobTaskSerializer
+
+TOKEN_SALT = "jobs.sync"
+# Rows are stamped before their transaction commits; re-send this window so
+# a slow commit is not skipped. Clients upsert, so repeats are harmless.
+OVERLAP = timedelta(seconds=getattr(settings, "SYNC_OVERLAP_SECONDS", 5))
+TOMBSTONE_RETENTION = timedelta(
+    days=getattr(settings, "SYNC_TOMBSTONE_RETENTION_DAYS", 30)
+)
+DEFAULT_PAGE_SIZE = 1000
+
+FULL_ACCESS_ROLES = ("Admin", "SalesAgent")
+
+SECTIONS = (
+    (Tombstone.Kind.JOB, "jobs"),
+    (Tombstone.Kind.TASK, "tasks"),
+    (Tombstone.Kind.EQUIPMENT, "equipment"),
+)
+# Page order; "deleted" only in deltas.
+ORDER = ("jobs", "tasks", "equipment", "deleted")
+
+
+def issue_token(user, at, cursor=None):
+    data = {"u": user.pk, "t": at.isoformat()}
+    if cursor is not None:
+        data["c"] = cursor
+    return signing.dumps(data, salt=TOKEN_SALT)
+
+
+def read_token(token, user):
+    """
+    (timestamp, cursor) encoded in ``token``, which must belong to ``user``.
+    The cursor is None unless the token continues a paged sync.
+    """
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT)
+        if data["u"] != user.pk:
+            raise ValueError
+        cursor = data.get("c")
+        if cursor is not None and cursor["k"] not in ORDER:
+            raise ValueError
+        return datetime.fromisoformat(data["t"]), cursor
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise ValidationError({"token": "Invalid sync token."})
+
+
+def scope(user):
+    """(jobs, tasks, tombstones) querysets visible to ``user``."""
+    role = getattr(user, "role", None)
+    jobs, tasks = Job.objects.all(), JobTask.objects.all()
+    if role in FULL_ACCESS_ROLES:
+        return jobs, tasks, Tombstone.objects.filter(revoked=False)
+    if role == "Technician":
+        tombstones = Tombstone.objects.filter(
+            Q(technician=user) | Q(kind=Tombstone.Kind.EQUIPMENT)
+        )
+        return (
+            jobs.filter(assigned_to=user),
+            tasks.filter(job__assigned_to=user),
+            tombstones,
+        )
+    return jobs.none(), tasks.none(), Tombstone.objects.none()
+
+
+def seek(queryset, field, cursor):
+    """Rows of ``queryset`` after the cursor, in (field, pk) order."""
+    if cursor and cursor["a"] is not None:
+        at = datetime.fromisoformat(cursor["a"])
+        queryset = queryset.filter(
+            Q(**{f"{field}__gt": at}) | Q(**{field: at, "pk__gt": cursor["p"]})
+        )
+    return queryset.order_by(field, "pk")
+
+
+def fetch(queryset, field, columns, cursor, limit):
+    """Up to ``limit`` rows after the cursor, and whether more follow."""
+    pk = queryset.model._meta.pk.attname
+    columns = (*columns, *(name for name in (field, pk) if name not in columns))
+    rows = list(seek(queryset, field, cursor).values(*columns)[: limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def gone_ids(user, tombstones):
+    """{kind: ids} of the tombstones whose object is not live for ``user``."""
+    jobs, tasks, _ = scope(user)
+    visible = {
+        Tombstone.Kind.JOB: jobs,
+        Tombstone.Kind.TASK: tasks,
+        Tombstone.Kind.EQUIPMENT: Equipment.objects.all(),
+    }
+    gone = {kind: set() for kind, _ in SECTIONS}
+    for row in tombstones:
+        gone[row["kind"]].add(row["object_id"])
+    # A revoked object can be handed back later; what is live wins.
+    for kind, ids in gone.items():
+        if ids:
+            ids -= set(visible[kind].filter(pk__in=ids).values_list("pk", flat=True))
+    return gone
+
+
+def collect_changes(user, token=None, now=None):
+    """Build the next sync page for ``user`` from ``token``."""
+    now = now or timezone.now()
+    stamp, cursor = read_token(token, user) if token else (None, None)
+    if cursor is None:
+        started, since = now, stamp
+        reset = since is None or since < now - TOMBSTONE_RETENTION
+        if reset:
+            since = None
+    else:
+        # Continuing a paged sync started at ``stamp``.
+        started, reset = stamp, False
+        since = datetime.fromisoformat(cursor["s"]) if cursor["s"] else None
+
+    jobs, tasks, tombstones = scope(user)
+    sources = {
+        "jobs": (JobSyncSerializer, jobs),
+        "tasks": (JobTaskSerializer, tasks),
+        "equipment": (EquipmentSerializer, Equipment.objects.all()),
+    }
+    order = ORDER
+    if since is None:
+        order = ORDER[:-1]
+    else:
+        after = since - OVERLAP
+        sources = {
+            key: (serializer, queryset.filter(updated_at__gt=after))
+            for key, (serializer, queryset) in sources.items()
+        }
+        tombstones = tombstones.filter(deleted_at__gt=after)
+
+    payload = {
+        "token": None,
+        "reset": reset,
+        "has_more": False,
+        "jobs": [],
+        "tasks": [],
+        "equipment": [],
+        "deleted": {"jobs": [], "tasks": [], "equipment": []},
+    }
+    remaining = getattr(settings, "SYNC_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+    position = cursor["k"] if cursor else order[0]
+    next_cursor = None
+    for index in range(order.index(position), len(order)):
+        key = order[index]
+        at = cursor if cursor and cursor["k"] == key else None
+        if key == "deleted":
+            field, columns = "deleted_at", ("kind", "object_id")
+            rows, more = fetch(tombstones, field, columns, at, remaining)
+            gone = gone_ids(user, rows)
+            for kind, section in SECTIONS:
+                payload["deleted"][section] = sorted(gone[kind])
+        else:
+            serializer, queryset = sources[key]
+            reader = reader_for(serializer)
+            field = "updated_at"
+            rows, more = fetch(queryset, field, reader.columns, at, remaining)
+            payload[key] = reader.render(rows)
+        remaining -= len(rows)
+        if more:
+            last = rows[-1]
+            next_cursor = {"k": key, "a": last[field].isoformat(), "p": last["id"]}
+            break
+        if remaining <= 0 and index + 1 < len(order):
+            next_cursor = {"k": order[index + 1], "a": None, "p": None}
+            break
+
+    if next_cursor is not None:
+        next_cursor["s"] = since.isoformat() if since else None
+        payload["has_more"] = True
+    payload["token"] = issue_token(user, started, next_cursor)
+    return payload
+
+
+def prune_tombstones(now=None):
+    """Drop tombstones no valid token can ask for any more."""
+    now = now or timezone.now()
+    deleted, _ = Tombstone.objects.filter(
+        deleted_at__lt=now - TOMBSTONE_RETENTION - OVERLAP
+    ).delete()
+    return deleted
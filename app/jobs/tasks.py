@@ -1,27 +1,210 @@
-from celery import shared_task
+"""
+Celery tasks of the jobs app.
+
+Latency-sensitive tasks (imports, the minutely overdue flip) run on the
+``realtime`` queue, batch passes on ``maintenance`` (CELERY_TASK_ROUTES).
+
+The nightly full passes fan out: the launcher splits the id space into
+ranges of BATCH_CHUNK_SIZE ids, one ``*_range`` task per range runs on
+whichever maintenance worker is free, and ``finish_batch`` adds up their
+results as the chord callback.
+
+Scheduled tasks take a lock in the default cache, so a run that outlasts
+its interval or a beat that fires twice is skipped instead of running
+alongside. A fanned-out pass holds its lock until ``finish_batch`` ran;
+if a range fails, the lock runs out after its timeout.
+"""
+
+import logging
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+
+from celery import chord, shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Min
 from django.utils import timezone
-from .models import Job, JobTask
+
+from app import metrics
+
+from .counters import repair_counter_window
+from .imports import run_import
+from .models import Equipment, ImportRun, Job
+from .overdue import (
+    DEFAULT_CHUNK_SIZE,
+    process_due_deadlines,
+    recalculate_overdue_window,
+)
+from .rollups import rebuild_equipment_usage, refresh_job_rollups
+from .sync import prune_tombstones
+
+logger = logging.getLogger(__name__)
+
+SKIPPED = {"skipped": "previous run still active"}
+# Seconds a lock outlives a run that died without releasing it.
+RUN_LOCK_TIMEOUT = 10 * 60
+BATCH_LOCK_TIMEOUT = 3 * 3600
+
+
+def lock_key(name):
+    return f"jobs:tasks:{name}:lock"
+
+
+def acquire(name, timeout):
+    """A token for the run lock of ``name``, or None if it is held."""
+    token = uuid.uuid4().hex
+    return token if cache.add(lock_key(name), token, timeout) else None
+
+
+def release(name, token):
+    if cache.get(lock_key(name)) == token:
+        cache.delete(lock_key(name))
+
+
+def exclusive(func):
+    """Skip the run while another run of the same task holds the lock."""
+
+    @wraps(func)
+    def run(*args, **kwargs):
+        token = acquire(func.__name__, RUN_LOCK_TIMEOUT)
+        if token is None:
+            logger.info("%s skipped: previous run still active", func.__name__)
+            return SKIPPED
+        try:
+            return func(*args, **kwargs)
+        finally:
+            release(func.__name__, token)
+
+    return run
+
+
+def id_ranges(model, chunk_size=None):
+    """[lo, hi) ranges of ``chunk_size`` ids covering the model's table."""
+    chunk_size = chunk_size or getattr(settings, "BATCH_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    bounds = model.objects.aggregate(lo=Min("id"), hi=Max("id"))
+    if bounds["lo"] is None:
+        return []
+    return [
+        (lo, lo + chunk_size)
+        for lo in range(bounds["lo"], bounds["hi"] + 1, chunk_size)
+    ]
+
+
+def fan_out(name, header):
+    """
+    Run the range signatures in ``header`` in parallel under the lock of
+    ``name``; ``finish_batch`` adds up their results.
+    """
+    token = acquire(name, BATCH_LOCK_TIMEOUT)
+    if token is None:
+        logger.info("%s skipped: previous run still active", name)
+        return SKIPPED
+    if not header:
+        release(name, token)
+        return {"ranges": 0, "summary_id": None}
+    summary = chord(header)(finish_batch.s(name, token, time.time()))
+    return {"ranges": len(header), "summary_id": summary.id}
+
+
+@shared_task
+def finish_batch(results, name, token, started):
+    """Chord callback: totals of the range results; releases the lock."""
+    totals = Counter()
+    for result in results:
+        totals.update(result)
+    totals = dict(totals, duration_ms=round((time.time() - started) * 1000, 2))
+    logger.info(
+        "%s: %s",
+        name,
+        " ".join(f"{key}={value}" for key, value in sorted(totals.items())),
+    )
+    release(name, token)
+    return totals
 
 
 @shared_task
+@exclusive
 def update_overdue_jobs():
     """
-    Flag Job.overdue = True if scheduled_date < now AND any task is not completed.
-    Otherwise set False.
+    Flip jobs whose scheduled_date has passed since the last run. Writes to
+    jobs and tasks keep everything else current, so only due deadlines are
+    visited. Returns the scan/flip counts and timing of the run.
     """
-    now = timezone.now()
-    qs = Job.objects.select_related("assigned_to", "created_by").prefetch_related(
-        "tasks"
-    )
-    for job in qs:
-        if not job.scheduled_date:
-            if job.overdue:
-                job.overdue = False
-                job.save(update_fields=["overdue"])
-            continue
-
-        any_incomplete = job.tasks.exclude(status=JobTask.Status.COMPLETED).exists()
-        desired = any_incomplete and job.scheduled_date < now
-        if job.overdue != desired:
-            job.overdue = desired
-            job.save(update_fields=["overdue"])
+    result = process_due_deadlines()
+    metrics.OVERDUE_DURATION.observe(result.duration_ms / 1000)
+    metrics.OVERDUE_FLIPPED.inc(result.flipped_on)
+    return result.as_dict()
+
+
+@shared_task
+def reconcile_overdue_jobs():
+    """
+    Full pass: flag Job.overdue = True if scheduled_date < now AND any task is
+    not completed, otherwise False, and rebuild the deadline queue. Task
+    counters are repaired first. Catches drift from writes that bypass model
+    signals. Fans out over job id ranges; the totals (scanned, flipped_on,
+    flipped_off, flipped, counters_repaired) are the result of summary_id.
+    """
+    now = timezone.now().isoformat()
+    header = [reconcile_overdue_range.s(lo, hi, now) for lo, hi in id_ranges(Job)]
+    return fan_out("reconcile_overdue_jobs", header)
+
+
+@shared_task(acks_late=True)
+def reconcile_overdue_range(lo, hi, now):
+    """Repair counters, then overdue flags and deadlines, of lo <= id < hi."""
+    repaired = repair_counter_window(lo, hi)
+    on, off = recalculate_overdue_window(lo, hi, datetime.fromisoformat(now))
+    return {
+        "scanned": Job.objects.filter(id__gte=lo, id__lt=hi).count(),
+        "flipped_on": on,
+        "flipped_off": off,
+        "flipped": on + off,
+        "counters_repaired": len(repaired),
+    }
+
+
+@shared_task
+@exclusive
+def prune_sync_tombstones():
+    """Delete tombstones older than the sync token retention window."""
+    return prune_tombstones()
+
+
+@shared_task
+def reconcile_analytics_rollups():
+    """
+    Rebuild the analytics rollups from JobTask and its equipment links,
+    fanned out over job and equipment id ranges.
+    """
+    header = [rebuild_job_rollups_range.s(lo, hi) for lo, hi in id_ranges(Job)]
+    header += [
+        rebuild_equipment_usage_range.s(lo, hi) for lo, hi in id_ranges(Equipment)
+    ]
+    return fan_out("reconcile_analytics_rollups", header)
+
+
+@shared_task(acks_late=True)
+def rebuild_job_rollups_range(lo, hi):
+    refresh_job_rollups(range(lo, hi))
+    return {"jobs": Job.objects.filter(id__gte=lo, id__lt=hi).count()}
+
+
+@shared_task(acks_late=True)
+def rebuild_equipment_usage_range(lo, hi):
+    rebuild_equipment_usage(lo, hi)
+    return {"equipment": Equipment.objects.filter(id__gte=lo, id__lt=hi).count()}
+
+
+@shared_task
+def import_file(run_id):
+    """Import an uploaded file; progress and errors are kept on the ImportRun."""
+    result = run_import(ImportRun.objects.get(pk=run_id))
+    return {
+        "processed": result.processed,
+        "imported": result.imported,
+        "failed": result.failed,
+    }
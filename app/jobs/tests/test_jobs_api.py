@@ -1,6 +1,24 @@
+import csv
+import io
+import json
+import time
+
 import pytest
+from django.contrib.admin import site
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from jobs.dashboard import invalidate_dashboards
 from jobs.models import Job, JobTask, Equipment
+from jobs.queries import plan_queryset
+from jobs.serializers import JobSerializer
+from jobs.sync import issue_token as sign_sync_token
+from jobs.tasks import import_file
+from jobs.views import JobViewSet
 
 
 @pytest.mark.django_db
@@ -146,3 +164,826 @@ def test_equipment_can_be_added_to_task_via_api(api_client, user_factory):
     assert resp.status_code == 200
     task.refresh_from_db()
     assert eq in task.required_equipment.all()
+
+
+@pytest.mark.django_db
+def test_completing_last_task_via_api_clears_job_overdue(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech1 = user_factory(role="Technician", email="tech1@example.com")
+    job = Job.objects.create(
+        title="Late Job",
+        client_name="C",
+        created_by=admin,
+        assigned_to=tech1,
+        scheduled_date=timezone.now() - timezone.timedelta(hours=1),
+    )
+    task = JobTask.objects.create(job=job, order=1, title="Step 1")
+    job.refresh_from_db()
+    assert job.overdue is True
+
+    api_client.force_authenticate(user=tech1)
+    resp = api_client.patch(
+        f"/api/job-tasks/{task.id}/", {"status": "Completed"}, format="json"
+    )
+    assert resp.status_code == 200
+    job.refresh_from_db()
+    assert job.overdue is False
+
+
+@pytest.mark.django_db
+def test_job_list_keyset_pagination_walks_all_pages(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    now = timezone.now()
+    same_day = now + timezone.timedelta(days=1)
+    dates = [None, same_day, now, same_day, None, now - timezone.timedelta(days=3)]
+    jobs = [
+        Job.objects.create(
+            title=f"Job {i}", client_name="C", created_by=admin, scheduled_date=d
+        )
+        for i, d in enumerate(dates)
+    ]
+    # (scheduled_date, id) ascending with unscheduled jobs last.
+    expected = [
+        j.id
+        for j in sorted(
+            jobs,
+            key=lambda j: (j.scheduled_date is None, j.scheduled_date or now, j.id),
+        )
+    ]
+
+    api_client.force_authenticate(user=admin)
+    url, seen, pages = "/api/jobs/?page_size=2", [], []
+    while url:
+        resp = api_client.get(url)
+        assert resp.status_code == 200
+        body = resp.json()
+        pages.append(body)
+        seen += [item["id"] for item in body["results"]]
+        url = body["next"]
+    assert seen == expected
+    assert len(pages) == 3
+    assert pages[0]["previous"] is None
+
+    back = api_client.get(pages[-1]["previous"]).json()
+    assert [item["id"] for item in back["results"]] == expected[2:4]
+
+
+@pytest.mark.django_db
+def test_pagination_caps_page_size_and_rejects_bad_cursor(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    for i in range(3):
+        Equipment.objects.create(name=f"Eq {i}", type="Tool", serial_number=f"S{i}")
+    api_client.force_authenticate(user=admin)
+
+    resp = api_client.get("/api/equipment/?page_size=100000")
+    assert resp.status_code == 200
+    assert len(resp.json()["results"]) == 3
+
+    assert api_client.get("/api/job-tasks/?cursor=not-a-cursor").status_code == 404
+
+
+def _seed_jobs(admin, count, tasks_per_job, equipment):
+    for i in range(count):
+        job = Job.objects.create(
+            title=f"Seed {i}", client_name="C", created_by=admin, assigned_to=admin
+        )
+        for order in range(1, tasks_per_job + 1):
+            task = JobTask.objects.create(job=job, order=order, title=f"T{order}")
+            task.required_equipment.set(equipment)
+
+
+def _query_count(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get(url)
+    assert resp.status_code == 200
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_job_list_query_count_is_constant(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    api_client.force_authenticate(user=admin)
+    tools = [
+        Equipment.objects.create(name=f"Tool {i}", type="Tool", serial_number=f"T{i}")
+        for i in range(3)
+    ]
+
+    _seed_jobs(admin, count=1, tasks_per_job=1, equipment=tools[:1])
+    small = _query_count(api_client, "/api/jobs/")
+    _seed_jobs(admin, count=8, tasks_per_job=4, equipment=tools)
+    large = _query_count(api_client, "/api/jobs/")
+
+    # validator aggregate + jobs page + tasks prefetch + equipment prefetch
+    assert small == large == 4
+
+    job = Job.objects.last()
+    assert _query_count(api_client, f"/api/jobs/{job.id}/") == 4
+    assert _query_count(api_client, f"/api/job-tasks/?job={job.id}") == 2
+
+
+@pytest.mark.django_db
+def test_fast_read_path_matches_serializer_output(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech = user_factory(role="Technician", email="tech1@example.com")
+    drill = Equipment.objects.create(name="Drill", type="Tool", serial_number="D1")
+    saw = Equipment.objects.create(
+        name="Saw", type="Tool", serial_number="S1", is_active=False
+    )
+    job = Job.objects.create(
+        title="Fast",
+        description="",
+        client_name="C",
+        created_by=admin,
+        assigned_to=tech,
+        priority="Urgent",
+        scheduled_date=timezone.now() + timezone.timedelta(days=2),
+    )
+    done = JobTask.objects.create(
+        job=job, order=2, title="B", status="Completed", completed_at=timezone.now()
+    )
+    done.required_equipment.set([saw, drill])
+    JobTask.objects.create(job=job, order=1, title="A")
+    Job.objects.create(title="Bare", client_name="D", created_by=admin)
+
+    ordered = Job.objects.order_by(F("scheduled_date").asc(nulls_last=True), "id")
+    queryset = plan_queryset(ordered, JobSerializer)
+    expected = JSONRenderer().render(JobSerializer(queryset, many=True).data)
+
+    api_client.force_authenticate(user=admin)
+    resp = api_client.get("/api/jobs/")
+    assert JSONRenderer().render(resp.data["results"]) == expected
+
+    detail = api_client.get(f"/api/jobs/{job.id}/")
+    assert JSONRenderer().render(detail.data) == JSONRenderer().render(
+        JobSerializer(queryset.get(pk=job.id)).data
+    )
+    assert api_client.get("/api/jobs/not-a-number/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_technician_dashboard_is_cached_and_invalidated(
+    api_client, user_factory, django_capture_on_commit_callbacks
+):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech1 = user_factory(role="Technician", email="tech1@example.com")
+    drill = Equipment.objects.create(name="Drill", type="Tool", serial_number="D1")
+    job = Job.objects.create(
+        title="Cached Job",
+        client_name="C",
+        created_by=admin,
+        assigned_to=tech1,
+        scheduled_date=timezone.now() + timezone.timedelta(days=1),
+    )
+    task = JobTask.objects.create(job=job, order=1, title="Inspect")
+    task.required_equipment.set([drill])
+
+    api_client.force_authenticate(user=tech1)
+    first = api_client.get("/api/technician-dashboard/")
+    etag = first["ETag"]
+    assert first.json()[0]["items"][0]["equipment"][0]["serial_number"] == "D1"
+
+    # A repeat poll is answered from the cache without touching the database.
+    assert _query_count(api_client, "/api/technician-dashboard/") == 0
+    resp = api_client.get("/api/technician-dashboard/", HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+
+    drill.serial_number = "D2"
+    drill.save()
+    resp = api_client.get("/api/technician-dashboard/", HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp.json()[0]["items"][0]["equipment"][0]["serial_number"] == "D2"
+
+    # A payload built while the write is not yet committed is not kept.
+    with django_capture_on_commit_callbacks(execute=True):
+        JobTask.objects.filter(pk=task.pk).update(title="Inspect again")
+        invalidate_dashboards({tech1.pk})
+        api_client.get("/api/technician-dashboard/")
+        assert _query_count(api_client, "/api/technician-dashboard/") == 0
+    assert _query_count(api_client, "/api/technician-dashboard/") > 0
+
+    job.assigned_to = admin
+    job.save()
+    assert api_client.get("/api/technician-dashboard/").json() == []
+
+
+@pytest.mark.django_db
+def test_job_conditional_get_tracks_nested_changes(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    job = Job.objects.create(title="Cond", client_name="C", created_by=admin)
+    task = JobTask.objects.create(job=job, order=1, title="Step 1")
+    drill = Equipment.objects.create(name="Drill", type="Tool", serial_number="D1")
+    api_client.force_authenticate(user=admin)
+
+    detail = api_client.get(f"/api/jobs/{job.id}/")
+    listing = api_client.get("/api/jobs/")
+    assert detail["Last-Modified"]
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(f"/api/jobs/{job.id}/", HTTP_IF_NONE_MATCH=detail["ETag"])
+    assert resp.status_code == 304
+    assert len(ctx.captured_queries) == 1
+    resp = api_client.get("/api/jobs/", HTTP_IF_NONE_MATCH=listing["ETag"])
+    assert resp.status_code == 304
+
+    task.required_equipment.add(drill)
+    resp = api_client.get(f"/api/jobs/{job.id}/", HTTP_IF_NONE_MATCH=detail["ETag"])
+    assert resp.status_code == 200
+    assert resp.json()["tasks"][0]["required_equipment"][0]["id"] == drill.id
+    resp = api_client.get("/api/jobs/", HTTP_IF_NONE_MATCH=listing["ETag"])
+    assert resp.status_code == 200
+
+    listing = resp
+    Job.objects.create(title="Other", client_name="C", created_by=admin)
+    resp = api_client.get("/api/jobs/", HTTP_IF_NONE_MATCH=listing["ETag"])
+    assert resp.status_code == 200
+
+
+@pytest.mark.django_db
+def test_job_list_ignores_if_modified_since(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    older = Job.objects.create(title="Older", client_name="C", created_by=admin)
+    Job.objects.create(title="Newer", client_name="C", created_by=admin)
+    api_client.force_authenticate(user=admin)
+
+    listing = api_client.get("/api/jobs/")
+    assert "Last-Modified" not in listing
+    # Deleting a job other than the newest leaves MAX(updated_at) alone.
+    older.delete()
+    since = http_date(time.time() + 60)
+    resp = api_client.get("/api/jobs/", HTTP_IF_MODIFIED_SINCE=since)
+    assert resp.status_code == 200
+    assert [job["title"] for job in resp.json()["results"]] == ["Newer"]
+    resp = api_client.get("/api/jobs/", HTTP_IF_NONE_MATCH=listing["ETag"])
+    assert resp.status_code == 200
+
+
+@pytest.mark.django_db
+def test_sync_returns_only_changes_since_token(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech1 = user_factory(role="Technician", email="tech1@example.com")
+    tech2 = user_factory(role="Technician", email="tech2@example.com")
+    drill = Equipment.objects.create(name="Drill", type="Tool", serial_number="D1")
+    mine = Job.objects.create(
+        title="Mine", client_name="C", created_by=admin, assigned_to=tech1
+    )
+    other = Job.objects.create(
+        title="Other", client_name="C", created_by=admin, assigned_to=tech2
+    )
+    kept = JobTask.objects.create(job=mine, order=1, title="Keep")
+    dropped = JobTask.objects.create(job=mine, order=2, title="Drop")
+    JobTask.objects.create(job=other, order=1, title="Hidden")
+
+    api_client.force_authenticate(user=tech1)
+    full = api_client.get("/api/sync/").json()
+    assert full["reset"] is True
+    assert [job["id"] for job in full["jobs"]] == [mine.id]
+    assert "tasks" not in full["jobs"][0]
+    assert [task["id"] for task in full["tasks"]] == [kept.id, dropped.id]
+    assert [eq["id"] for eq in full["equipment"]] == [drill.id]
+
+    # Pretend the first sync happened well before the next writes.
+    past = timezone.now() - timezone.timedelta(minutes=1)
+    Job.objects.update(updated_at=past)
+    JobTask.objects.update(updated_at=past)
+    Equipment.objects.update(updated_at=past)
+    token = sign_sync_token(tech1, past + timezone.timedelta(seconds=30))
+
+    resp = api_client.get("/api/sync/", {"token": token}).json()
+    assert resp["reset"] is False
+    assert resp["jobs"] == resp["tasks"] == resp["equipment"] == []
+
+    kept.required_equipment.add(drill)
+    dropped_id = dropped.id
+    dropped.delete()
+    JobTask.objects.create(job=other, order=2, title="Still hidden")
+    other.assigned_to = tech1
+    other.save()
+    mine.assigned_to = tech2
+    mine.save()
+
+    delta = api_client.get("/api/sync/", {"token": token}).json()
+    assert [job["id"] for job in delta["jobs"]] == [other.id]
+    assert {task["job"] for task in delta["tasks"]} == {other.id}
+    assert delta["deleted"]["jobs"] == [mine.id]
+    assert delta["deleted"]["tasks"] == sorted([kept.id, dropped_id])
+    assert delta["equipment"] == []
+
+    assert api_client.get("/api/sync/", {"token": "forged"}).status_code == 400
+    api_client.force_authenticate(user=tech2)
+    assert api_client.get("/api/sync/", {"token": token}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_sync_pages_snapshots_and_deltas(api_client, user_factory, settings):
+    settings.SYNC_PAGE_SIZE = 2
+    admin = user_factory(role="Admin", email="admin@example.com")
+    jobs = [
+        Job.objects.create(title=f"J{i}", client_name="C", created_by=admin)
+        for i in range(3)
+    ]
+    tasks = [JobTask.objects.create(job=jobs[0], order=i, title="T") for i in (1, 2)]
+    drill = Equipment.objects.create(name="Drill", type="Tool", serial_number="D1")
+    api_client.force_authenticate(user=admin)
+
+    def walk(token=None):
+        pages = []
+        while True:
+            params = {"token": token} if token else {}
+            page = api_client.get("/api/sync/", params).json()
+            pages.append(page)
+            token = page["token"]
+            if not page["has_more"]:
+                return pages, token
+
+    pages, token = walk()
+    assert [page["reset"] for page in pages] == [True] + [False] * (len(pages) - 1)
+    assert all(
+        len(page["jobs"]) + len(page["tasks"]) + len(page["equipment"]) <= 2
+        for page in pages
+    )
+    seen = {
+        key: sorted(row["id"] for page in pages for row in page[key])
+        for key in ("jobs", "tasks", "equipment")
+    }
+    assert seen == {
+        "jobs": [job.id for job in jobs],
+        "tasks": [task.id for task in tasks],
+        "equipment": [drill.id],
+    }
+
+    past = timezone.now() - timezone.timedelta(minutes=1)
+    Job.objects.update(updated_at=past)
+    JobTask.objects.update(updated_at=past)
+    Equipment.objects.update(updated_at=past)
+    token = sign_sync_token(admin, past + timezone.timedelta(seconds=30))
+    gone = [job.id for job in jobs[1:]] + [tasks[1].id]
+    jobs[2].delete()
+    jobs[1].delete()
+    tasks[1].delete()
+    tasks[0].save()
+
+    pages, _ = walk(token)
+    # Two changed rows, then three tombstones.
+    assert len(pages) == 3
+    assert [row["id"] for page in pages for row in page["tasks"]] == [tasks[0].id]
+    deleted = [
+        object_id
+        for page in pages
+        for key in ("jobs", "tasks")
+        for object_id in page["deleted"][key]
+    ]
+    assert sorted(deleted) == sorted(gone)
+
+
+@pytest.mark.django_db
+def test_bulk_task_create_validates_whole_batch(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    job = Job.objects.create(
+        title="Bulk",
+        client_name="C",
+        created_by=admin,
+        scheduled_date=timezone.now() - timezone.timedelta(hours=1),
+    )
+    JobTask.objects.create(job=job, order=1, title="Existing")
+    JobTask.objects.filter(job=job).update(status="Completed")
+    tools = [
+        Equipment.objects.create(name=f"Tool {i}", type="Tool", serial_number=f"T{i}")
+        for i in range(2)
+    ]
+    api_client.force_authenticate(user=admin)
+
+    bad = [
+        {"job": job.id, "order": 1, "title": "Clash"},
+        {"job": job.id, "order": 2, "title": "Fine"},
+        {"job": job.id, "order": 2, "title": "Dupe"},
+        {"job": 0, "order": 1, "title": "No job", "required_equipment_ids": [0]},
+    ]
+    resp = api_client.post("/api/job-tasks/bulk/", bad, format="json")
+    assert resp.status_code == 400
+    errors = resp.json()
+    assert errors[1] == {}
+    assert "non_field_errors" in errors[0] and "non_field_errors" in errors[2]
+    assert set(errors[3]) == {"job", "required_equipment_ids"}
+    assert JobTask.objects.count() == 1
+
+    items = [
+        {
+            "job": job.id,
+            "order": order,
+            "title": f"Step {order}",
+            "required_equipment_ids": [t.id for t in tools],
+        }
+        for order in range(2, 42)
+    ]
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.post("/api/job-tasks/bulk/", items, format="json")
+    assert resp.status_code == 201
+    assert [task["order"] for task in resp.json()] == list(range(2, 42))
+    assert len(resp.json()[0]["required_equipment"]) == 2
+    # Constant in the number of items (40 tasks, 80 equipment links).
+    assert len(ctx.captured_queries) < 20
+    job.refresh_from_db()
+    assert job.overdue is True
+
+
+@pytest.mark.django_db
+def test_bulk_task_update_checks_each_task(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech1 = user_factory(role="Technician", email="tech1@example.com")
+    drill = Equipment.objects.create(name="Drill", type="Tool", serial_number="D1")
+    mine = Job.objects.create(
+        title="Mine", client_name="C", created_by=admin, assigned_to=tech1
+    )
+    other = Job.objects.create(title="Other", client_name="C", created_by=admin)
+    first = JobTask.objects.create(job=mine, order=1, title="A")
+    second = JobTask.objects.create(job=mine, order=2, title="B")
+    foreign = JobTask.objects.create(job=other, order=1, title="C")
+    api_client.force_authenticate(user=tech1)
+
+    resp = api_client.patch(
+        "/api/job-tasks/bulk/",
+        [
+            {"id": first.id, "status": "Completed"},
+            {"id": foreign.id, "status": "Completed"},
+        ],
+        format="json",
+    )
+    assert resp.status_code == 400
+    assert resp.json()[0] == {} and "non_field_errors" in resp.json()[1]
+
+    resp = api_client.patch(
+        "/api/job-tasks/bulk/",
+        [
+            {"id": first.id, "status": "Completed"},
+            {"id": second.id, "required_equipment_ids": [drill.id]},
+        ],
+        format="json",
+    )
+    assert resp.status_code == 200
+    first.refresh_from_db()
+    assert first.status == "Completed" and first.completed_at is not None
+    assert list(second.required_equipment.all()) == [drill]
+    assert resp.json()[1]["required_equipment"][0]["id"] == drill.id
+
+
+@pytest.mark.django_db
+def test_analytics_filters_by_date_range_and_technician(
+    api_client, user_factory, django_capture_on_commit_callbacks
+):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech1 = user_factory(role="Technician", email="tech1@example.com")
+    drill = Equipment.objects.create(name="Drill", type="Tool", serial_number="D1")
+    saw = Equipment.objects.create(name="Saw", type="Tool", serial_number="S1")
+    now = timezone.now()
+    last_week = now - timezone.timedelta(days=7)
+    mine = Job.objects.create(
+        title="Mine", client_name="C", created_by=admin, assigned_to=tech1
+    )
+    other = Job.objects.create(title="Other", client_name="C", created_by=admin)
+    with django_capture_on_commit_callbacks(execute=True):
+        for job, order, completed_at, tools in [
+            (mine, 1, now, [drill]),
+            (mine, 2, last_week, [saw]),
+            (other, 1, now, [saw]),
+            (other, 2, now, [saw]),
+            (other, 3, None, [saw, drill]),
+        ]:
+            task = JobTask.objects.create(
+                job=job, order=order, title="T", completed_at=completed_at
+            )
+            task.required_equipment.set(tools)
+    api_client.force_authenticate(user=admin)
+
+    resp = api_client.get("/api/jobs/analytics/")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["avg_completed_tasks_per_job"] == 2
+    assert [(e["name"], e["uses"]) for e in data["top_equipment_by_usage"]] == [
+        ("Saw", 4),
+        ("Drill", 2),
+    ]
+
+    today = now.date().isoformat()
+    resp = api_client.get(f"/api/jobs/analytics/?start={today}&end={today}")
+    data = resp.json()
+    assert data["avg_completed_tasks_per_job"] == 1.5
+    assert [(e["name"], e["uses"]) for e in data["top_equipment_by_usage"]] == [
+        ("Saw", 2),
+        ("Drill", 1),
+    ]
+
+    resp = api_client.get(f"/api/jobs/analytics/?technician={tech1.id}")
+    data = resp.json()
+    assert data["avg_completed_tasks_per_job"] == 2
+    assert {e["name"] for e in data["top_equipment_by_usage"]} == {"Saw", "Drill"}
+
+    resp = api_client.get(f"/api/jobs/analytics/?start={today}&end=2000-01-01")
+    assert resp.status_code == 400
+
+
+@pytest.mark.django_db
+def test_throughput_buckets_and_caches_closed_windows(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech1 = user_factory(role="Technician", email="tech1@example.com")
+    day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    day -= timezone.timedelta(days=2)
+    job = Job.objects.create(
+        title="J",
+        client_name="C",
+        created_by=admin,
+        assigned_to=tech1,
+        scheduled_date=day,
+    )
+    for order, minutes in enumerate([60, 90, 120, 600], start=1):
+        JobTask.objects.create(
+            job=job,
+            order=order,
+            title="T",
+            status="Completed",
+            completed_at=day + timezone.timedelta(minutes=minutes),
+        )
+    api_client.force_authenticate(user=admin)
+    end = day + timezone.timedelta(hours=12)
+    url = (
+        "/api/jobs/throughput/?bucket=hour"
+        f"&start={day.isoformat()}&end={end.isoformat()}"
+    ).replace("+", "%2B")
+
+    resp = api_client.get(url)
+    assert resp.status_code == 200
+    buckets = resp.json()["results"]
+    assert len(buckets) == 12
+    busy = {b["start"]: b["technicians"] for b in buckets if b["technicians"]}
+    assert [
+        [(t["technician"], t["completed"]) for t in rows] for rows in busy.values()
+    ] == [
+        [(tech1.id, 2)],
+        [(tech1.id, 1)],
+        [(tech1.id, 1)],
+    ]
+    first_hour = list(busy.values())[0][0]["cycle_time_seconds"]
+    assert first_hour == {"p50": 4500.0, "p90": 5220.0, "p95": 5310.0}
+
+    # Every bucket of that range is closed: repeats come from the cache.
+    with CaptureQueriesContext(connection) as ctx:
+        assert api_client.get(url).json() == resp.json()
+    assert not [q for q in ctx.captured_queries if "jobs_jobtask" in q["sql"]]
+
+    resp = api_client.get("/api/jobs/throughput/?bucket=week")
+    assert resp.status_code == 200
+    assert (
+        sum(t["completed"] for b in resp.json()["results"] for t in b["technicians"])
+        == 4
+    )
+    assert api_client.get("/api/jobs/throughput/?bucket=year").status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_streams_csv_and_ndjson(api_client, user_factory, monkeypatch):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    drill = Equipment.objects.create(name="Drill", type="Tool", serial_number="D1")
+    saw = Equipment.objects.create(name="Saw", type="Tool", serial_number="S1")
+    jobs = []
+    for i in range(5):
+        job = Job.objects.create(title=f"Job {i}", client_name="C", created_by=admin)
+        for order in (1, 2):
+            task = JobTask.objects.create(job=job, order=order, title=f"T{order}")
+            task.required_equipment.set([drill, saw][:order])
+        jobs.append(job)
+    api_client.force_authenticate(user=admin)
+    monkeypatch.setattr(JobViewSet, "export_chunk_size", 2)
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get("/api/jobs/export/?format=ndjson")
+        body = b"".join(resp.streaming_content).decode()
+    assert resp["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert lines == api_client.get("/api/jobs/?page_size=50").json()["results"]
+    # One query per chunk for jobs, tasks and equipment (3 chunks of 2).
+    assert len(ctx.captured_queries) <= 1 + 3 * 3
+    Job.objects.filter(pk=jobs[3].pk).update(
+        scheduled_date=timezone.now() - timezone.timedelta(days=1)
+    )
+    resp = api_client.get("/api/jobs/export/?format=ndjson&ordering=-created_at")
+    exported = [json.loads(line)["id"] for line in resp.streaming_content]
+    listed = api_client.get("/api/jobs/?ordering=-created_at").json()["results"]
+    assert exported == [job["id"] for job in listed] == [j.id for j in jobs[::-1]]
+    resp = api_client.get("/api/jobs/export/?format=ndjson")
+    exported = [json.loads(line)["id"] for line in resp.streaming_content]
+    assert exported[0] == jobs[3].id
+
+    resp = api_client.get(f"/api/job-tasks/export/?format=csv&job={jobs[0].id}")
+    assert resp.status_code == 200
+    assert resp["Content-Disposition"].startswith('attachment; filename="jobtask-')
+    rows = list(csv.DictReader(io.StringIO(b"".join(resp.streaming_content).decode())))
+    assert [row["order"] for row in rows] == ["1", "2"]
+    assert rows[1]["required_equipment"] == f"{drill.id}|{saw.id}"
+
+    rows = list(
+        csv.DictReader(
+            io.StringIO(
+                b"".join(
+                    api_client.get(
+                        "/api/jobs/export/", HTTP_ACCEPT="text/csv"
+                    ).streaming_content
+                ).decode()
+            )
+        )
+    )
+    assert len(rows) == 5 and "tasks" not in rows[0]
+
+
+@pytest.mark.django_db
+def test_import_upload_runs_in_background(
+    api_client, user_factory, settings, tmp_path, django_capture_on_commit_callbacks
+):
+    settings.MEDIA_ROOT = tmp_path
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech1 = user_factory(role="Technician", email="tech1@example.com")
+    upload = SimpleUploadedFile(
+        "equipment.csv", b"name,type,serial_number\nDrill,Tool,D1\nSaw,Tool,\n"
+    )
+
+    api_client.force_authenticate(user=tech1)
+    resp = api_client.post(
+        "/api/imports/", {"kind": "equipment", "file": upload}, format="multipart"
+    )
+    assert resp.status_code == 403
+
+    api_client.force_authenticate(user=admin)
+    bad = SimpleUploadedFile("equipment.xlsx", b"")
+    resp = api_client.post(
+        "/api/imports/", {"kind": "equipment", "file": bad}, format="multipart"
+    )
+    assert resp.status_code == 400 and "file" in resp.json()
+
+    upload.seek(0)
+    with django_capture_on_commit_callbacks() as callbacks:
+        resp = api_client.post(
+            "/api/imports/", {"kind": "equipment", "file": upload}, format="multipart"
+        )
+    assert resp.status_code == 202
+    run_id = resp.json()["id"]
+    assert resp.json()["status"] == "Pending"
+    assert len(callbacks) == 1  # the Celery enqueue, after commit
+
+    assert import_file(run_id) == {"processed": 2, "imported": 1, "failed": 1}
+    run = api_client.get(f"/api/imports/{run_id}/").json()
+    assert run["status"] == "Completed"
+    assert (run["rows_processed"], run["rows_imported"], run["rows_failed"]) == (
+        2,
+        1,
+        1,
+    )
+    assert run["errors"][0]["row"] == 3
+    assert "serial_number" in run["errors"][0]["errors"]
+    assert Equipment.objects.get().serial_number == "D1"
+
+    upload.seek(0)
+    newer = api_client.post(
+        "/api/imports/", {"kind": "equipment", "file": upload}, format="multipart"
+    ).json()["id"]
+    listed = api_client.get("/api/imports/").json()["results"]
+    assert [item["id"] for item in listed] == [newer, run_id]
+
+
+@pytest.mark.django_db
+def test_list_filters_and_ordering(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech1 = user_factory(role="Technician", email="tech1@example.com")
+    now = timezone.now()
+    jobs = {}
+    for name, status, priority, tech, days in [
+        ("a", "Scheduled", "High", tech1, 1),
+        ("b", "Scheduled", "Low", None, 2),
+        ("c", "Draft", "High", tech1, 3),
+        ("d", "Completed", "Urgent", None, -1),
+    ]:
+        jobs[name] = Job.objects.create(
+            title=name,
+            client_name="Acme" if name in "ab" else "Other",
+            created_by=admin,
+            assigned_to=tech,
+            status=status,
+            priority=priority,
+            scheduled_date=now + timezone.timedelta(days=days),
+        )
+    done = JobTask.objects.create(
+        job=jobs["a"], order=1, title="T", status="Completed", completed_at=now
+    )
+    JobTask.objects.create(job=jobs["b"], order=1, title="T")
+    JobTask.objects.create(job=jobs["c"], order=1, title="T", status="InProgress")
+    api_client.force_authenticate(user=admin)
+
+    def titles(query):
+        resp = api_client.get(f"/api/jobs/?{query}")
+        assert resp.status_code == 200, resp.json()
+        return [job["title"] for job in resp.json()["results"]]
+
+    assert titles("status=Scheduled,Draft") == ["a", "b", "c"]
+    assert titles("status=Draft&status=Completed") == ["d", "c"]
+    assert titles("priority=High") == ["a", "c"]
+    assert titles(f"assigned_to={tech1.id}&priority=High") == ["a", "c"]
+    assert titles("unassigned=true") == ["d", "b"]
+    assert titles("client_name=Acme") == ["a", "b"]
+    after = (now + timezone.timedelta(days=2)).date().isoformat()
+    assert titles(
+        f"scheduled_after={now.date().isoformat()}&scheduled_before={after}"
+    ) == ["a"]
+    assert titles("ordering=-created_at") == ["d", "c", "b", "a"]
+
+    # Ordered pages keep seeking on the chosen ordering.
+    resp = api_client.get("/api/jobs/?ordering=-created_at&page_size=3")
+    page = api_client.get(resp.json()["next"]).json()
+    assert [job["title"] for job in page["results"]] == ["a"]
+
+    assert api_client.get("/api/jobs/?status=Bogus").status_code == 400
+    assert api_client.get("/api/jobs/?ordering=title").status_code == 400
+
+    def task_jobs(query):
+        resp = api_client.get(f"/api/job-tasks/?{query}")
+        assert resp.status_code == 200, resp.json()
+        return [task["job"] for task in resp.json()["results"]]
+
+    assert task_jobs("status=Pending,InProgress") == [jobs["b"].id, jobs["c"].id]
+    assert task_jobs(f"technician={tech1.id}") == [jobs["a"].id, jobs["c"].id]
+    assert task_jobs(f"completed_after={now.date().isoformat()}") == [done.job_id]
+    assert task_jobs("ordering=-updated_at")[0] == jobs["c"].id
+    assert api_client.get("/api/job-tasks/?job=abc").status_code == 400
+
+
+@pytest.mark.django_db
+def test_search_endpoint_ranks_pages_and_filters(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    for i in range(3):
+        job = Job.objects.create(
+            title=f"Pump repair {i}", client_name="Acme", created_by=admin
+        )
+    task = JobTask.objects.create(job=job, order=1, title="Replace pump seal")
+    Job.objects.create(
+        title="Inspection", description="check the pump", created_by=admin
+    )
+    pump = Equipment.objects.create(name="Pump jack", type="Tool", serial_number="P1")
+
+    assert api_client.get("/api/search/?q=pump").status_code in (401, 403)
+    api_client.force_authenticate(user=admin)
+
+    resp = api_client.get("/api/search/?q=pum&page_size=4")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["previous"] is None and len(body["results"]) == 4
+    # Body-only matches rank last.
+    rest = api_client.get(body["next"]).json()
+    assert rest["next"] is None and rest["previous"]
+    assert rest["results"][-1]["object"]["title"] == "Inspection"
+    hits = body["results"] + rest["results"]
+    assert len(hits) == 6
+    assert [hit["score"] for hit in hits] == sorted(
+        (hit["score"] for hit in hits), reverse=True
+    )
+    by_kind = {(hit["kind"], hit["id"]): hit["object"] for hit in hits}
+    assert by_kind[("task", task.id)]["title"] == "Replace pump seal"
+    assert by_kind[("equipment", pump.id)]["serial_number"] == "P1"
+    assert "tasks" not in by_kind[("job", job.id)]
+
+    resp = api_client.get("/api/search/?q=pump&kind=task,equipment")
+    assert {hit["kind"] for hit in resp.json()["results"]} == {"task", "equipment"}
+    assert api_client.get("/api/search/?q=pump repair acme").json()["results"]
+    assert api_client.get("/api/search/?q=pump&kind=bogus").status_code == 400
+    assert api_client.get("/api/search/").status_code == 400
+
+    # The admin changelists search through the same index.
+    job_admin = site._registry[Job]
+    found, _ = job_admin.get_search_results(None, Job.objects.all(), "insp")
+    assert list(found.values_list("title", flat=True)) == ["Inspection"]
+    task_admin = site._registry[JobTask]
+    found, _ = task_admin.get_search_results(None, JobTask.objects.all(), "repair 2")
+    with CaptureQueriesContext(connection) as ctx:
+        assert list(found) == [task]
+    # The matches stay in the database as a subquery against the index.
+    (query,) = ctx.captured_queries
+    assert "jobs_search_index" in query["sql"]
+
+
+@pytest.mark.django_db
+def test_reference_data_is_cached_until_it_changes(api_client, user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech = user_factory(role="Technician", email="tech@example.com")
+    Equipment.objects.create(name="Drill", type="Tool", serial_number="D1")
+    api_client.force_authenticate(user=admin)
+
+    assert len(api_client.get("/api/equipment/").json()["results"]) == 1
+    assert _query_count(api_client, "/api/equipment/") == 0
+    Equipment.objects.create(name="Saw", type="Tool", serial_number="S1")
+    assert len(api_client.get("/api/equipment/").json()["results"]) == 2
+
+    payload = {"title": "J", "client_name": "C", "assigned_to": tech.id}
+    assert api_client.post("/api/jobs/", payload).status_code == 201
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.post("/api/jobs/", payload)
+    assert resp.status_code == 201 and resp.json()["assigned_to"] == tech.id
+    assert not any('FROM "user_user"' in q["sql"] for q in ctx.captured_queries)
+
+    resp = api_client.post("/api/jobs/", {**payload, "assigned_to": tech.id + 100})
+    assert resp.status_code == 400 and "assigned_to" in resp.json()
+    resp = api_client.post("/api/jobs/", {**payload, "assigned_to": "x"})
+    assert resp.status_code == 400
@@ -1,7 +1,42 @@
+import json
+from io import StringIO
+
 import pytest
+from celery.result import AsyncResult
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.utils import timezone
-from django.db import IntegrityError
-from jobs.models import Job, JobTask, Equipment
+from django.db import IntegrityError, connection
+from jobs.benchmarks import compare, load
+from jobs.bulk import create_tasks
+from jobs.counters import repair_counters
+from jobs.models import (
+    Equipment,
+    EquipmentDayUsage,
+    EquipmentUsage,
+    Job,
+    JobCompletionRollup,
+    JobTask,
+    OverdueDeadline,
+)
+from jobs.overdue import process_due_deadlines, recalculate_overdue
+from jobs import reference
+from jobs.rollups import job_analytics, rebuild_rollups
+from jobs.seed import SeedPlan, generate
+from jobs.search import backend, matching_ids, search
+from jobs.tasks import (
+    lock_key,
+    reconcile_analytics_rollups,
+    reconcile_overdue_jobs,
+    update_overdue_jobs,
+)
+
+
+def batch_totals(launched):
+    """Totals of a fanned-out pass (tasks run eagerly in tests)."""
+    return AsyncResult(launched.get()["summary_id"]).get()
 
 
 @pytest.mark.django_db
@@ -54,3 +89,496 @@ def test_equipment_can_be_assigned_to_tasks(user_factory):
     task.required_equipment.add(eq)
     assert eq in task.required_equipment.all()
     assert task in eq.task_usages.all()
+
+
+@pytest.mark.django_db
+def test_reconcile_overdue_jobs_flips_only_changed_rows(user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    past = timezone.now() - timezone.timedelta(days=1)
+    late = Job.objects.create(
+        title="Late", client_name="C", created_by=admin, scheduled_date=past
+    )
+    JobTask.objects.create(job=late, order=1, title="Open")
+    done = Job.objects.create(
+        title="Done", client_name="C", created_by=admin, scheduled_date=past
+    )
+    JobTask.objects.create(job=done, order=1, title="Closed", status="Completed")
+    stale = Job.objects.create(title="Stale flag", client_name="C", created_by=admin)
+    Job.objects.create(title="Future", client_name="C", created_by=admin)
+    # Simulate drift from writes that bypass model signals.
+    Job.objects.filter(pk=late.pk).update(overdue=False)
+    Job.objects.filter(pk=stale.pk).update(overdue=True)
+
+    stats = batch_totals(reconcile_overdue_jobs.delay())
+
+    assert stats["scanned"] == 4
+    assert stats["flipped_on"] == 1
+    assert stats["flipped_off"] == 1
+    assert set(Job.objects.filter(overdue=True)) == {late}
+    assert batch_totals(reconcile_overdue_jobs.delay())["flipped"] == 0
+
+
+@pytest.mark.django_db
+def test_batch_passes_fan_out_over_id_ranges(user_factory, settings):
+    settings.BATCH_CHUNK_SIZE = 2
+    admin = user_factory(role="Admin", email="admin@example.com")
+    past = timezone.now() - timezone.timedelta(hours=1)
+    for i in range(5):
+        job = Job.objects.create(
+            title=f"J{i}", client_name="C", created_by=admin, scheduled_date=past
+        )
+        JobTask.objects.create(job=job, order=1, title="Open")
+    Job.objects.update(overdue=False, tasks_total=0)
+    Equipment.objects.create(name="Drill")
+
+    launched = reconcile_overdue_jobs.delay().get()
+    assert launched["ranges"] == 3
+    stats = AsyncResult(launched["summary_id"]).get()
+    assert stats["scanned"] == 5
+    assert stats["counters_repaired"] == 5
+    assert stats["flipped_on"] == 5
+    assert Job.objects.filter(overdue=False).count() == 0
+    assert cache.get(lock_key("reconcile_overdue_jobs")) is None
+
+    totals = batch_totals(reconcile_analytics_rollups.delay())
+    assert (totals["jobs"], totals["equipment"]) == (5, 1)
+    assert EquipmentUsage.objects.get().uses == 0
+
+
+@pytest.mark.django_db
+def test_scheduled_tasks_skip_overlapping_runs():
+    cache.set(lock_key("update_overdue_jobs"), "other-run")
+    cache.set(lock_key("reconcile_overdue_jobs"), "other-run")
+    assert update_overdue_jobs.delay().get() == {"skipped": "previous run still active"}
+    assert reconcile_overdue_jobs.delay().get()["skipped"]
+    # A run that did not take the lock leaves it alone.
+    assert cache.get(lock_key("update_overdue_jobs")) == "other-run"
+
+    cache.clear()
+    assert "scanned" in update_overdue_jobs.delay().get()
+    assert cache.get(lock_key("update_overdue_jobs")) is None
+    assert reconcile_overdue_jobs.delay().get() == {"ranges": 0, "summary_id": None}
+
+
+@pytest.mark.django_db
+def test_recalculate_overdue_walks_id_windows(user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    past = timezone.now() - timezone.timedelta(hours=1)
+    for i in range(5):
+        job = Job.objects.create(
+            title=f"J{i}", client_name="C", created_by=admin, scheduled_date=past
+        )
+        JobTask.objects.create(job=job, order=1, title="Open")
+    Job.objects.update(overdue=False)
+
+    result = recalculate_overdue(chunk_size=2)
+
+    assert result.scanned == 5
+    assert result.flipped_on == 5
+    assert Job.objects.filter(overdue=False).count() == 0
+
+
+@pytest.mark.django_db
+def test_task_changes_keep_job_overdue_current(user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    job = Job.objects.create(
+        title="Late",
+        client_name="C",
+        created_by=admin,
+        scheduled_date=timezone.now() - timezone.timedelta(hours=1),
+    )
+    task = JobTask.objects.create(job=job, order=1, title="Open")
+    job.refresh_from_db()
+    assert job.overdue is True
+
+    task.status = JobTask.Status.COMPLETED
+    task.save()
+    job.refresh_from_db()
+    assert job.overdue is False
+
+    JobTask.objects.create(job=job, order=2, title="Follow-up")
+    job.refresh_from_db()
+    assert job.overdue is True
+
+    job.tasks.get(order=2).delete()
+    job.refresh_from_db()
+    assert job.overdue is False
+
+
+@pytest.mark.django_db
+def test_future_job_is_queued_and_flipped_when_due(user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    scheduled = timezone.now() + timezone.timedelta(hours=2)
+    job = Job.objects.create(
+        title="Soon", client_name="C", created_by=admin, scheduled_date=scheduled
+    )
+    JobTask.objects.create(job=job, order=1, title="Open")
+    assert OverdueDeadline.objects.get(job=job).due_at == scheduled
+
+    assert process_due_deadlines().flipped_on == 0
+    result = process_due_deadlines(now=scheduled + timezone.timedelta(seconds=1))
+    assert result.scanned == 1
+    assert result.flipped_on == 1
+    assert not OverdueDeadline.objects.exists()
+    job.refresh_from_db()
+    assert job.overdue is True
+
+
+@pytest.mark.django_db
+def test_rescheduling_job_updates_overdue_and_deadline(user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    job = Job.objects.create(
+        title="Moved",
+        client_name="C",
+        created_by=admin,
+        scheduled_date=timezone.now() - timezone.timedelta(hours=1),
+    )
+    JobTask.objects.create(job=job, order=1, title="Open")
+
+    job = Job.objects.get(pk=job.pk)
+    job.scheduled_date = timezone.now() + timezone.timedelta(days=1)
+    job.save()
+    job.refresh_from_db()
+    assert job.overdue is False
+    assert OverdueDeadline.objects.filter(job=job).exists()
+
+
+def _counters(job):
+    job.refresh_from_db()
+    return (
+        job.tasks_total,
+        job.tasks_pending,
+        job.tasks_in_progress,
+        job.tasks_completed,
+    )
+
+
+@pytest.mark.django_db
+def test_task_counters_follow_task_writes(user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    first = Job.objects.create(title="First", client_name="C", created_by=admin)
+    second = Job.objects.create(title="Second", client_name="C", created_by=admin)
+    a = JobTask.objects.create(job=first, order=1, title="A")
+    b = JobTask.objects.create(job=first, order=2, title="B", status="InProgress")
+    assert first.tasks_total == 2  # the in-memory parent follows along
+    assert _counters(first) == (2, 1, 1, 0)
+
+    a = JobTask.objects.get(pk=a.pk)
+    a.status = "Completed"
+    a.save()
+    b = JobTask.objects.get(pk=b.pk)
+    b.job = second
+    b.save()
+    assert _counters(first) == (1, 0, 0, 1)
+    assert _counters(second) == (1, 0, 1, 0)
+
+    # A full save of a stale job does not write its counters or its
+    # overdue flag back.
+    stale = Job.objects.get(pk=second.pk)
+    JobTask.objects.create(job=second, order=5, title="C")
+    Job.objects.filter(pk=second.pk).update(overdue=True)
+    stale.title = "Renamed"
+    stale.save()
+    assert _counters(second) == (2, 1, 1, 0)
+    assert second.overdue is True
+
+    b.delete()
+    assert _counters(second) == (1, 1, 0, 0)
+    assert first.has_incomplete_tasks is False
+
+    # Two stale copies of one task move its status only once.
+    c = JobTask.objects.get(job=second)
+    copy = JobTask.objects.get(pk=c.pk)
+    c.status = copy.status = "Completed"
+    c.save()
+    copy.save()
+    assert _counters(second) == (1, 0, 0, 1)
+    copy.status = "InProgress"
+    copy.job = first
+    copy.save()
+    assert _counters(first) == (2, 0, 1, 1)
+    assert _counters(second) == (0, 0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_repair_task_counters_command(user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    job = Job.objects.create(title="Drift", client_name="C", created_by=admin)
+    JobTask.objects.create(job=job, order=1, title="A")
+    JobTask.objects.filter(job=job).update(status="Completed")
+
+    with pytest.raises(CommandError):
+        call_command("repair_task_counters", "--check", stdout=StringIO())
+    call_command("repair_task_counters", stdout=StringIO())
+    assert _counters(job) == (1, 0, 0, 1)
+    call_command("repair_task_counters", "--check", stdout=StringIO())
+
+
+def _rollups():
+    return (
+        sorted(JobCompletionRollup.objects.values_list("job_id", "day", "completed")),
+        sorted(
+            EquipmentDayUsage.objects.values_list(
+                "equipment_id", "job_id", "day", "uses"
+            )
+        ),
+        sorted(EquipmentUsage.objects.values_list("equipment_id", "uses")),
+    )
+
+
+@pytest.mark.django_db
+def test_analytics_rollups_follow_writes(
+    user_factory, django_capture_on_commit_callbacks
+):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    job = Job.objects.create(title="J", client_name="C", created_by=admin)
+    drill = Equipment.objects.create(name="Drill", type="Tool", serial_number="D1")
+    saw = Equipment.objects.create(name="Saw", type="Tool", serial_number="S1")
+    now = timezone.now()
+    day = now.date()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        done = JobTask.objects.create(
+            job=job, order=1, title="A", status="Completed", completed_at=now
+        )
+        done.required_equipment.set([drill, saw])
+        open_task = JobTask.objects.create(job=job, order=2, title="B")
+        open_task.required_equipment.add(drill)
+    assert _rollups() == (
+        [(job.id, day, 1)],
+        [(drill.id, job.id, day, 1), (saw.id, job.id, day, 1)],
+        [(drill.id, 2), (saw.id, 1)],
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        saw.task_usages.clear()
+        open_task.status = "Completed"
+        open_task.completed_at = now
+        open_task.save()
+    assert _rollups() == (
+        [(job.id, day, 2)],
+        [(drill.id, job.id, day, 2)],
+        [(drill.id, 2), (saw.id, 0)],
+    )
+    assert job_analytics()["avg_completed_tasks_per_job"] == 2
+
+    with django_capture_on_commit_callbacks(execute=True):
+        done.delete()
+    maintained = _rollups()
+    assert maintained[2] == [(drill.id, 1), (saw.id, 0)]
+
+    # The nightly rebuild agrees with what the signals maintained.
+    EquipmentUsage.objects.all().delete()
+    JobCompletionRollup.objects.all().delete()
+    assert rebuild_rollups(chunk_size=1) == {"jobs": 1, "equipment": 2}
+    assert _rollups() == maintained
+
+    with django_capture_on_commit_callbacks(execute=True):
+        job.delete()
+    assert _rollups() == ([], [], [(drill.id, 0), (saw.id, 0)])
+
+
+@pytest.mark.django_db
+def test_import_data_command(
+    user_factory, tmp_path, django_capture_on_commit_callbacks
+):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech = user_factory(role="Technician", email="tech1@example.com")
+    Equipment.objects.create(name="Old", type="Tool", serial_number="OLD")
+
+    equipment = tmp_path / "equipment.csv"
+    equipment.write_text(
+        "name,type,serial_number,is_active\n"
+        "Drill,Tool,D1,true\n"
+        "Saw,Tool,S1,\n"
+        "Clash,Tool,OLD,true\n"
+        "Again,Tool,D1,true\n"
+        ",Tool,X1,true\n"
+    )
+    out, err = StringIO(), StringIO()
+    call_command(
+        "import_data", "equipment", str(equipment), batch_size=2, stdout=out, stderr=err
+    )
+    assert "Imported 2 of 5 equipment rows." in out.getvalue()
+    assert [line.split(":")[0] for line in err.getvalue().splitlines()] == [
+        "row 4",
+        "row 5",
+        "row 6",
+    ]
+    assert EquipmentUsage.objects.filter(equipment__serial_number="S1").exists()
+
+    jobs = tmp_path / "jobs.ndjson"
+    jobs.write_text(
+        '{"title": "A", "client_name": "C", "assigned_to": "tech1@example.com",'
+        ' "scheduled_date": "2020-01-01T09:00:00Z", "tasks": ['
+        '{"order": 1, "title": "T1", "required_equipment": ["D1", "S1"]},'
+        '{"order": 2, "title": "T2", "status": "Completed"}]}\n'
+        '{"title": "B", "client_name": "C", "created_by": "nobody@example.com"}\n'
+        "not json\n"
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command(
+            "import_data",
+            "jobs",
+            str(jobs),
+            created_by="admin@example.com",
+            stdout=out,
+            stderr=err,
+        )
+    job = Job.objects.get(title="A")
+    assert (job.created_by, job.assigned_to) == (admin, tech)
+    assert _counters(job) == (2, 1, 0, 1)
+    assert job.overdue is True
+    first = job.tasks.get(order=1)
+    assert sorted(first.required_equipment.values_list("serial_number", flat=True)) == [
+        "D1",
+        "S1",
+    ]
+    assert job.tasks.get(order=2).completed_at is not None
+    assert not Job.objects.filter(title="B").exists()
+    assert EquipmentUsage.objects.get(equipment__serial_number="D1").uses == 1
+    assert JobCompletionRollup.objects.get(job=job).completed == 1
+
+    tasks = tmp_path / "tasks.txt"
+    tasks.write_text(
+        "job,order,title,required_equipment\n"
+        f"{job.id},3,T3,D1|S1\n"
+        f"{job.id},1,Clash,\n"
+        f"{job.id},4,Bad,NOPE\n"
+    )
+    with pytest.raises(CommandError):
+        call_command("import_data", "tasks", str(tasks), stdout=out, stderr=err)
+    call_command("import_data", "tasks", str(tasks), fmt="csv", stdout=out, stderr=err)
+    assert list(job.tasks.values_list("order", flat=True)) == [1, 2, 3]
+    assert _counters(job) == (3, 2, 0, 1)
+    assert EquipmentUsage.objects.get(equipment__serial_number="D1").uses == 2
+
+
+@pytest.mark.django_db
+def test_search_index_follows_writes(user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    drill = Equipment.objects.create(
+        name="Drill press", type="Tool", serial_number="DP1"
+    )
+    job = Job.objects.create(
+        title="Boiler service",
+        description="Annual drill of the pressure valve",
+        client_name="Acme",
+        created_by=admin,
+    )
+    task = JobTask.objects.create(job=job, order=1, title="Drain boiler")
+
+    # Prefix words, all required; title matches outrank body matches.
+    assert [(kind, pk) for kind, pk, _ in search("dri pre")] == [
+        ("equipment", drill.pk),
+        ("job", job.pk),
+    ]
+    assert matching_ids("task", "drain") == [task.pk]
+    assert search("boiler", kinds=["job"])[0][:2] == ("job", job.pk)
+    assert search("  ") == []
+
+    job.title = "Furnace service"
+    job.save()
+    assert matching_ids("job", "boiler") == []
+    assert matching_ids("job", "furnace") == [job.pk]
+
+    task.delete()
+    drill.delete()
+    assert matching_ids("task", "drain") == []
+    assert matching_ids("equipment", "drill") == []
+
+    tasks = [
+        {"job": job.id, "order": 2, "title": "Flush lines"},
+        {"job": job.id, "order": 3, "title": "Flush tank"},
+    ]
+    ids = create_tasks(tasks)
+    assert sorted(matching_ids("task", "flush")) == sorted(ids)
+
+    with connection.cursor() as cursor:
+        backend().clear(cursor)
+    assert matching_ids("job", "furnace") == []
+    out = StringIO()
+    call_command("rebuild_search_index", "--chunk-size", "1", stdout=out)
+    assert "Indexed 3 objects" in out.getvalue()
+    assert matching_ids("job", "furnace") == [job.pk]
+
+
+@pytest.mark.django_db
+def test_reference_cache_is_versioned_and_serves_stale_while_locked(
+    user_factory, monkeypatch
+):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert reference.cached("equipment", "n", compute) == 1
+    assert reference.cached("equipment", "n", compute) == 1
+    reference.invalidate("equipment")
+    assert reference.cached("equipment", "n", compute) == 2
+
+    # While another process holds the recompute lock, the stale value is served.
+    reference.invalidate("equipment")
+    cache.add(reference.entry_key("equipment", "n") + ":lock", 1)
+    assert reference.cached("equipment", "n", compute) == 2
+    assert len(calls) == 2
+    # With nothing to serve, a reader waits briefly, then computes itself.
+    monkeypatch.setattr(reference, "WAIT_TIMEOUT", 0.1)
+    cache.add(reference.entry_key("equipment", "m") + ":lock", 1)
+    assert reference.cached("equipment", "m", compute) == 3
+
+    tech = user_factory(role="Technician")
+    assert reference.user_role(tech.pk) == "Technician"
+    assert reference.user_role(tech.pk + 1) is None
+    tech.role = "Admin"
+    tech.save()
+    assert reference.user_stub(tech.pk).role == "Admin"
+
+
+@pytest.mark.django_db
+def test_seeded_generator_and_benchmark_baselines(tmp_path):
+    plan = SeedPlan(technicians=4, sales_agents=2, equipment=5, jobs=30, seed=7)
+    anchor = timezone.now().replace(microsecond=0)
+    counts = generate(plan, anchor=anchor, batch_size=8)
+    assert (counts["users"], counts["equipment"], counts["jobs"]) == (7, 5, 30)
+    assert counts["tasks"] == JobTask.objects.count() > 30
+    assert repair_counters(dry_run=True) == []
+    snapshot = list(Job.objects.order_by("pk").values_list("title", "status"))
+
+    # The same seed and anchor give the same data.
+    Job.objects.all().delete()
+    Equipment.objects.all().delete()
+    User = get_user_model()
+    User.objects.all().delete()
+    generate(plan, anchor=anchor, batch_size=8)
+    assert list(Job.objects.order_by("pk").values_list("title", "status")) == snapshot
+
+    baseline = tmp_path / "baseline.json"
+    out = StringIO()
+    call_command("benchmark", "--iterations", "2", "--save", str(baseline), stdout=out)
+    assert "job-list" in out.getvalue() and "update-overdue-jobs" in out.getvalue()
+    report = load(baseline)
+    assert report["dataset"]["jobs"] == 30
+    assert report["scenarios"]["job-analytics"]["queries"] > 0
+    assert compare(report, report) == []
+
+    # Fewer queries and a much faster run in the baseline: both are flagged.
+    cheaper = {"scenarios": {"job-list": dict(report["scenarios"]["job-list"])}}
+    cheaper["scenarios"]["job-list"]["queries"] -= 1
+    cheaper["scenarios"]["job-list"]["p95_ms"] = 0.0
+    flagged = compare(report, cheaper)
+    assert {item["metric"] for item in flagged} >= {"queries"}
+    (tmp_path / "cheaper.json").write_text(json.dumps(cheaper))
+    with pytest.raises(CommandError, match="regression"):
+        call_command(
+            "benchmark",
+            "--iterations",
+            "1",
+            "--scenario",
+            "job-list",
+            "--compare",
+            str(tmp_path / "cheaper.json"),
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
@@ -0,0 +1,138 @@
+"""
+Query-plan regression suite.
+
+Every query the hot endpoints in jobs/views.py and the periodic tasks in
+jobs/tasks.py send is captured and EXPLAINed; the test fails when any of
+them reads one of the jobs tables with a full table scan. Scans of an index
+(ordered listings, covering aggregates) are fine.
+"""
+
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from jobs.models import Equipment, Job, JobTask
+from jobs.sync import issue_token
+from jobs.tasks import reconcile_overdue_jobs, update_overdue_jobs
+
+PLANNED = re.compile(r"^\s*(SELECT|UPDATE|DELETE)\b", re.IGNORECASE)
+SQLITE_TABLE_SCAN = re.compile(r"\bSCAN (\w+)(?: AS \w+)?\s*$")
+POSTGRES_TABLE_SCAN = re.compile(r"\bSeq Scan on (\w+)")
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+        # Tiny test tables always favour a sequential scan; only count the
+        # ones the planner cannot avoid.
+        cursor.execute("SET enable_seqscan = off")
+        try:
+            cursor.execute(f"EXPLAIN {sql}")
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.execute("RESET enable_seqscan")
+
+
+def full_scans(sql):
+    pattern = (
+        SQLITE_TABLE_SCAN if connection.vendor == "sqlite" else POSTGRES_TABLE_SCAN
+    )
+    scans = []
+    for line in explain(sql):
+        match = pattern.search(line)
+        if match and match.group(1).startswith("jobs_"):
+            scans.append(line.strip())
+    return scans
+
+
+def assert_indexed(queries):
+    planned = [q["sql"] for q in queries if PLANNED.match(q["sql"])]
+    assert planned, "no queries captured"
+    offenders = {sql: scans for sql in planned if (scans := full_scans(sql))}
+    assert not offenders, "\n\n".join(
+        f"{sql}\n  -> {', '.join(scans)}" for sql, scans in offenders.items()
+    )
+
+
+@pytest.fixture
+def field_data(user_factory):
+    admin = user_factory(role="Admin", email="admin@example.com")
+    tech = user_factory(role="Technician", email="tech1@example.com")
+    tools = [
+        Equipment.objects.create(name=f"Tool {i}", type="Tool", serial_number=f"T{i}")
+        for i in range(3)
+    ]
+    now = timezone.now()
+    for i in range(6):
+        job = Job.objects.create(
+            title=f"Job {i}",
+            client_name="C",
+            created_by=admin,
+            assigned_to=tech if i % 2 else None,
+            scheduled_date=now + timezone.timedelta(hours=i - 3),
+        )
+        for order in range(1, 4):
+            task = JobTask.objects.create(
+                job=job,
+                order=order,
+                title=f"T{order}",
+                status="Completed" if order == 1 else "Pending",
+                completed_at=now if order == 1 else None,
+            )
+            task.required_equipment.set(tools[:order])
+    return {"admin": admin, "tech": tech, "job": job}
+
+
+HOT_URLS = [
+    ("admin", "/api/jobs/?page_size=2"),
+    ("admin", "/api/jobs/{job}/"),
+    ("admin", "/api/job-tasks/?page_size=2"),
+    ("admin", "/api/job-tasks/?job={job}"),
+    ("admin", "/api/equipment/?page_size=2"),
+    ("admin", "/api/jobs/?status=Draft,Scheduled&overdue=false&page_size=2"),
+    ("admin", "/api/jobs/?assigned_to={tech}&page_size=2"),
+    ("admin", "/api/jobs/?client_name=C&page_size=2"),
+    ("admin", "/api/jobs/?scheduled_after=2020-01-01&page_size=2"),
+    ("admin", "/api/jobs/?ordering=-created_at&page_size=2"),
+    ("admin", "/api/job-tasks/?status=Pending&page_size=2"),
+    ("admin", "/api/job-tasks/?technician={tech}&page_size=2"),
+    ("admin", "/api/job-tasks/?completed_after=2020-01-01&ordering=-completed_at"),
+    ("admin", "/api/jobs/analytics/"),
+    ("admin", "/api/jobs/analytics/?start=2020-01-01&end=2100-01-01"),
+    ("admin", "/api/jobs/throughput/?bucket=hour"),
+    ("admin", "/api/search/?q=job&page_size=2"),
+    ("tech", "/api/technician-dashboard/"),
+    ("tech", "/api/sync/?token={token}"),
+    ("admin", "/api/sync/?token={token}"),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("role,url", HOT_URLS)
+def test_hot_endpoints_avoid_table_scans(api_client, field_data, role, url):
+    api_client.force_authenticate(user=field_data[role])
+    user = field_data[role]
+    token = issue_token(user, timezone.now() - timezone.timedelta(minutes=5))
+    url = url.format(job=field_data["job"].id, token=token, tech=field_data["tech"].id)
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(url)
+        assert resp.status_code == 200
+        next_page = resp.json().get("next") if isinstance(resp.json(), dict) else None
+        if next_page:
+            # The keyset seek of a later page.
+            assert api_client.get(next_page).status_code == 200
+    assert_indexed(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("task", [update_overdue_jobs, reconcile_overdue_jobs])
+def test_overdue_tasks_avoid_table_scans(field_data, task):
+    Job.objects.update(overdue=False)
+    with CaptureQueriesContext(connection) as ctx:
+        task()
+    assert_indexed(ctx.captured_queries)
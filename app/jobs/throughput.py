@@ -0,0 +1,172 @@
+"""
+Task throughput time series.
+
+Completed tasks are counted per time bucket (hour, day or week) and
+technician, with percentiles of the cycle time from the job's
+scheduled_date to the task's completed_at. The database truncates
+completed_at to the bucket and computes the cycle time; Python only reads
+(bucket, technician, cycle time) tuples off the cursor, never model
+instances, and sorts each group once for its percentiles. The range scan
+runs on the partial completed_at index.
+
+A bucket that ended before now is closed: its rows are cached per bucket
+(and technician filter), so a long range only queries the buckets not seen
+yet plus the open one. Late edits of completed_at inside a closed bucket
+show up once its entry expires.
+
+Technicians are the jobs' current assignees.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DurationField, ExpressionWrapper, F
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import JobTask
+
+BUCKETS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+# Range shown when the caller gives no start.
+DEFAULT_SPAN = {"hour": 48, "day": 30, "week": 26}
+MAX_BUCKETS = 1000
+PERCENTILES = (50, 90, 95)
+
+CLOSED_BUCKET_TIMEOUT = getattr(
+    settings, "THROUGHPUT_CLOSED_BUCKET_TIMEOUT", 60 * 60 * 24
+)
+
+
+def floor(moment, bucket):
+    """Start of the bucket containing ``moment``, in the current time zone."""
+    local = timezone.localtime(moment)
+    if bucket == "hour":
+        return local.replace(minute=0, second=0, microsecond=0)
+    start = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        start -= timedelta(days=start.weekday())
+    return timezone.make_aware(start.replace(tzinfo=None))
+
+
+def step(start, bucket):
+    """Start of the bucket after the one starting at ``start``."""
+    if bucket == "hour":
+        return timezone.localtime(start + BUCKETS[bucket])
+    # Calendar days and weeks: keep the wall clock across DST changes.
+    naive = timezone.localtime(start).replace(tzinfo=None) + BUCKETS[bucket]
+    return timezone.make_aware(naive)
+
+
+def bucket_starts(start, end, bucket):
+    """Starts of the buckets overlapping [start, end)."""
+    starts, current = [], floor(start, bucket)
+    while current < end:
+        starts.append(current)
+        if len(starts) > MAX_BUCKETS:
+            raise ValidationError(
+                {"start": f"The range spans more than {MAX_BUCKETS} buckets."}
+            )
+        current = step(current, bucket)
+    return starts
+
+
+def percentile(ordered, pct):
+    """Linear-interpolated percentile of an ascending list."""
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def extract(lo, hi, bucket, technician_id=None):
+    """(bucket start, technician id, cycle time) of tasks completed in [lo, hi)."""
+    tasks = JobTask.objects.filter(completed_at__gte=lo, completed_at__lt=hi)
+    if technician_id is not None:
+        tasks = tasks.filter(job__assigned_to_id=technician_id)
+    return (
+        tasks.annotate(
+            bucket=Trunc("completed_at", bucket),
+            cycle=ExpressionWrapper(
+                F("completed_at") - F("job__scheduled_date"),
+                output_field=DurationField(),
+            ),
+        )
+        .order_by()
+        .values_list("bucket", "job__assigned_to_id", "cycle")
+        .iterator(chunk_size=5000)
+    )
+
+
+def summarize(lo, hi, bucket, technician_id=None):
+    """{bucket start: [rows per technician]} for tasks completed in [lo, hi)."""
+    groups = defaultdict(lambda: [0, []])
+    for start, tech_id, cycle in extract(lo, hi, bucket, technician_id):
+        group = groups[(timezone.localtime(start), tech_id)]
+        group[0] += 1
+        if cycle is not None:
+            group[1].append(cycle.total_seconds())
+
+    summary = defaultdict(list)
+    for (start, tech_id), (completed, cycles) in sorted(
+        groups.items(), key=lambda item: (item[0][0], item[0][1] or 0)
+    ):
+        cycles.sort()
+        summary[start].append(
+            {
+                "technician": tech_id,
+                "completed": completed,
+                "cycle_time_seconds": {
+                    f"p{pct}": percentile(cycles, pct) for pct in PERCENTILES
+                },
+            }
+        )
+    return summary
+
+
+def cache_key(bucket, start, technician_id):
+    scope = technician_id if technician_id is not None else "all"
+    return f"jobs:throughput:{bucket}:{scope}:{start.isoformat()}"
+
+
+def throughput(bucket, start=None, end=None, technician_id=None, now=None):
+    """Bucketed throughput and cycle-time percentiles over [start, end)."""
+    now = now or timezone.now()
+    end = min(end or now, now)
+    if start is None:
+        start = floor(end, bucket) - BUCKETS[bucket] * (DEFAULT_SPAN[bucket] - 1)
+    if start >= end:
+        raise ValidationError({"end": "end must be after start."})
+    starts = bucket_starts(start, end, bucket)
+
+    closed = [s for s in starts if step(s, bucket) <= now]
+    keys = {s: cache_key(bucket, s, technician_id) for s in closed}
+    cached = cache.get_many(keys.values())
+    rows = {s: cached[keys[s]] for s in closed if keys[s] in cached}
+
+    missing = [s for s in starts if s not in rows]
+    if missing:
+        fresh = summarize(missing[0], step(missing[-1], bucket), bucket, technician_id)
+        for s in missing:
+            rows[s] = fresh.get(s, [])
+        cache.set_many(
+            {keys[s]: rows[s] for s in missing if s in keys},
+            CLOSED_BUCKET_TIMEOUT,
+        )
+
+    return {
+        "bucket": bucket,
+        "start": starts[0],
+        "end": step(starts[-1], bucket),
+        "results": [
+            {"start": s, "end": step(s, bucket), "technicians": rows[s]} for s in starts
+        ],
+    }
@@ -1,11 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import JobViewSet, JobTaskViewSet, EquipmentViewSet, TechnicianDashboard
+from .views import (
+    EquipmentViewSet,
+    ImportRunViewSet,
+    JobTaskViewSet,
+    JobViewSet,
+    SearchView,
+    SyncView,
+    TechnicianDashboard,
+)
 
 router = DefaultRouter()
 router.register("jobs", JobViewSet, basename="job")
 router.register("job-tasks", JobTaskViewSet, basename="jobtask")
 router.register("equipment", EquipmentViewSet, basename="equipment")
+router.register("imports", ImportRunViewSet, basename="import")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -14,4 +23,6 @@ urlpatterns = [
         TechnicianDashboard.as_view(),
         name="technician-dashboard",
     ),
+    path("sync/", SyncView.as_view(), name="sync"),
+    path("search/", SearchView.as_view(), name="search"),
 ]
@@ -1,39 +1,77 @@
 # Create your views here.
 
-from collections import defaultdict
-from django.utils import timezone
-from rest_framework import viewsets, permissions, status
+import hashlib
+from functools import partial
+
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from .models import Job, JobTask, Equipment
-from .serializers import JobSerializer, JobTaskSerializer, EquipmentSerializer
-from .permissions import IsAdminOrSalesAgent, IsAssignedTechnicianForTaskUpdate
-
-from django.db.models import (
-    Avg,
-    Count,
+from . import reference
+from .bulk import create_tasks, update_tasks
+from .conditional import ConditionalGetMixin
+from .dashboard import get_dashboard
+from .export import ExportMixin
+from .filters import JobFilter, JobTaskFilter, QueryParamFilterBackend
+from .models import ImportRun, Job, JobTask, Equipment
+from .serializers import (
+    EquipmentSerializer,
+    ImportRunSerializer,
+    JobAnalyticsQuerySerializer,
+    JobSerializer,
+    JobSyncSerializer,
+    JobThroughputQuerySerializer,
+    JobTaskSerializer,
+    SearchQuerySerializer,
+)
+from .pagination import (
+    EquipmentPagination,
+    ImportRunPagination,
+    JobPagination,
+    JobTaskPagination,
 )
+from .queries import plan_queryset
+from .readers import FastReadMixin, reader_for
+from .rollups import job_analytics
+from .search import search_page
+from .sync import collect_changes
+from .tasks import import_file
+from .throughput import throughput
+from .permissions import IsAdminOrSalesAgent, IsAssignedTechnicianForTaskUpdate
 
 
-class EquipmentViewSet(viewsets.ModelViewSet):
-    queryset = Equipment.objects.all().order_by("name")
+class EquipmentViewSet(FastReadMixin, viewsets.ModelViewSet):
+    queryset = Equipment.objects.all().order_by("name", "id")
     serializer_class = EquipmentSerializer
+    pagination_class = EquipmentPagination
 
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
             return [IsAdminOrSalesAgent()]
         return [permissions.IsAuthenticated()]
 
+    def list(self, request, *args, **kwargs):
+        # The same for every user; cached until equipment changes.
+        url = request.build_absolute_uri()
+        name = "list:" + hashlib.sha256(url.encode()).hexdigest()
+        page = partial(super().list, request, *args, **kwargs)
+        return Response(reference.cached("equipment", name, lambda: page().data))
+
 
-class JobViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Job.objects.all()
-        .select_related("created_by", "assigned_to")
-        .prefetch_related("tasks")
-    )
+class JobViewSet(
+    ConditionalGetMixin, ExportMixin, FastReadMixin, viewsets.ModelViewSet
+):
+    queryset = plan_queryset(Job.objects.all(), JobSerializer)
     serializer_class = JobSerializer
+    pagination_class = JobPagination
+    filter_backends = [QueryParamFilterBackend]
+    filter_class = JobFilter
+    # Tasks have their own export; CSV rows stay one per job.
+    export_serializer_classes = {"csv": JobSyncSerializer}
 
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
@@ -45,46 +83,44 @@ class JobViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], permission_classes=[IsAdminOrSalesAgent])
     def analytics(self, request):
-        completed = JobTask.objects.exclude(completed_at__isnull=True)
-        avg_completed_per_job = (
-            completed.values("job")
-            .annotate(total=Count("id"))
-            .aggregate(avg_tasks_per_job=Avg("total"))
-        )
-
-        most_used_equipment = (
-            Equipment.objects.annotate(uses=Count("task_usages"))
-            .order_by("-uses")[:10]
-            .values("id", "name", "serial_number", "uses")
+        params = JobAnalyticsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        return Response(
+            job_analytics(
+                start=query.get("start"),
+                end=query.get("end"),
+                technician_id=query.get("technician"),
+            )
         )
 
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminOrSalesAgent])
+    def throughput(self, request):
+        params = JobThroughputQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
         return Response(
-            {
-                "avg_completed_tasks_per_job": avg_completed_per_job[
-                    "avg_tasks_per_job"
-                ],
-                "top_equipment_by_usage": list(most_used_equipment),
-            }
+            throughput(
+                query["bucket"],
+                start=query.get("start"),
+                end=query.get("end"),
+                technician_id=query.get("technician"),
+            )
         )
 
 
-class JobTaskViewSet(viewsets.ModelViewSet):
-    queryset = (
-        JobTask.objects.all()
-        .select_related("job")
-        .prefetch_related("required_equipment")
-    )
+class JobTaskViewSet(ExportMixin, FastReadMixin, viewsets.ModelViewSet):
+    # The parent job is joined for IsAssignedTechnicianForTaskUpdate.
+    queryset = plan_queryset(JobTask.objects.select_related("job"), JobTaskSerializer)
     serializer_class = JobTaskSerializer
-
-    def get_queryset(self):
-        qs = super().get_queryset()
-        job_id = self.request.query_params.get("job")
-        if job_id:
-            qs = qs.filter(job_id=job_id)
-        return qs
+    pagination_class = JobTaskPagination
+    filter_backends = [QueryParamFilterBackend]
+    filter_class = JobTaskFilter
 
     def get_permissions(self):
-        if self.action in ["create"]:
+        if self.action in ["create"] or (
+            self.action == "bulk" and self.request.method == "POST"
+        ):
             return [IsAdminOrSalesAgent()]
         if self.action in ["update", "partial_update"]:
             return [IsAssignedTechnicianForTaskUpdate()]
@@ -109,12 +145,56 @@ class JobTaskViewSet(viewsets.ModelViewSet):
         self.perform_update(serializer)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["post", "patch"])
+    def bulk(self, request):
+        """
+        POST: create an array of tasks. PATCH: apply an array of
+        {id, status, completed_at, required_equipment_ids} changes, each
+        checked against IsAssignedTechnicianForTaskUpdate. All-or-nothing;
+        errors are returned as a list aligned with the items.
+        """
+        if request.method == "POST":
+            ids, code = create_tasks(request.data), status.HTTP_201_CREATED
+        else:
+            ids, code = update_tasks(request.data, request, self), status.HTTP_200_OK
+        reader = reader_for(JobTaskSerializer)
+        rows = JobTask.objects.filter(pk__in=ids).values(*reader.columns)
+        rendered = {item["id"]: item for item in reader.render(rows)}
+        return Response([rendered[pk] for pk in ids], status=code)
+
+
+class ImportRunViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    POST a CSV/NDJSON file with its kind (equipment, jobs or tasks); it is
+    imported by a Celery worker. GET the run to follow progress and errors.
+    """
+
+    queryset = ImportRun.objects.all()
+    serializer_class = ImportRunSerializer
+    permission_classes = [IsAdminOrSalesAgent]
+    pagination_class = ImportRunPagination
+
+    def perform_create(self, serializer):
+        run = serializer.save(created_by=self.request.user)
+        transaction.on_commit(partial(import_file.delay, run.pk))
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
 
 class TechnicianDashboard(APIView):
     """
     GET /api/technician-dashboard/
     Returns upcoming & in-progress tasks for the authenticated Technician,
-    grouped by day (based on Job.scheduled_date).
+    grouped by day (based on Job.scheduled_date). Served from a per-technician
+    cache; send the returned ETag as If-None-Match to get 304 when unchanged.
     """
 
     permission_classes = [permissions.IsAuthenticated]
@@ -125,37 +205,56 @@ class TechnicianDashboard(APIView):
         if getattr(user, "role", None) == "Technician" or not tech_id:
             tech_id = user.id
 
-        tasks = (
-            JobTask.objects.select_related("job")
-            .prefetch_related("required_equipment")
-            .filter(
-                job__assigned_to_id=tech_id,
-                status__in=[JobTask.Status.PENDING, JobTask.Status.IN_PROGRESS],
-            )
-        )
+        payload, etag = get_dashboard(tech_id)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(payload, status=status.HTTP_200_OK, headers=headers)
 
-        grouped = defaultdict(list)
-        for task in tasks:
-            day = (
-                task.job.scheduled_date.date()
-                if task.job.scheduled_date
-                else timezone.now().date()
-            )
-            grouped[day].append(task)
-
-        out = []
-        for day, day_tasks in sorted(grouped.items()):
-            day_items = []
-            for t in day_tasks:
-                day_items.append(
-                    {
-                        "job_title": t.job.title,
-                        "task": JobTaskSerializer(t).data,
-                        "equipment": EquipmentSerializer(
-                            t.required_equipment.all(), many=True
-                        ).data,
-                    }
-                )
-            out.append({"date": day, "items": day_items})
-
-        return Response(out, status=status.HTTP_200_OK)
+
+class SyncView(APIView):
+    """
+    GET /api/sync/?token=<sync token>
+    Jobs, tasks and equipment created or updated since the token, and the ids
+    deleted (or no longer visible) since then, plus a new token for the next
+    call. Without a token the full visible data set is returned with
+    ``reset: true``. Responses are paged: while ``has_more`` is true, call
+    again with the returned token.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        payload = collect_changes(request.user, request.query_params.get("token"))
+        return Response(payload, status=status.HTTP_200_OK)
+
+
+class SearchView(APIView):
+    """
+    GET /api/search/?q=<words>[&kind=job,task,equipment][&page=&page_size=]
+    Jobs, tasks and equipment matching every word (as a prefix), best
+    match first, each rendered like its list endpoint.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        page = query["page"]
+        results, has_more = search_page(
+            query["q"], sorted(query.get("kind") or ()), page, query["page_size"]
+        )
+        url = request.build_absolute_uri()
+        return Response(
+            {
+                "next": (
+                    replace_query_param(url, "page", page + 1) if has_more else None
+                ),
+                "previous": (
+                    replace_query_param(url, "page", page - 1) if page > 1 else None
+                ),
+                "results": results,
+            }
+        )
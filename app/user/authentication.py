@@ -0,0 +1,178 @@
+"""
+Token authentication that skips the database for known tokens.
+
+DRF's TokenAuthentication loads the token and its user with one JOIN per
+request. ``CachedTokenAuthentication`` remembers the result in two tiers:
+
+* a bounded LRU in this process, whose entries expire after
+  TOKEN_AUTH_LOCAL_CACHE_TIMEOUT seconds;
+* the shared cache TOKEN_AUTH_CACHE_ALIAS (any Django backend: locmem
+  or file in tests, a networked cache in production), whose entries
+  expire after TOKEN_AUTH_CACHE_TIMEOUT seconds.
+
+A read (GET, HEAD, OPTIONS) with a token found in either tier costs no
+query. Entries hold the user's fields except the password hash; the user
+is rebuilt with the password deferred, so it is loaded only when code
+touches it. Other requests load the token and user from the database as
+DRF does and refresh both tiers: they may save the user, and a copy
+another process has outdated would write its stale role or is_active
+back.
+
+Deleting a token and saving or deleting a user drop the affected entries
+from the shared cache and from this process (see user.signals). Other
+processes may keep serving their local copy until it expires, so the
+local timeout bounds how long a revoked token or a role change can go
+unnoticed there. Writes that bypass model signals (queryset.update) must
+call ``forget_user`` themselves.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from rest_framework import exceptions
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from app import metrics
+
+CACHE_ALIAS = getattr(settings, "TOKEN_AUTH_CACHE_ALIAS", "default")
+CACHE_TIMEOUT = getattr(settings, "TOKEN_AUTH_CACHE_TIMEOUT", 300)
+LOCAL_CACHE_TIMEOUT = getattr(settings, "TOKEN_AUTH_LOCAL_CACHE_TIMEOUT", 10)
+LOCAL_CACHE_SIZE = getattr(settings, "TOKEN_AUTH_LOCAL_CACHE_SIZE", 1024)
+
+
+class LRUCache:
+    """A thread-safe mapping with a size bound and per-entry expiry."""
+
+    def __init__(self, max_entries, timeout, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= self.clock():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (self.clock() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LRUCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_TIMEOUT)
+
+
+def shared_cache():
+    return caches[CACHE_ALIAS]
+
+
+def cache_key(token_key):
+    # Raw tokens never become cache keys.
+    return "auth:token:" + hashlib.sha256(token_key.encode()).hexdigest()
+
+
+def cached_fields():
+    return [
+        field.attname
+        for field in get_user_model()._meta.concrete_fields
+        if field.attname != "password"
+    ]
+
+
+def entry_for(token):
+    user = token.user
+    return {
+        "created": token.created,
+        "user": {name: getattr(user, name) for name in cached_fields()},
+    }
+
+
+def restore(token_key, entry):
+    """(user, token) from a cached entry, without queries."""
+    names = list(entry["user"])
+    user = get_user_model().from_db(
+        connection.alias, names, [entry["user"][name] for name in names]
+    )
+    token = Token(key=token_key, user=user, created=entry["created"])
+    token._state.adding = False
+    token._state.db = connection.alias
+    return user, token
+
+
+def forget_tokens(token_keys):
+    keys = [cache_key(token_key) for token_key in token_keys]
+    if keys:
+        local_cache.delete_many(keys)
+        shared_cache().delete_many(keys)
+
+
+def forget_user(user_id):
+    """Drop the cached entries of every token of this user."""
+    forget_tokens(Token.objects.filter(user_id=user_id).values_list("key", flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication served from the local and shared token caches."""
+
+    # Set per request by authenticate(); True when called directly.
+    cached_read = True
+
+    def authenticate(self, request):
+        self.cached_read = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def remember(self, key, cache_name):
+        """DRF's lookup, stored in both tiers."""
+        user, token = super().authenticate_credentials(key)
+        entry = entry_for(token)
+        shared_cache().set(cache_name, entry, CACHE_TIMEOUT)
+        local_cache.set(cache_name, entry)
+        return user, token
+
+    def authenticate_credentials(self, key):
+        cache_name = cache_key(key)
+        if not self.cached_read:
+            return self.remember(key, cache_name)
+        entry = local_cache.get(cache_name)
+        if entry is None:
+            entry = shared_cache().get(cache_name)
+            metrics.cache_lookup("token-auth", entry is not None)
+            if entry is None:
+                # Unknown and invalid tokens take DRF's path; only
+                # tokens of active users are remembered.
+                return self.remember(key, cache_name)
+            local_cache.set(cache_name, entry)
+        else:
+            metrics.cache_lookup("token-auth", True)
+
+        if not entry["user"]["is_active"]:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+        return restore(key, entry)
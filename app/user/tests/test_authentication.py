@@ -0,0 +1,99 @@
+"""
+Tests for cached token authentication.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import LRUCache, local_cache
+
+ME_URL = reverse("user:me")
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="tech@example.com",
+            password="testpass123",
+            name="Tech",
+            role="Technician",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_cached_token_costs_no_queries(self):
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data["email"], "tech@example.com")
+
+        # A fresh process finds the token in the shared tier.
+        local_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(ME_URL)
+        self.token.delete()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_role_and_active_changes_are_seen(self):
+        self.client.get(ME_URL)
+        self.user.role = "Admin"
+        self.user.save()
+        self.assertEqual(self.client.get(ME_URL).data["role"], "Admin")
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updating_cached_user_keeps_password(self):
+        self.client.get(ME_URL)
+        res = self.client.patch(ME_URL, {"name": "Renamed"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, "Renamed")
+        self.assertTrue(self.user.check_password("testpass123"))
+
+    def test_writes_load_the_user_from_the_database(self):
+        self.client.get(ME_URL)
+        # Another process changed the role; this one's copy is outdated.
+        get_user_model().objects.filter(pk=self.user.pk).update(role="Admin")
+        self.assertEqual(self.client.get(ME_URL).data["role"], "Technician")
+
+        res = self.client.patch(ME_URL, {"name": "Renamed"})
+        self.assertEqual(res.data["role"], "Admin")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.role, "Admin")
+        self.assertEqual(self.client.get(ME_URL).data["role"], "Admin")
+
+    def test_invalid_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token bogus")
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LRUCacheTests(TestCase):
+    def test_bounded_and_expiring(self):
+        now = [0.0]
+        lru = LRUCache(max_entries=2, timeout=10, clock=lambda: now[0])
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        self.assertIsNone(lru.get("b"))  # least recently used goes first
+        self.assertEqual((lru.get("a"), lru.get("c")), (1, 3))
+
+        now[0] = 10
+        self.assertIsNone(lru.get("a"))
+        self.assertEqual(len(lru.entries), 1)
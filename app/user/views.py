@@ -2,11 +2,12 @@
 Views for user API.
 """
 
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.exceptions import PermissionDenied
 from django.contrib.auth import get_user_model
 from rest_framework.settings import api_settings
+from user.authentication import CachedTokenAuthentication
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
@@ -19,7 +20,7 @@ class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
     permission_classes = [permissions.AllowAny]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def create(self, request, *args, **kwargs):
         user = request.user
@@ -43,7 +44,7 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authicated user."""
 
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
@@ -5,6 +5,13 @@ DB_PATH="${DJANGO_DB_PATH:-/db/db.sqlite3}"
 DB_DIR="$(dirname "$DB_PATH")"
 mkdir -p "$DB_DIR"
 
+if [ -n "$METRICS_MULTIPROC_DIR" ]; then
+  # Per-process metric files of the previous run. The directory may be a
+  # volume mount, so empty it rather than removing it.
+  mkdir -p "$METRICS_MULTIPROC_DIR"
+  find "$METRICS_MULTIPROC_DIR" -mindepth 1 -delete
+fi
+
 python app/manage.py migrate --noinput
 python app/manage.py collectstatic --noinput
 